@@ -0,0 +1,175 @@
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Category
+from .serializers import DUPLICATE_NAME_MESSAGE
+from .parsers import InvalidLine
+from .signals import bulk_delete, categories_bulk_saved
+from . import cache as category_cache
+
+CHUNK_SIZE = 500
+
+
+class CategoryBulkItemSerializer(serializers.Serializer):
+    """
+    Shape validation for one bulk item. Name uniqueness is checked per chunk
+    with a single set-based query in `apply_bulk`, not per item.
+    """
+    op = serializers.ChoiceField(choices=["create", "update", "delete"], required=False)
+    id = serializers.IntegerField(required=False, min_value=1)
+    name = serializers.CharField(max_length=255, required=False)
+    is_active = serializers.BooleanField(required=False)
+
+    def validate(self, data):
+        op = data.setdefault("op", "update" if "id" in data else "create")
+        if op in ("update", "delete") and "id" not in data:
+            raise serializers.ValidationError({"id": f"This field is required for {op}."})
+        if op == "create" and "name" not in data:
+            raise serializers.ValidationError({"name": "This field is required."})
+        return data
+
+
+def apply_bulk(items, chunk_size=CHUNK_SIZE):
+    """
+    Applies an iterable of create/update/delete items chunk by chunk. Each
+    chunk costs one lookup of the referenced ids, one case-insensitive name
+    query, and one transaction with bulk_create/bulk_update/delete; if that
+    transaction hits an IntegrityError the chunk's items are applied one at
+    a time instead. Returns one result dict per item, in input order.
+    """
+    results = []
+    iterator = iter(items)
+    offset = 0
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            break
+        results.extend(_apply_chunk(chunk, offset))
+        offset += len(chunk)
+    return results
+
+
+def _apply_chunk(chunk, offset):
+    results = []
+    valid = []
+    for index, item in enumerate(chunk, start=offset):
+        if isinstance(item, InvalidLine):
+            results.append(_error(index, {"non_field_errors": [item.error]}))
+            continue
+        serializer = CategoryBulkItemSerializer(data=item)
+        if not serializer.is_valid():
+            results.append(_error(index, serializer.errors))
+            continue
+        results.append(None)
+        valid.append((index, serializer.validated_data))
+
+    ids = {data["id"] for _, data in valid if "id" in data}
+    existing = Category.objects.in_bulk(ids) if ids else {}
+
+    names = {data["name"].lower() for _, data in valid if "name" in data and data["op"] != "delete"}
+    taken = dict(
+        Category.objects.annotate(lname=Lower("name"))
+        .filter(lname__in=names)
+        .values_list("lname", "id")
+    ) if names else {}
+    # Rows renamed or deleted in this chunk give up their current names, so
+    # another item may take them (e.g. rename A away from "X", create "X").
+    leaving = {
+        data["id"] for _, data in valid
+        if data.get("id") in existing and (data["op"] == "delete" or "name" in data)
+    }
+    taken = {lname: owner for lname, owner in taken.items() if owner not in leaving}
+
+    to_create, to_update, to_delete = [], [], []
+    now = timezone.now()
+    for index, data in valid:
+        op = data["op"]
+        pos = index - offset
+        if op != "create" and data["id"] not in existing:
+            results[pos] = _error(index, {"id": ["Category not found."]})
+            continue
+
+        if op == "delete":
+            to_delete.append((index, existing[data["id"]]))
+            continue
+
+        if "name" in data:
+            lname = data["name"].lower()
+            owner = taken.get(lname)
+            if owner is not None and owner != data.get("id"):
+                results[pos] = _error(index, {"name": [DUPLICATE_NAME_MESSAGE]})
+                continue
+            # Reserve the name so later items in the same chunk collide with it.
+            taken[lname] = data.get("id", -1 - index)
+
+        if op == "create":
+            to_create.append((index, Category(name=data["name"], is_active=data.get("is_active", True))))
+        else:
+            category = existing[data["id"]]
+            for attr in ("name", "is_active"):
+                if attr in data:
+                    setattr(category, attr, data[attr])
+            category.updated_at = now
+            to_update.append((index, category))
+
+    try:
+        with transaction.atomic():
+            # Deletes and renames go first so the names they free are available
+            # to the creates.
+            if to_delete:
+                # One cache bump and one search-index removal for the chunk,
+                # not one per deleted row.
+                with bulk_delete():
+                    Category.objects.filter(pk__in=[obj.pk for _, obj in to_delete]).delete()
+            Category.objects.bulk_update(
+                [obj for _, obj in to_update], ["name", "is_active", "updated_at"]
+            )
+            Category.objects.bulk_create([obj for _, obj in to_create])
+            # bulk_create/bulk_update don't send post_save, so invalidate explicitly.
+            category_cache.invalidate()
+            categories_bulk_saved.send(
+                sender=Category, instances=[obj for _, obj in to_create + to_update]
+            )
+    except IntegrityError:
+        # A concurrent writer took one of the names after our check, or the
+        # chunk swaps names between rows, which a single UPDATE can't do.
+        # Apply the items one at a time so only the offending ones fail.
+        _apply_one_by_one(results, offset, to_create, to_update, to_delete)
+        return results
+
+    for status_name, batch in (("created", to_create), ("updated", to_update), ("deleted", to_delete)):
+        for index, obj in batch:
+            results[index - offset] = {"index": index, "status": status_name, "id": obj.pk}
+    return results
+
+
+def _apply_one_by_one(results, offset, to_create, to_update, to_delete):
+    """Fallback for a chunk that hit an IntegrityError: one savepoint per item."""
+    batches = (
+        ("deleted", to_delete, lambda obj: obj.delete()),
+        ("updated", to_update, lambda obj: obj.save(update_fields=["name", "is_active", "updated_at"])),
+        # The failed bulk_create may have assigned pks before rolling back.
+        ("created", to_create, lambda obj: obj.save(force_insert=True)),
+    )
+    conflict = {"non_field_errors": ["Conflicting concurrent write; retry this item."]}
+    for status_name, batch, apply in batches:
+        for index, obj in batch:
+            if status_name == "created":
+                obj.pk = None
+            pk = obj.pk  # delete() clears it
+            try:
+                with transaction.atomic():
+                    apply(obj)
+            except IntegrityError:
+                errors = conflict if status_name == "deleted" else {"name": [DUPLICATE_NAME_MESSAGE]}
+                results[index - offset] = _error(index, errors)
+                continue
+            results[index - offset] = {"index": index, "status": status_name, "id": pk or obj.pk}
+
+
+def _error(index, errors):
+    return {"index": index, "status": "error", "errors": errors}
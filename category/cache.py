@@ -0,0 +1,40 @@
+from django.db import transaction
+
+from superadmin.config import Config
+from superadmin.utils import get_versioned, set_versioned, bump_version
+
+# Every cached category payload is stamped with this generation; bumping it
+# after a write makes all of them stale in one step.
+GENERATION_KEY = "category:generation"
+
+
+def list_key(params=None):
+    """`params` are the validated list query parameters; each variant is cached separately."""
+    if not params:
+        return "category:list"
+    parts = []
+    for name in sorted(params):
+        value = params[name]
+        if isinstance(value, (list, tuple)):
+            value = ",".join(map(str, value))
+        parts.append(f"{name}={value}")
+    return "category:list:" + "&".join(parts)
+
+
+def detail_key(pk):
+    return f"category:detail:{pk}"
+
+
+def get_cached(key):
+    """Returns (generation, payload); payload is None on a miss."""
+    return get_versioned(GENERATION_KEY, key)
+
+
+def set_cached(key, generation, payload):
+    set_versioned(key, generation, payload, Config.CATEGORY_CACHE_TTL)
+
+
+def invalidate():
+    # Bump after commit so a concurrent reader can't re-cache the old rows
+    # under the new generation.
+    transaction.on_commit(lambda: bump_version(GENERATION_KEY))
@@ -0,0 +1,37 @@
+from hashlib import md5
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_validators(updated_at, *parts):
+    """
+    Builds a strong ETag and a Last-Modified timestamp from the newest
+    updated_at plus any extra discriminators (row count, pk, ...).
+    """
+    stamp = updated_at.isoformat() if updated_at else ""
+    digest = md5(":".join([stamp, *map(str, parts)]).encode()).hexdigest()
+    last_modified = int(updated_at.timestamp()) if updated_at else None
+    return quote_etag(digest), last_modified
+
+
+def collection_validators(queryset):
+    # One aggregate query: MAX() is answered from the updated_at index.
+    agg = queryset.order_by().aggregate(last=Max("updated_at"), count=Count("pk"))
+    return make_validators(agg["last"], agg["count"])
+
+
+def not_modified(request, etag, last_modified):
+    """Returns a 304 response when the client's copy is still current, else None."""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
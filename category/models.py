@@ -1,9 +1,10 @@
 from django.db import models
+from django.db.models.functions import Lower
 
 # Create your models here.
 
 class Category(models.Model):
-    name = models.CharField(max_length=255, unique=True , db_index=True)
+    name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True ,  db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -14,8 +15,15 @@ class Category(models.Model):
     class Meta:
         verbose_name = 'Category'
         verbose_name_plural = 'Categories'
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         indexes = [
-            models.Index(fields=['name']),
+            models.Index(fields=['updated_at']),
+            # Keyset pagination on the default ordering (see category.pagination).
+            models.Index(fields=['-created_at', '-id'], name='category_created_id_idx'),
+        ]
+        constraints = [
+            # Case-insensitive uniqueness enforced by the database; also serves
+            # the Lower(name) lookups used for bulk validation.
+            models.UniqueConstraint(Lower('name'), name='category_name_ci_unique'),
         ]
 
@@ -0,0 +1,34 @@
+import json
+
+from rest_framework.parsers import BaseParser
+
+
+class InvalidLine:
+    """Placeholder yielded for an NDJSON line that is not valid JSON."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON lazily: the view receives a generator and
+    consumes the body line by line, so large imports are never held in
+    memory as a single document.
+    """
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        return self._iter_lines(stream, encoding)
+
+    @staticmethod
+    def _iter_lines(stream, encoding):
+        for raw in stream:
+            line = raw.decode(encoding).strip() if isinstance(raw, bytes) else raw.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield InvalidLine(f"Invalid JSON: {e}")
@@ -1,27 +1,99 @@
+from functools import lru_cache
+
 from rest_framework import serializers
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from .models import Category
+from .pagination import KeysetPagination
+from restserver.streaming import RowEncoder
+from . import cache as category_cache
+from .signals import bulk_delete
+
+DUPLICATE_NAME_MESSAGE = "Category with this name already exists."
+
+category_keyset = KeysetPagination(Category, "created_at", descending=True)
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'is_active', 'created_at', 'updated_at']
 
-    def validate_name(self, value):
-        # We use Category instead of category (case sensitive matching depends on DB, but unique=True in model handles most cases)
-        if Category.objects.filter(name__iexact=value).exists():
-            if self.instance and self.instance.name.lower() == value.lower():
-                return value
-            raise serializers.ValidationError("Category with this name already exists.")
-        return value
-
-    @transaction.atomic
+    # Name uniqueness is enforced by the category_name_ci_unique constraint;
+    # a duplicate surfaces as an IntegrityError on insert/update. The cache is
+    # invalidated by the post_save handler in category.signals.
     def create(self, validated_data):
-        return Category.objects.create(**validated_data)
+        try:
+            with transaction.atomic():
+                instance = Category.objects.create(**validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({"name": [DUPLICATE_NAME_MESSAGE]})
+        return instance
 
-    @transaction.atomic
     def update(self, instance, validated_data):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        try:
+            with transaction.atomic():
+                instance.save()
+        except IntegrityError:
+            raise serializers.ValidationError({"name": [DUPLICATE_NAME_MESSAGE]})
         return instance
+
+    @transaction.atomic
+    def delete(self, instance):
+        # One search-index removal per model for the category and its
+        # cascaded products instead of one per product.
+        with bulk_delete():
+            instance.delete()
+        category_cache.invalidate()
+
+
+class CategoryListQuerySerializer(serializers.Serializer):
+    """Validates the optional list query parameters (?is_active=, ?fields=, ?cursor=, ?limit=, ?stream=)."""
+    is_active = serializers.BooleanField(required=False, allow_null=True, default=None)
+    stream = serializers.BooleanField(required=False, default=False)
+    fields = serializers.CharField(required=False)
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=500)
+
+    DEFAULT_LIMIT = 50
+
+    def validate_fields(self, value):
+        names = [name.strip() for name in value.split(",") if name.strip()]
+        unknown = [name for name in names if name not in CategorySerializer.Meta.fields]
+        if not names or unknown:
+            raise serializers.ValidationError(
+                f"Allowed fields: {', '.join(CategorySerializer.Meta.fields)}."
+            )
+        return list(dict.fromkeys(names))
+
+    def validate_cursor(self, value):
+        try:
+            return category_keyset.decode_cursor(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+    def validate(self, data):
+        data["paginate"] = "cursor" in data or "limit" in data
+        if data["stream"] and data["paginate"]:
+            raise serializers.ValidationError({"stream": ["Can't be combined with cursor or limit."]})
+        data.setdefault("limit", self.DEFAULT_LIMIT)
+        return data
+
+
+def represent_values(rows, field_names):
+    """
+    Formats `.values()` rows exactly like CategorySerializer would, without
+    instantiating models or running a full serializer per row.
+    """
+    fields = CategorySerializer().fields
+    converters = [(name, fields[name].to_representation) for name in field_names]
+    return [
+        {name: None if row[name] is None else convert(row[name]) for name, convert in converters}
+        for row in rows
+    ]
+
+
+@lru_cache(maxsize=64)
+def category_encoder(fields=None):
+    """Row encoder for streamed lists, built once per projection."""
+    return RowEncoder(CategorySerializer, fields=fields)
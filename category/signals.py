@@ -0,0 +1,55 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .models import Category
+from . import cache as category_cache
+
+# Sent by the bulk endpoint after bulk_create/bulk_update, which bypass
+# post_save. Receives `instances`, the created or updated categories.
+categories_bulk_saved = Signal()
+
+# Sent once at the end of a bulk_delete() block. Receives `deleted`, a dict
+# of model -> set of pks deleted in the block (categories and cascaded rows).
+categories_bulk_deleted = Signal()
+
+_bulk = threading.local()
+
+
+@contextmanager
+def bulk_delete():
+    """
+    Defers per-row post_delete work for a queryset delete: handlers call
+    defer_delete() and skip their own work, and categories_bulk_deleted
+    carries every deleted pk once the block ends.
+    """
+    _bulk.deleted = deleted = {}
+    try:
+        yield
+    finally:
+        _bulk.deleted = None
+    if deleted:
+        categories_bulk_deleted.send(sender=Category, deleted=deleted)
+
+
+def defer_delete(instance):
+    """Records the deleted row if a bulk_delete() is active; returns whether it was."""
+    deleted = getattr(_bulk, "deleted", None)
+    if deleted is None:
+        return False
+    deleted.setdefault(type(instance), set()).add(instance.pk)
+    return True
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, **kwargs):
+    category_cache.invalidate()
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    if defer_delete(instance):
+        return  # the bulk caller invalidates once
+    category_cache.invalidate()
@@ -1,3 +1,356 @@
-from django.test import TestCase
+import base64
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from restserver.benchmark import LOCMEM_CACHES
+from restserver.testing import query_budget
+from superadmin.models import ROLE_SUPERADMIN, UserProfile
+from superadmin.tokens import RoleRefreshToken
+
+from product.models import Product
+
+from .models import Category
+from .serializers import DUPLICATE_NAME_MESSAGE
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CategoryQueryBudgetTests(TestCase):
+    """
+    Query budgets for every category route. Budgets don't depend on the
+    number of rows, so a regression to per-row queries fails here.
+    """
+    rows = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        Category.objects.bulk_create(Category(name=f"Category {i}") for i in range(cls.rows))
+        cls.category = Category.objects.order_by("id").first()
+        admin = UserProfile.objects.create(email="admin@example.com", role=ROLE_SUPERADMIN, is_active=True)
+        cls.auth = {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(admin).access_token}"}
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list(self):
+        # Collection validators (MAX/COUNT) + the rows; a cached list costs none.
+        with query_budget(2):
+            response = self.client.get(reverse("category-list-create"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["data"]), self.rows)
+        with query_budget(0):
+            self.client.get(reverse("category-list-create"))
+
+    def test_list_paginated_projection(self):
+        with query_budget(2):
+            response = self.client.get(reverse("category-list-create"), {"limit": 50, "fields": "id,name"})
+        self.assertEqual(response.status_code, 200)
+        with query_budget(2):
+            response = self.client.get(
+                reverse("category-list-create"), {"limit": 50, "cursor": response.json()["next_cursor"]}
+            )
+        self.assertEqual(len(response.json()["data"]), 50)
+
+    def test_list_stream(self):
+        # Same validators + one chunked SELECT, whatever the table size.
+        with query_budget(2):
+            response = self.client.get(reverse("category-list-create"), {"stream": "true"})
+            body = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.client.get(reverse("category-list-create")).json())
+
+        response = self.client.get(reverse("category-list-create"), {"stream": "true", "fields": "id,name"})
+        body = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(len(body["data"]), self.rows)
+        self.assertEqual(set(body["data"][0]), {"id", "name"})
+
+    def test_detail(self):
+        url = reverse("category-detail", args=[self.category.pk])
+        with query_budget(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        with query_budget(0):
+            self.client.get(url)
+
+    def test_create(self):
+        # INSERT + search index refresh (delete + insert).
+        with query_budget(3):
+            response = self.client.post(
+                reverse("category-list-create"), {"name": "Brand new"}, content_type="application/json", **self.auth
+            )
+        self.assertEqual(response.status_code, 201)
+
+    def test_update(self):
+        # Lookup, UPDATE, search index refresh.
+        with query_budget(4):
+            response = self.client.patch(
+                reverse("category-detail", args=[self.category.pk]), {"name": "Renamed"},
+                content_type="application/json", **self.auth,
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete(self):
+        # Lookup, cascade collection of products, DELETE, search index removal.
+        with query_budget(4):
+            response = self.client.delete(reverse("category-detail", args=[self.category.pk]), **self.auth)
+        self.assertEqual(response.status_code, 204)
+
+    def test_delete_with_products(self):
+        Product.objects.bulk_create(
+            Product(category=self.category, name=f"Product {i}", sku=f"SKU-{i}", price=1) for i in range(50)
+        )
+        # Lookup, cascade collection, two DELETEs, one search index removal
+        # per model; no per-product work.
+        with self.captureOnCommitCallbacks(execute=True), query_budget(6, max_similar=2):
+            response = self.client.delete(reverse("category-detail", args=[self.category.pk]), **self.auth)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Product.objects.filter(category=self.category).exists())
+
+    def test_bulk(self):
+        existing = list(Category.objects.order_by("id").values_list("id", flat=True)[:100])
+        items = [{"name": f"Bulk {i}"} for i in range(200)]
+        items += [{"id": pk, "is_active": False} for pk in existing]
+        # One chunk: id lookup, name lookup, bulk_create, bulk_update, then one
+        # batched (executemany) search index delete and insert.
+        with query_budget(6):
+            response = self.client.post(reverse("category-bulk"), items, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+    def test_bulk_delete(self):
+        ids = list(Category.objects.order_by("id").values_list("id", flat=True)[:50])
+        Product.objects.bulk_create(
+            Product(category_id=pk, name=f"Product {pk}", sku=f"SKU-{pk}", price=1) for pk in ids
+        )
+        items = [{"op": "delete", "id": pk} for pk in ids]
+        # id lookup, delete collection of categories and their products, two
+        # DELETEs, one batched search index removal per model; no per-row work.
+        with mock.patch("category.cache.bump_version") as bump, \
+                self.captureOnCommitCallbacks(execute=True), query_budget(7, max_similar=2):
+            response = self.client.post(reverse("category-bulk"), items, content_type="application/json", **self.auth)
+        self.assertEqual(response.json()["data"]["deleted"], 50)
+        self.assertEqual(bump.call_count, 1)
+        self.assertFalse(Category.objects.filter(pk__in=ids).exists())
+
+    def test_bulk_ndjson(self):
+        body = "\n".join([
+            json.dumps({"name": "Streamed"}),
+            "",
+            "{not json",
+            json.dumps({"id": self.category.pk, "is_active": False}),
+            json.dumps({"op": "delete", "id": 10 ** 9}),
+        ])
+        response = self.client.post(reverse("category-bulk"), body, content_type="application/x-ndjson", **self.auth)
+        data = response.json()["data"]
+        self.assertEqual(response.json()["status"], "partial")
+        self.assertEqual([result["status"] for result in data["results"]], ["created", "error", "updated", "error"])
+        self.assertEqual([result["index"] for result in data["results"]], [0, 1, 2, 3])  # blank lines don't count
+        self.assertIn("Invalid JSON", data["results"][1]["errors"]["non_field_errors"][0])
+        self.assertEqual(data["results"][3]["errors"], {"id": ["Category not found."]})
+        self.assertTrue(Category.objects.filter(name="Streamed").exists())
+
+    def test_bulk_rejects_non_list(self):
+        for body in ("5", "true", "null", '{"name": "x"}', '"text"'):
+            response = self.client.post(reverse("category-bulk"), body, content_type="application/json", **self.auth)
+            self.assertEqual(response.status_code, 400, body)
+
+
+class CategoryQueryBudget10kTests(CategoryQueryBudgetTests):
+    rows = 10000
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CategoryCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Category.objects.bulk_create(Category(name=f"Category {i}") for i in range(20))
+        # Ties on created_at must be broken by id, not skipped or repeated.
+        Category.objects.filter(id__in=Category.objects.order_by("id").values("id")[5:15]).update(
+            created_at=timezone.now()
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def page(self, **params):
+        return self.client.get(reverse("category-list-create"), params)
+
+    def walk(self, limit):
+        ids, cursor = [], None
+        while True:
+            body = self.page(limit=limit, **({"cursor": cursor} if cursor else {})).json()
+            ids += [row["id"] for row in body["data"]]
+            cursor = body["next_cursor"]
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_every_row_once(self):
+        expected = list(Category.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        for limit in (1, 3, 7, 20, 50):
+            self.assertEqual(self.walk(limit), expected, limit)
+
+    def test_stale_cursor_resumes_after_deleted_row(self):
+        first = self.page(limit=5).json()
+        after = self.page(limit=5, cursor=first["next_cursor"]).json()["data"]
+        Category.objects.filter(pk=first["data"][-1]["id"]).delete()
+        cache.clear()
+        self.assertEqual(self.page(limit=5, cursor=first["next_cursor"]).json()["data"], after)
+
+    def test_bad_cursors_are_rejected(self):
+        def encode(raw):
+            return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+        for cursor in ("garbage!", encode("{}"), encode("[1]"), encode('["not a date", 1]'),
+                       encode('["2024-01-01T00:00:00+00:00", "x"]')):
+            response = self.page(cursor=cursor)
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertIn("cursor", response.json()["errors"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CategoryConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name="Tools")
+        admin = UserProfile.objects.create(email="admin@example.com", role=ROLE_SUPERADMIN, is_active=True)
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(admin).access_token}"}
+
+    def assert_revalidates(self, url):
+        response = self.client.get(url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        cache.clear()  # uncached: answered from the validators before any rows are loaded
+        with query_budget(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.client.get(url)
+        for headers in ({"HTTP_IF_NONE_MATCH": etag}, {"HTTP_IF_MODIFIED_SINCE": last_modified}):
+            with query_budget(0):
+                response = self.client.get(url, **headers)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response["ETag"], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+        return etag
+
+    def test_detail(self):
+        url = reverse("category-detail", args=[self.category.pk])
+        etag = self.assert_revalidates(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(url, {"name": "Hand tools"}, content_type="application/json", **self.auth)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list(self):
+        url = reverse("category-list-create")
+        etag = self.assert_revalidates(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {"name": "Garden"}, content_type="application/json", **self.auth)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["data"]), 2)
+
+    def test_stream(self):
+        url = reverse("category-list-create")
+        etag = self.client.get(url, {"stream": "true"})["ETag"]
+        self.assertEqual(self.client.get(url, {"stream": "true"}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CategoryCacheInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name="Tools")
+        admin = UserProfile.objects.create(email="admin@example.com", role=ROLE_SUPERADMIN, is_active=True)
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(admin).access_token}"}
+        self.list_url = reverse("category-list-create")
+        self.detail_url = reverse("category-detail", args=[self.category.pk])
+
+    def cached_get(self, url):
+        self.client.get(url)
+        with query_budget(0):
+            return self.client.get(url)
+
+    def write(self, method, url, data=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url, data, content_type="application/json", **self.auth)
+
+    def test_create(self):
+        before = self.cached_get(self.list_url)
+        self.assertEqual(self.write("post", self.list_url, {"name": "Garden"}).status_code, 201)
+        after = self.client.get(self.list_url)
+        self.assertEqual({row["name"] for row in after.json()["data"]}, {"Tools", "Garden"})
+        self.assertNotEqual(after["ETag"], before["ETag"])
+
+    def test_update(self):
+        list_before, detail_before = self.cached_get(self.list_url), self.cached_get(self.detail_url)
+        self.assertEqual(self.write("patch", self.detail_url, {"name": "Hand tools"}).status_code, 200)
+        list_after, detail_after = self.client.get(self.list_url), self.client.get(self.detail_url)
+        self.assertEqual(list_after.json()["data"][0]["name"], "Hand tools")
+        self.assertEqual(detail_after.json()["data"]["name"], "Hand tools")
+        self.assertNotEqual(list_after["ETag"], list_before["ETag"])
+        self.assertNotEqual(detail_after["ETag"], detail_before["ETag"])
+
+    def test_case_insensitive_duplicate(self):
+        self.assertEqual(self.write("post", self.list_url, {"name": "Foo"}).status_code, 201)
+        for method, url in (("post", self.list_url), ("patch", self.detail_url)):
+            response = self.write(method, url, {"name": "foo"})
+            self.assertEqual(response.status_code, 400, method)
+            self.assertEqual(response.json()["errors"], {"name": [DUPLICATE_NAME_MESSAGE]})
+        self.assertEqual(Category.objects.filter(name__iexact="foo").count(), 1)
+
+    def test_one_generation_bump_per_write(self):
+        with mock.patch("category.cache.bump_version") as bump:
+            self.write("post", self.list_url, {"name": "Garden"})
+            self.write("patch", self.detail_url, {"name": "Hand tools"})
+        self.assertEqual(bump.call_count, 2)
+
+    def test_delete(self):
+        list_before = self.cached_get(self.list_url)
+        self.cached_get(self.detail_url)
+        self.assertEqual(self.write("delete", self.detail_url).status_code, 204)
+        list_after = self.client.get(self.list_url)
+        self.assertEqual(list_after.json()["data"], [])
+        self.assertNotEqual(list_after["ETag"], list_before["ETag"])
+        self.assertEqual(self.client.get(self.detail_url).status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CategoryBulkNameTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.a = Category.objects.create(name="Alpha")
+        self.b = Category.objects.create(name="Beta")
+        admin = UserProfile.objects.create(email="admin@example.com", role=ROLE_SUPERADMIN, is_active=True)
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(admin).access_token}"}
+
+    def bulk(self, items):
+        response = self.client.post(reverse("category-bulk"), items, content_type="application/json", **self.auth)
+        return response.json()["data"]["results"]
+
+    def test_freed_names_can_be_reused_in_the_same_chunk(self):
+        results = self.bulk([
+            {"name": "alpha"},  # before the rename that frees it
+            {"id": self.a.pk, "name": "Gamma"},
+            {"op": "delete", "id": self.b.pk},
+            {"name": "BETA"},
+        ])
+        self.assertEqual([result["status"] for result in results], ["created", "updated", "deleted", "created"])
+        self.assertEqual(
+            sorted(Category.objects.values_list("name", flat=True)), ["BETA", "Gamma", "alpha"]
+        )
+
+    def test_integrity_error_only_fails_the_offending_items(self):
+        # A swap can't be applied by one UPDATE; the chunk falls back to one
+        # item at a time and the unrelated create still goes through.
+        results = self.bulk([
+            {"id": self.a.pk, "name": "Beta"},
+            {"id": self.b.pk, "name": "Alpha"},
+            {"name": "Delta"},
+        ])
+        self.assertEqual([result["status"] for result in results], ["error", "error", "created"])
+        self.assertEqual(results[0]["errors"], {"name": [DUPLICATE_NAME_MESSAGE]})
+        self.assertEqual(
+            sorted(Category.objects.values_list("name", flat=True)), ["Alpha", "Beta", "Delta"]
+        )
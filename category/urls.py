@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import CategoryAPIView
+from .views import CategoryAPIView, CategoryBulkAPIView
 
 urlpatterns = [
     path('', CategoryAPIView.as_view(), name='category-list-create'),
     path('<int:pk>/', CategoryAPIView.as_view(), name='category-detail'),
+    path('bulk/', CategoryBulkAPIView.as_view(), name='category-bulk'),
 ]
@@ -1,18 +1,30 @@
+from types import GeneratorType
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.parsers import JSONParser
+from rest_framework.exceptions import ValidationError
 
 from .models import Category
-from .serializers import CategorySerializer
+from .serializers import (
+    CategorySerializer, CategoryListQuerySerializer, category_encoder, category_keyset, represent_values
+)
+from . import cache as category_cache
+from .bulk import apply_bulk
+from .parsers import NDJSONParser
+from .conditional import collection_validators, make_validators, not_modified, set_validators
+from superadmin.authentication import ClaimsJWTAuthentication
 from superadmin.permission import CanCreateCategory
+from restserver.metrics import timed
+from restserver.streaming import stream_list
 
 
 class CategoryAPIView(APIView):
-    # 🔐 Authentication only for protected methods
+    # 🔐 Authentication only for protected methods (stateless: role comes from the token claims)
     def get_authenticators(self):
         if self.request.method in ["POST", "PATCH", "DELETE"]:
-            return [JWTAuthentication()]
+            return [ClaimsJWTAuthentication()]
         return []
 
     # 🔐 Permission only for protected methods
@@ -28,35 +40,156 @@ class CategoryAPIView(APIView):
             return None
 
     # 🔓 GET (List or Detail)
+    # Payloads are served from the versioned category cache; a hit is a single
+    # cache round-trip with no ORM or serializer work. Conditional requests
+    # (If-None-Match / If-Modified-Since) are answered with 304 before any
+    # rows are loaded.
     def get(self, request, pk=None):
         if pk:
-            category = self.get_object(pk)
-            if not category:
-                return Response({
-                    "status": "error",
-                    "message": "Category not found"
-                }, status=status.HTTP_404_NOT_FOUND)
+            key = category_cache.detail_key(pk)
+            generation, entry = category_cache.get_cached(key)
+            if entry is None:
+                category = self.get_object(pk)
+                if not category:
+                    return Response({
+                        "status": "error",
+                        "message": "Category not found"
+                    }, status=status.HTTP_404_NOT_FOUND)
 
-            serializer = CategorySerializer(category)
-            return Response({
+                etag, last_modified = make_validators(category.updated_at, category.pk)
+                response = not_modified(request, etag, last_modified)
+                if response is not None:
+                    return response
+
+                with timed("serializer"):
+                    data = CategorySerializer(category).data
+                entry = {
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "data": data,
+                }
+                category_cache.set_cached(key, generation, entry)
+            else:
+                response = not_modified(request, entry["etag"], entry["last_modified"])
+                if response is not None:
+                    return response
+
+            response = Response({
                 "status": "success",
                 "message": "Category retrieved successfully",
-                "data": serializer.data
+                "data": entry["data"]
             }, status=status.HTTP_200_OK)
+            return set_validators(response, entry["etag"], entry["last_modified"])
+
+        query = CategoryListQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({
+                "status": "error",
+                "message": "Validation failed",
+                "errors": query.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+        if params["stream"]:
+            return self.stream_categories(request, params)
 
+        key = category_cache.list_key({
+            name: request.query_params[name]
+            for name in ("is_active", "fields", "cursor", "limit")
+            if name in request.query_params
+        })
+        generation, entry = category_cache.get_cached(key)
+        if entry is None:
+            # The validators cover the whole table, which is conservative for
+            # filtered pages but keeps the check to one aggregate query.
+            etag, last_modified = collection_validators(Category.objects.all())
+            response = not_modified(request, etag, last_modified)
+            if response is not None:
+                return response
+
+            data, next_cursor = self.list_categories(params)
+            entry = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "data": data,
+                "next_cursor": next_cursor,
+            }
+            category_cache.set_cached(key, generation, entry)
+        else:
+            response = not_modified(request, entry["etag"], entry["last_modified"])
+            if response is not None:
+                return response
+
+        body = {
+            "status": "success",
+            "message": "Categories retrieved successfully",
+            "data": entry["data"]
+        }
+        if params["paginate"]:
+            body["next_cursor"] = entry["next_cursor"]
+        response = Response(body, status=status.HTTP_200_OK)
+        return set_validators(response, entry["etag"], entry["last_modified"])
+
+    def list_categories(self, params):
+        """Returns (data, next_cursor) for the validated list parameters."""
         categories = Category.objects.all()
-        serializer = CategorySerializer(categories, many=True)
-        return Response({
+        if params["is_active"] is not None:
+            categories = categories.filter(is_active=params["is_active"])
+
+        fields = params.get("fields")
+        if fields:
+            # Projection: fetch only the requested columns (plus the keyset
+            # columns when paginating) and skip model instantiation.
+            columns = list(fields)
+            if params["paginate"]:
+                columns += [name for name in ("created_at", "id") if name not in columns]
+            categories = categories.values(*columns)
+
+        next_cursor = None
+        if params["paginate"]:
+            categories, next_cursor = category_keyset.paginate(
+                categories, params["limit"], params.get("cursor")
+            )
+
+        categories = list(categories)  # keep the query out of the serializer timing
+        with timed("serializer"):
+            if fields:
+                return represent_values(categories, fields), next_cursor
+            return CategorySerializer(categories, many=True).data, next_cursor
+
+    def stream_categories(self, request, params):
+        """
+        ?stream=true: the whole (filtered) table as a streamed JSON array. Rows
+        are read in chunks and never cached, so memory stays flat however
+        large the table gets; conditional requests still get a 304.
+        """
+        etag, last_modified = collection_validators(Category.objects.all())
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        categories = Category.objects.all()
+        if params["is_active"] is not None:
+            categories = categories.filter(is_active=params["is_active"])
+        fields = params.get("fields")
+        encoder = category_encoder(tuple(fields) if fields else None)
+        response = stream_list(categories, encoder, {
             "status": "success",
             "message": "Categories retrieved successfully",
-            "data": serializer.data
-        }, status=status.HTTP_200_OK)
+        })
+        return set_validators(response, etag, last_modified)
 
     # 🔒 POST (Create)
     def post(self, request):
         serializer = CategorySerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            try:
+                serializer.save()
+            except ValidationError as e:
+                return Response({
+                    "status": "error",
+                    "message": "Validation failed",
+                    "errors": e.detail
+                }, status=status.HTTP_400_BAD_REQUEST)
             return Response({
                 "status": "success",
                 "message": "Category created successfully",
@@ -80,7 +213,14 @@ class CategoryAPIView(APIView):
 
         serializer = CategorySerializer(category, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            try:
+                serializer.save()
+            except ValidationError as e:
+                return Response({
+                    "status": "error",
+                    "message": "Validation failed",
+                    "errors": e.detail
+                }, status=status.HTTP_400_BAD_REQUEST)
             return Response({
                 "status": "success",
                 "message": "Category updated successfully",
@@ -102,8 +242,40 @@ class CategoryAPIView(APIView):
                 "message": "Category not found"
             }, status=status.HTTP_404_NOT_FOUND)
 
-        category.delete()
+        CategorySerializer().delete(category)
         return Response({
             "status": "success",
             "message": "Category deleted successfully"
         }, status=status.HTTP_204_NO_CONTENT)
+
+
+class CategoryBulkAPIView(APIView):
+    """
+    POST a JSON array (or an application/x-ndjson stream) of items:
+    {"op": "create"|"update"|"delete", "id": ..., "name": ..., "is_active": ...}.
+    `op` defaults to "update" when an id is given, otherwise "create".
+    """
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [CanCreateCategory]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    # 🔒 POST (Bulk create / update / delete)
+    def post(self, request):
+        items = request.data
+        # A JSON array, or the generator NDJSONParser returns.
+        if not isinstance(items, (list, GeneratorType)):
+            return Response({
+                "status": "error",
+                "message": "Expected a JSON array or NDJSON stream of items"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = apply_bulk(items)
+        summary = {name: 0 for name in ("created", "updated", "deleted", "error")}
+        for result in results:
+            summary[result["status"]] += 1
+
+        return Response({
+            "status": "success" if not summary["error"] else "partial",
+            "message": "Bulk operation completed",
+            "data": {**summary, "results": results}
+        }, status=status.HTTP_200_OK)
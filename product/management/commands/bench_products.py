@@ -0,0 +1,93 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from category.models import Category
+from product.models import Product
+from restserver.benchmark import bypass_throttles, summarize, throwaway_database, timed_call
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway SQLite database with N products and reports p50/p99 "
+        "latency and queries per request for GET /api/product/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,100000,1000000",
+                            help="Comma separated product counts to benchmark.")
+        parser.add_argument("--categories", type=int, default=100)
+        parser.add_argument("--requests", type=int, default=300,
+                            help="Requests per workload and size.")
+        parser.add_argument("--limit", type=int, default=50, help="Page size.")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        sizes = [int(size) for size in options["sizes"].split(",")]
+
+        with throwaway_database(), bypass_throttles():
+            categories = Category.objects.bulk_create(
+                [Category(name=f"Category {i}") for i in range(options["categories"])]
+            )
+            category_ids = [category.id for category in categories]
+            seeded = 0
+            client = Client()
+
+            for size in sizes:
+                start = time.perf_counter()
+                self.seed(rng, category_ids, seeded, size)
+                seeded = size
+                self.stdout.write(f"\n{size:,} products (seeded in {time.perf_counter() - start:.1f}s)")
+
+                # Each workload returns the URL to time; cursor-following
+                # setup requests happen outside the timed call.
+                workloads = {
+                    "first page, by category": lambda: self.first_page_url(rng, category_ids, options["limit"]),
+                    "deep page, by category": lambda: self.deep_page_url(client, rng, category_ids, options["limit"]),
+                    "first page, all categories": lambda: f"/api/product/?limit={options['limit']}",
+                    "detail": lambda: f"/api/product/{rng.randint(1, size)}/",
+                }
+                for name, make_url in workloads.items():
+                    client.get(make_url())  # warm up
+                    latencies, query_counts = [], []
+                    for _ in range(options["requests"]):
+                        response, elapsed, queries = timed_call(client.get, make_url())
+                        assert response.status_code == 200, response.status_code
+                        latencies.append(elapsed)
+                        query_counts.append(queries)
+                    result = summarize(latencies, query_counts)
+                    self.stdout.write(
+                        f"  {name:<28} p50={result['p50_ms']:>8.2f}ms  p99={result['p99_ms']:>8.2f}ms  "
+                        f"queries/request={result['queries_per_request']}"
+                    )
+
+    def seed(self, rng, category_ids, start, end, batch_size=5000):
+        for offset in range(start, end, batch_size):
+            Product.objects.bulk_create([
+                Product(
+                    category_id=rng.choice(category_ids),
+                    name=f"Product {i}",
+                    sku=f"SKU-{i:08d}",
+                    price=Decimal(rng.randint(100, 100000)) / 100,
+                    stock=rng.randint(0, 500),
+                    is_active=rng.random() < 0.9,
+                )
+                for i in range(offset, min(offset + batch_size, end))
+            ])
+
+    def first_page_url(self, rng, category_ids, limit):
+        return f"/api/product/?category={rng.choice(category_ids)}&limit={limit}"
+
+    def deep_page_url(self, client, rng, category_ids, limit, depth=5):
+        url = self.first_page_url(rng, category_ids, limit)
+        base = url
+        for _ in range(depth):
+            cursor = client.get(url).json()["next_cursor"]
+            if not cursor:
+                break
+            url = f"{base}&cursor={cursor}"
+        return url
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from product import search
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the catalog full-text search index from the Category and Product tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total = search.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} documents."))
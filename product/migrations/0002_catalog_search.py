@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    from product.search import create_schema
+    create_schema(schema_editor)
+
+
+def drop_search_table(apps, schema_editor):
+    from product.search import drop_schema
+    drop_schema(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -1,3 +1,33 @@
 from django.db import models
+from django.db.models import Q
 
-# Create your models here.
+from category.models import Category
+
+
+class Product(models.Model):
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
+    name = models.CharField(max_length=255)
+    sku = models.CharField(max_length=64, unique=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    stock = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.sku})"
+
+    class Meta:
+        verbose_name = 'Product'
+        verbose_name_plural = 'Products'
+        ordering = ['price', 'id']
+        # Partial indexes for the public listing (category + is_active + price),
+        # keyset-paginated on (price, id). Django renders is_active=True as a
+        # bare boolean column, which SQLite can only match against an index
+        # condition, not an equality column.
+        indexes = [
+            models.Index(fields=['category', 'price', 'id'], condition=Q(is_active=True),
+                         name='product_active_listing_idx'),
+            models.Index(fields=['price', 'id'], condition=Q(is_active=True),
+                         name='product_active_price_idx'),
+        ]
@@ -0,0 +1,177 @@
+"""
+Catalog full-text search.
+
+SQLite: an FTS5 virtual table with prefix indexes, ranked by bm25().
+PostgreSQL: a plain table with a weighted tsvector column and a GIN index,
+ranked by ts_rank(). Other backends fall back to icontains on names.
+
+Rows are addressed by a synthetic rowid (object id * 2 + kind code), so
+upserts and deletes are primary-key operations on both backends.
+"""
+import re
+
+from django.db import connection
+
+from category.models import Category
+from .models import Product
+
+TABLE = "catalog_search"
+KINDS = {"category": 0, "product": 1}
+KIND_NAMES = {code: name for name, code in KINDS.items()}
+MAX_TERMS = 8
+
+
+def _rowid(kind, object_id):
+    return object_id * 2 + KINDS[kind]
+
+
+def _document(obj):
+    if isinstance(obj, Category):
+        return "category", obj.name, ""
+    return "product", obj.name, obj.sku
+
+
+def create_schema(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {TABLE} USING fts5("
+            "title, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE TABLE {TABLE} (id bigint PRIMARY KEY, title text NOT NULL, "
+            "body text NOT NULL, document tsvector NOT NULL)"
+        )
+        schema_editor.execute(f"CREATE INDEX {TABLE}_document_idx ON {TABLE} USING GIN (document)")
+
+
+def drop_schema(schema_editor):
+    if schema_editor.connection.vendor in ("sqlite", "postgresql"):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def index(objects):
+    """Adds or replaces the search documents for Category/Product instances.
+    Inactive objects are removed instead."""
+    if connection.vendor not in ("sqlite", "postgresql") or not objects:
+        return
+    rows, stale = [], []
+    for obj in objects:
+        kind, title, body = _document(obj)
+        rowid = _rowid(kind, obj.pk)
+        if obj.is_active:
+            rows.append((rowid, title, body))
+        else:
+            stale.append(rowid)
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            # FTS5 has no upsert; delete-then-insert by rowid is two index lookups.
+            cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(row[0],) for row in rows] + [(r,) for r in stale])
+            cursor.executemany(f"INSERT INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)", rows)
+        else:
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (id, title, body, document) VALUES (%s, %s, %s, "
+                "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')) "
+                "ON CONFLICT (id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body, "
+                "document = EXCLUDED.document",
+                [(rowid, title, body, title, body) for rowid, title, body in rows],
+            )
+            if stale:
+                cursor.execute(f"DELETE FROM {TABLE} WHERE id = ANY(%s)", [stale])
+
+
+def remove(kind, object_ids):
+    if connection.vendor not in ("sqlite", "postgresql") or not object_ids:
+        return
+    key = "rowid" if connection.vendor == "sqlite" else "id"
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {TABLE} WHERE {key} = %s", [(_rowid(kind, pk),) for pk in object_ids]
+        )
+
+
+def rebuild(batch_size=2000):
+    """Re-indexes every active category and product. Returns the document count."""
+    if connection.vendor in ("sqlite", "postgresql"):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE}")
+    total = 0
+    for queryset in (
+        Category.objects.filter(is_active=True).only("id", "name", "is_active"),
+        Product.objects.filter(is_active=True).only("id", "name", "sku", "is_active"),
+    ):
+        batch = []
+        for obj in queryset.iterator(chunk_size=batch_size):
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                index(batch)
+                total += len(batch)
+                batch = []
+        index(batch)
+        total += len(batch)
+    return total
+
+
+def search(query, kind=None, limit=20):
+    """
+    Returns [{"type", "id", "title", "rank"}] best match first. Every term
+    is prefix-matched and all terms must match.
+    """
+    terms = re.findall(r"\w+", query.lower())[:MAX_TERMS]
+    if not terms:
+        return []
+
+    if connection.vendor == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        sql = (
+            f"SELECT rowid, title, bm25({TABLE}, 10.0, 1.0) AS score FROM {TABLE} "
+            f"WHERE {TABLE} MATCH %s"
+        )
+        params = [match]
+        if kind:
+            sql += " AND rowid %% 2 = %s"
+            params.append(KINDS[kind])
+        sql += " ORDER BY score LIMIT %s"
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = [(rowid, title, -score) for rowid, title, score in cursor.fetchall()]
+    elif connection.vendor == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        sql = (
+            f"SELECT id, title, ts_rank(document, q) AS score FROM {TABLE}, "
+            "to_tsquery('simple', %s) q WHERE document @@ q"
+        )
+        params = [tsquery]
+        if kind:
+            sql += " AND id %% 2 = %s"
+            params.append(KINDS[kind])
+        sql += " ORDER BY score DESC LIMIT %s"
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+    else:
+        return _fallback_search(terms, kind, limit)
+
+    return [
+        {"type": KIND_NAMES[rowid % 2], "id": rowid // 2, "title": title, "rank": round(score, 6)}
+        for rowid, title, score in rows
+    ]
+
+
+def _fallback_search(terms, kind, limit):
+    results = []
+    for name, model in (("category", Category), ("product", Product)):
+        if kind and kind != name:
+            continue
+        queryset = model.objects.filter(is_active=True)
+        for term in terms:
+            queryset = queryset.filter(name__icontains=term)
+        results += [
+            {"type": name, "id": pk, "title": title, "rank": 0.0}
+            for pk, title in queryset.values_list("id", "name")[:limit]
+        ]
+    return results[:limit]
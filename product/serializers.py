@@ -0,0 +1,52 @@
+from rest_framework import serializers
+
+from category.pagination import KeysetPagination
+from .models import Product
+
+product_keyset = KeysetPagination(Product, "price", descending=False)
+
+# Columns loaded for list/detail responses; keep in sync with product_row().
+# category__updated_at feeds the detail validators (see ProductAPIView.get).
+PRODUCT_ROW_FIELDS = (
+    "id", "name", "sku", "price", "stock", "is_active", "updated_at",
+    "category_id", "category__name", "category__updated_at",
+)
+
+
+def product_row(product):
+    """
+    Hand-written representation for list responses. Avoids building a DRF
+    serializer field graph per row, which dominates the cost of large pages.
+    """
+    return {
+        "id": product.id,
+        "name": product.name,
+        "sku": product.sku,
+        "price": str(product.price),
+        "stock": product.stock,
+        "is_active": product.is_active,
+        "category": {"id": product.category_id, "name": product.category.name},
+    }
+
+
+class ProductListQuerySerializer(serializers.Serializer):
+    """Validates list query parameters (?category=, ?is_active=, ?min_price=, ?max_price=, ?cursor=, ?limit=)."""
+    category = serializers.IntegerField(required=False, min_value=1)
+    is_active = serializers.BooleanField(required=False, default=True)
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=200, default=50)
+
+    def validate_cursor(self, value):
+        try:
+            return product_keyset.decode_cursor(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """Validates search parameters (?q=, ?type=, ?limit=)."""
+    q = serializers.CharField(max_length=200)
+    type = serializers.ChoiceField(choices=["category", "product"], required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=50, default=20)
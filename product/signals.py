@@ -0,0 +1,39 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from category.models import Category
+from category.signals import categories_bulk_deleted, categories_bulk_saved, defer_delete
+from .models import Product
+from . import search
+
+# Search documents are written in the same transaction as the row, so a
+# rolled-back write never leaves a stale document behind.
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Product)
+def catalog_saved(sender, instance, **kwargs):
+    search.index([instance])
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    if not defer_delete(instance):
+        search.remove("category", [instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    if not defer_delete(instance):
+        search.remove("product", [instance.pk])
+
+
+@receiver(categories_bulk_saved)
+def categories_bulk_saved_handler(sender, instances, **kwargs):
+    search.index(instances)
+
+
+@receiver(categories_bulk_deleted)
+def categories_bulk_deleted_handler(sender, deleted, **kwargs):
+    search.remove("category", sorted(deleted.get(Category, ())))
+    search.remove("product", sorted(deleted.get(Product, ())))
@@ -1,3 +1,110 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from category.models import Category
+from restserver.benchmark import LOCMEM_CACHES
+from restserver.testing import query_budget
+
+from . import search
+from .models import Product
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductQueryBudgetTests(TestCase):
+    """
+    Query budgets for the product routes. Budgets don't depend on the number
+    of rows, so a regression to per-row queries fails here.
+    """
+    rows = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = Category.objects.bulk_create(Category(name=f"Category {i}") for i in range(10))
+        Product.objects.bulk_create(
+            Product(
+                category=categories[i % len(categories)], name=f"Widget {i}", sku=f"SKU-{i:06d}",
+                price=Decimal(i % 500) + Decimal("0.99"), stock=i % 7,
+            )
+            for i in range(cls.rows)
+        )
+        search.rebuild()
+        cls.product = Product.objects.order_by("id").first()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_pages(self):
+        url = reverse("product-list")
+        with query_budget(1):
+            response = self.client.get(url, {"limit": 100})
+        self.assertEqual(response.status_code, 200)
+        with query_budget(1):
+            response = self.client.get(url, {"limit": 100, "cursor": response.json()["next_cursor"]})
+        self.assertEqual(len(response.json()["data"]), 100)
+
+    def test_list_filtered(self):
+        with query_budget(1):
+            response = self.client.get(
+                reverse("product-list"), {"category": self.product.category_id, "min_price": "10", "limit": 50}
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail(self):
+        with query_budget(1):
+            response = self.client.get(reverse("product-detail", args=[self.product.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_search(self):
+        # Titles come from the index itself; no per-hit lookups.
+        with query_budget(1):
+            response = self.client.get(reverse("catalog-search"), {"q": "widg"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["data"])
+
+
+class ProductQueryBudget10kTests(ProductQueryBudgetTests):
+    rows = 10000
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Tools")
+        cls.product = Product.objects.create(category=category, name="Hammer", sku="SKU-1", price=Decimal("9.99"))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_detail(self):
+        url = reverse("product-detail", args=[self.product.pk])
+        response = self.client.get(url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        for headers in ({"HTTP_IF_NONE_MATCH": etag}, {"HTTP_IF_MODIFIED_SINCE": last_modified}):
+            response = self.client.get(url, **headers)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response["ETag"], etag)
+
+        self.product.price = Decimal("11.99")
+        self.product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_category_rename(self):
+        url = reverse("product-detail", args=[self.product.pk])
+        etag = self.client.get(url)["ETag"]
+        self.product.category.name = "Hand tools"
+        self.product.category.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["data"]["category"]["name"], "Hand tools")
+
+    def test_bad_cursor(self):
+        response = self.client.get(reverse("product-list"), {"cursor": "garbage!"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("cursor", response.json()["errors"])
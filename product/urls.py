@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import ProductAPIView, SearchAPIView
+
+urlpatterns = [
+    path('', ProductAPIView.as_view(), name='product-list'),
+    path('<int:pk>/', ProductAPIView.as_view(), name='product-detail'),
+    path('search/', SearchAPIView.as_view(), name='catalog-search'),
+]
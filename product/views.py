@@ -1,3 +1,99 @@
-from django.shortcuts import render
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status, permissions
 
-# Create your views here.
+from category.conditional import make_validators, not_modified, set_validators
+from restserver.metrics import timed
+from .models import Product
+from .serializers import (
+    PRODUCT_ROW_FIELDS, ProductListQuerySerializer, SearchQuerySerializer, product_keyset, product_row
+)
+from . import search
+
+
+class ProductAPIView(APIView):
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        return Product.objects.select_related("category").only(*PRODUCT_ROW_FIELDS)
+
+    # 🔓 GET (List or Detail)
+    def get(self, request, pk=None):
+        if pk:
+            product = self.get_queryset().filter(pk=pk).first()
+            if not product:
+                return Response({
+                    "status": "error",
+                    "message": "Product not found"
+                }, status=status.HTTP_404_NOT_FOUND)
+
+            # The body embeds the category's name, so renaming the category
+            # must change the validators too.
+            category = product.category
+            etag, last_modified = make_validators(
+                max(product.updated_at, category.updated_at), product.pk, category.name
+            )
+            response = not_modified(request, etag, last_modified)
+            if response is not None:
+                return response
+
+            with timed("serializer"):
+                data = product_row(product)
+            response = Response({
+                "status": "success",
+                "message": "Product retrieved successfully",
+                "data": data
+            }, status=status.HTTP_200_OK)
+            return set_validators(response, etag, last_modified)
+
+        query = ProductListQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({
+                "status": "error",
+                "message": "Validation failed",
+                "errors": query.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+
+        products = self.get_queryset().filter(is_active=params["is_active"])
+        if "category" in params:
+            products = products.filter(category_id=params["category"])
+        if "min_price" in params:
+            products = products.filter(price__gte=params["min_price"])
+        if "max_price" in params:
+            products = products.filter(price__lte=params["max_price"])
+
+        products, next_cursor = product_keyset.paginate(products, params["limit"], params.get("cursor"))
+        with timed("serializer"):
+            data = [product_row(product) for product in products]
+        return Response({
+            "status": "success",
+            "message": "Products retrieved successfully",
+            "data": data,
+            "next_cursor": next_cursor
+        }, status=status.HTTP_200_OK)
+
+
+class SearchAPIView(APIView):
+    """Prefix-matching, ranked full-text search over active categories and products."""
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    # 🔓 GET (Search)
+    def get(self, request):
+        query = SearchQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({
+                "status": "error",
+                "message": "Validation failed",
+                "errors": query.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+
+        results = search.search(params["q"], kind=params.get("type"), limit=params["limit"])
+        return Response({
+            "status": "success",
+            "message": "Search results retrieved successfully",
+            "data": results
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,219 @@
+"""
+Shared helpers for the `manage.py bench_*` commands: a throwaway database,
+locmem cache, in-memory Celery broker, throttle bypass, latency statistics
+and a fake SMTP relay.
+"""
+import copy
+import os
+import queue
+import shutil
+import socketserver
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_databases, teardown_databases,
+)
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "bench",
+    }
+}
+
+
+@contextmanager
+def throwaway_database(verbosity=0, concurrent=False):
+    """
+    Runs the block against a freshly migrated test database and a locmem
+    cache, so benchmarks never touch db.sqlite3 or the shared Redis.
+
+    The default in-memory SQLite database can't take writes from several
+    threads at once; with concurrent=True a temporary file in WAL mode with
+    IMMEDIATE transactions and a busy timeout is used instead.
+    """
+    settings_dict = connections["default"].settings_dict
+    saved = copy.deepcopy(settings_dict)
+    tmpdir = None
+    if concurrent and settings_dict["ENGINE"] == "django.db.backends.sqlite3":
+        tmpdir = tempfile.mkdtemp(prefix="bench-")
+        settings_dict["TEST"]["NAME"] = os.path.join(tmpdir, "bench.sqlite3")
+        settings_dict["OPTIONS"].update({
+            "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;",
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 30,
+        })
+    old_config = setup_databases(verbosity, interactive=False, aliases={"default"})
+    try:
+        with override_settings(CACHES=LOCMEM_CACHES):
+            yield
+    finally:
+        teardown_databases(old_config, verbosity)
+        settings_dict.clear()
+        settings_dict.update(saved)
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def use_memory_broker():
+    """
+    Points Celery at an in-memory broker and result backend. Celery reads
+    these from the environment when the app is first configured, so call this
+    before anything touches the Celery app.
+    """
+    os.environ["CELERY_BROKER_URL"] = "memory://"
+    os.environ["CELERY_RESULT_BACKEND"] = "cache+memory://"
+
+
+@contextmanager
+def bypass_throttles():
+    with mock.patch("rest_framework.views.APIView.check_throttles", lambda self, request: None):
+        yield
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, query_counts=None):
+    """latencies in seconds; returns milliseconds rounded for reporting."""
+    summary = {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+    }
+    if query_counts is not None:
+        summary["queries_per_request"] = round(statistics.fmean(query_counts), 2) if query_counts else 0.0
+    return summary
+
+
+def run_concurrently(jobs, concurrency):
+    """
+    Runs callables taking a django.test.Client on `concurrency` threads, each
+    with its own client and DB connection. Returns (records, wall_seconds)
+    where a record is (seconds, query_count, status_code).
+    """
+    pending = queue.SimpleQueue()
+    for job in jobs:
+        pending.put(job)
+    records = []
+    lock = threading.Lock()
+
+    def worker():
+        client = Client()
+        try:
+            while True:
+                try:
+                    job = pending.get_nowait()
+                except queue.Empty:
+                    return
+                response, elapsed, queries = timed_call(job, client)
+                with lock:
+                    records.append((elapsed, queries, response.status_code))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(max(1, concurrency))]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records, time.perf_counter() - start
+
+
+def timed_call(func, *args, **kwargs):
+    """Returns (result, seconds, query_count)."""
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+    return result, elapsed, len(queries)
+
+
+# --------------------------
+# Fake SMTP server
+# --------------------------
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for Django's backend (no TLS, no auth)."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        time.sleep(server.connect_delay)  # greeting + TLS handshake stand-in
+        server.sessions += 1
+        self.reply("220 fake-smtp ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 fake-smtp")
+            elif command.startswith("DATA"):
+                self.reply("354 end with <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                time.sleep(server.message_delay)
+                server.messages += 1
+                self.reply("250 OK queued")
+            elif command.startswith("QUIT"):
+                self.reply("221 bye")
+                return
+            else:  # MAIL, RCPT, RSET, NOOP
+                self.reply("250 OK")
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Local SMTP sink with configurable latency, used to compare delivery
+    strategies without a real relay. Counts sessions and messages.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 1024  # the default of 5 drops SYNs under concurrent connects
+
+    def __init__(self, connect_delay=0.0, message_delay=0.0):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.connect_delay = connect_delay
+        self.message_delay = message_delay
+        self.sessions = 0
+        self.messages = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def email_settings(self):
+        return {
+            "EMAIL_BACKEND": "django.core.mail.backends.smtp.EmailBackend",
+            "EMAIL_HOST": "127.0.0.1",
+            "EMAIL_PORT": self.port,
+            "EMAIL_USE_TLS": False,
+            "EMAIL_USE_SSL": False,
+            "EMAIL_HOST_USER": "",
+            "EMAIL_HOST_PASSWORD": "",
+        }
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
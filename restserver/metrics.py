@@ -0,0 +1,208 @@
+"""
+Per-request performance metrics.
+
+PerformanceMiddleware (restserver.middleware) opens a RequestMetrics for each
+request; code further down adds to it through timed() and record_cache().
+Finished requests are folded into process-wide histograms that metrics_view
+exposes in the Prometheus text format.
+
+Histograms live in process memory, so each worker reports its own numbers;
+scrape every worker (or sum them in Prometheus) for the full picture.
+"""
+import ipaddress
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    __slots__ = ("started", "db_queries", "db_time", "cache_hits", "cache_misses", "phases", "statements")
+
+    def __init__(self, record_queries=False):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.phases = {}
+        # Raw SQL of every query, only kept when settings.PERF_LOG_QUERIES is on.
+        self.statements = [] if record_queries else None
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        """connection.execute_wrapper() hook."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.db_queries += 1
+            if self.statements is not None:
+                self.statements.append(sql)
+
+
+def start_request(record_queries=False):
+    metrics = RequestMetrics(record_queries)
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timed(phase):
+    """Adds the block's duration to the current request's `phase` total."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.phases[phase] = metrics.phases.get(phase, 0.0) + time.perf_counter() - start
+
+
+def record_cache(hit):
+    metrics = _current.get()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+# --------------------------
+# Aggregation
+# --------------------------
+def _labels(labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            base = _labels(labels)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        if not amount:
+            return
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._series)
+        for labels, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{{{_labels(labels)}}} {value}")
+        return lines
+
+
+REQUESTS = Counter("http_requests_total", "Requests by route, method and status.")
+DURATION = Histogram("http_request_duration_seconds", "Wall time per request.", DURATION_BUCKETS)
+DB_QUERIES = Histogram("http_request_db_queries", "Database queries per request.", QUERY_BUCKETS)
+DB_DURATION = Histogram("http_request_db_duration_seconds", "Database time per request.", DURATION_BUCKETS)
+SERIALIZER_DURATION = Histogram(
+    "http_request_serializer_duration_seconds", "Serializer time per request.", DURATION_BUCKETS
+)
+CACHE = Counter("http_request_cache_total", "Cache lookups made while serving requests, by result.")
+
+METRICS = (REQUESTS, DURATION, DB_QUERIES, DB_DURATION, SERIALIZER_DURATION, CACHE)
+
+
+def observe(route, method, status, metrics, duration):
+    labels = (("route", route), ("method", method))
+    REQUESTS.inc(labels + (("status", status),))
+    DURATION.observe(labels, duration)
+    DB_QUERIES.observe(labels, metrics.db_queries)
+    DB_DURATION.observe(labels, metrics.db_time)
+    if "serializer" in metrics.phases:
+        SERIALIZER_DURATION.observe(labels, metrics.phases["serializer"])
+    CACHE.inc((("route", route), ("result", "hit")), metrics.cache_hits)
+    CACHE.inc((("route", route), ("result", "miss")), metrics.cache_misses)
+
+
+def render_prometheus():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _internal_client(request):
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return address.is_loopback or address.is_private
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. When METRICS_TOKEN is set the scraper must
+    send it as a bearer token; otherwise only loopback and private addresses
+    may scrape. Behind a reverse proxy every request comes from an internal
+    address, so set METRICS_TOKEN there.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not constant_time_compare(supplied, token):
+            return HttpResponseForbidden()
+    elif not _internal_client(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
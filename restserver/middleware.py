@@ -0,0 +1,68 @@
+import json
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from superadmin.utils import CustomLogger
+
+from . import metrics
+from .sql import normalize
+
+perf_logger = CustomLogger("perf")
+
+
+def _route(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name if match.url_name else match.route
+
+
+class PerformanceMiddleware:
+    """
+    Records wall time, DB queries and time, cache hits/misses and serializer
+    time for every request. Sent back as a Server-Timing header, logged as one
+    JSON line to logs/perf and aggregated for /metrics. With
+    PERF_LOG_QUERIES on, the line also lists the request's distinct
+    normalized SQL statements (input for manage.py index_audit).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics, token = metrics.start_request(settings.PERF_LOG_QUERIES)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(request_metrics.db_wrapper))
+                response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        duration = request_metrics.elapsed()
+
+        route = _route(request)
+        serializer_time = request_metrics.phases.get("serializer", 0.0)
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={request_metrics.db_time * 1000:.1f};desc="{request_metrics.db_queries} queries"',
+            f'cache;desc="{request_metrics.cache_hits} hits, {request_metrics.cache_misses} misses"',
+            f"ser;dur={serializer_time * 1000:.1f}",
+            f"total;dur={duration * 1000:.1f}",
+        ])
+
+        metrics.observe(route, request.method, response.status_code, request_metrics, duration)
+        entry = {
+            "route": route,
+            "method": request.method,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 2),
+            "db_queries": request_metrics.db_queries,
+            "db_ms": round(request_metrics.db_time * 1000, 2),
+            "cache_hits": request_metrics.cache_hits,
+            "cache_misses": request_metrics.cache_misses,
+            "serializer_ms": round(serializer_time * 1000, 2),
+        }
+        if request_metrics.statements is not None:
+            entry["queries"] = list(dict.fromkeys(map(normalize, request_metrics.statements)))
+        perf_logger.log("info", json.dumps(entry))
+        return response
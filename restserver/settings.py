@@ -29,6 +29,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'restserver.middleware.PerformanceMiddleware',  # first, so its timing covers the others
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -41,6 +42,11 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'restserver.urls'
 
+# Bearer token required by /metrics; when empty only loopback and private addresses may scrape.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Adds each request's normalized SQL to its logs/perf line; manage.py index_audit reads them.
+PERF_LOG_QUERIES = os.getenv('PERF_LOG_QUERIES', '').lower() in ('1', 'true', 'yes')
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -113,6 +119,10 @@ CELERY_ACCEPT_CONTENT = os.getenv('CELERY_ACCEPT_CONTENT', 'application/json').s
 CELERY_TASK_SERIALIZER =os.getenv('CELERY_TASK_SERIALIZER', 'json')
 CELERY_RESULT_SERIALIZER = os.getenv('CELERY_RESULT_SERIALIZER', 'json')
 CELERY_TIMEZONE = os.getenv('TIME_ZONE')
+CELERY_TASK_ROUTES = {
+    'superadmin.tasks.send_otp_email': {'queue': 'otp'},
+    'superadmin.tasks.import_users': {'queue': 'imports'},
+}
 USE_I18N = True
 TIME_ZONE = os.getenv('TIME_ZONE')
 USE_TZ = True
@@ -126,6 +136,7 @@ CACHES = {
 }
 
 
+# Requires Redis >= 6.2: the email outbox claims messages with LMOVE.
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
@@ -158,7 +169,13 @@ REST_FRAMEWORK = {
     ),
 }
 
-CELERY_BEAT_SCHEDULE = {}
+CELERY_BEAT_SCHEDULE = {
+    # Safety net for the email outbox in case a scheduled drain was lost.
+    'drain-email-outbox': {
+        'task': 'superadmin.tasks.drain_email_outbox',
+        'schedule': 60.0,
+    },
+}
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -172,7 +189,7 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760
 IMPORT_EXPORT_USE_TRANSACTIONS = True
 
 PASSWORD_HASHERS = [
-    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'superadmin.hashers.TunableArgon2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
 ]
@@ -180,15 +197,17 @@ PASSWORD_HASHERS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'superadmin.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'superadmin.throttles.AnonRateThrottle',
+        'superadmin.throttles.UserRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '60/min',
         'user': '150/min',
-        'login': '10/min',      # used by custom throttle if you define scope 'login'
+        'login': '10/min',      # per IP, LoginCustomer
+        'otp': '10/min',        # per IP, shared by OTP send/verify and password reset
+        'signup': '10/hour',    # per IP, CustomerViews
     }
 }
@@ -0,0 +1,64 @@
+"""
+Light-weight SQL text helpers shared by query budgets, the perf log and
+`manage.py index_audit`. They work on the SQL Django generates (quoted
+identifiers, uppercase keywords, U0/T3 style aliases), not arbitrary SQL.
+"""
+import re
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.I)
+
+_TABLE = re.compile(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+"(\w+)"(?:\s+(?:AS\s+)?"?([A-Z]\d+)\b"?)?')
+_COLUMN = re.compile(r'(?:"(\w+)"|\b([A-Z]\d+))\."(\w+)"')
+_PREDICATE_START = re.compile(r"\b(?:WHERE|ON|ORDER BY|GROUP BY)\b")
+_SELECT = re.compile(r"\bSELECT\b")
+_MIN_MAX = re.compile(r"\b(?:MIN|MAX)\(([^()]*)\)")
+
+
+def normalize(sql):
+    """Replaces literals and IN lists so queries differing only in values compare equal."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return " ".join(sql.split())
+
+
+def statement_kind(sql):
+    """'SELECT', 'INSERT', 'UPDATE', 'DELETE', ... (first keyword)."""
+    return sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+
+
+def written_table(sql):
+    """Target table of an INSERT/UPDATE/DELETE, else None."""
+    if statement_kind(sql) not in ("INSERT", "UPDATE", "DELETE"):
+        return None
+    match = _TABLE.search(sql)
+    return match.group(1) if match else None
+
+
+def predicate_columns(sql):
+    """
+    (table, column) pairs used in WHERE / JOIN ON / ORDER BY / GROUP BY
+    clauses or inside MIN()/MAX(), in order of first use. Heuristic: within
+    each SELECT (or the UPDATE/DELETE itself) everything after the first
+    predicate keyword counts, so a subquery's select list is attributed as
+    a predicate too.
+    """
+    aliases = {}
+    for table, alias in _TABLE.findall(sql):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+
+    found = []
+    for part in _SELECT.split(sql):
+        start = _PREDICATE_START.search(part)
+        clauses = _MIN_MAX.findall(part)
+        if start is not None:
+            clauses.append(part[start.start():])
+        for quoted, alias, column in _COLUMN.findall(" ".join(clauses)):
+            table = aliases.get(quoted or alias)
+            if table and (table, column) not in found:
+                found.append((table, column))
+    return found
@@ -0,0 +1,115 @@
+"""
+Streaming JSON list responses for large tables.
+
+    encoder = RowEncoder(CategorySerializer)
+    return stream_list(Category.objects.order_by("id"), encoder,
+                       {"status": "success", "message": "..."})
+
+The queryset is read with values_list().iterator(chunk_size=...), so only one
+chunk of rows is held at a time, and each row is encoded with converters and
+a JSON template built once per encoder instead of a serializer per row. The
+first bytes (the envelope) go out before the first query finishes fetching.
+"""
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.http import StreamingHttpResponse
+from rest_framework.fields import ReadOnlyField
+
+# Matches DRF's JSONRenderer defaults (UNICODE_JSON, COMPACT_JSON).
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def _identity(value):
+    return value
+
+
+class RowEncoder:
+    """
+    Encodes values_list() rows the way `serializer_class` would represent the
+    model. Fields backed by a model column use the serializer field's
+    to_representation; anything else (properties) must be given in `derived`
+    as name -> (columns, function of those column values).
+    """
+    def __init__(self, serializer_class, fields=None, derived=None):
+        serializer_fields = serializer_class().fields
+        model = serializer_class.Meta.model
+        names = list(fields or serializer_fields.keys())
+        derived = derived or {}
+
+        self.columns = []
+        converters = []
+        for name in names:
+            if name in derived:
+                sources, function = derived[name]
+                positions = [self._column(source) for source in sources]
+                converters.append(self._derived(positions, function))
+                continue
+            field = serializer_fields[name]
+            try:
+                model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise ValueError(f"{serializer_class.__name__}.{name} isn't a model column; pass it in `derived`.")
+            position = self._column(field.source)
+            convert = _identity if isinstance(field, ReadOnlyField) else field.to_representation
+            converters.append(self._direct(position, convert))
+
+        self.names = names
+        self._converters = converters
+        # '{"id":%s,"name":%s}' — only the values are encoded per row.
+        self._template = "{" + ",".join(
+            _encode(name).replace("%", "%%") + ":%s" for name in names
+        ) + "}"
+
+    def _column(self, name):
+        if name not in self.columns:
+            self.columns.append(name)
+        return self.columns.index(name)
+
+    @staticmethod
+    def _direct(position, convert):
+        def converter(row):
+            value = row[position]
+            return "null" if value is None else _encode(convert(value))
+        return converter
+
+    @staticmethod
+    def _derived(positions, function):
+        def converter(row):
+            return _encode(function(*(row[position] for position in positions)))
+        return converter
+
+    def encode(self, row):
+        return self._template % tuple(convert(row) for convert in self._converters)
+
+
+def iter_json_list(queryset, encoder, envelope=None, key="data", chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields `envelope` as a JSON object with `key` holding the encoded rows,
+    one chunk of rows per yielded string.
+    """
+    head = _encode(envelope)[:-1] + "," if envelope else "{"
+    yield head + _encode(key) + ":["
+
+    rows = queryset.values_list(*encoder.columns).iterator(chunk_size=chunk_size)
+    batch = []
+    separator = ""
+    for row in rows:
+        batch.append(encoder.encode(row))
+        if len(batch) == chunk_size:
+            yield separator + ",".join(batch)
+            separator = ","
+            batch = []
+    if batch:
+        yield separator + ",".join(batch)
+    yield "]}"
+
+
+def stream_list(queryset, encoder, envelope=None, key="data", chunk_size=DEFAULT_CHUNK_SIZE, status=200):
+    return StreamingHttpResponse(
+        (part.encode() for part in iter_json_list(queryset, encoder, envelope, key, chunk_size)),
+        content_type="application/json",
+        status=status,
+    )
@@ -0,0 +1,67 @@
+"""
+Query-budget assertions for tests.
+
+    with query_budget(2):
+        self.client.get(url)
+
+    @query_budget(2)
+    def test_list(self):
+        ...
+
+The block fails when it runs more than `max_queries` queries, or when the
+same query shape (literals and IN lists normalised away) runs more than
+`max_similar` times, which is what an N+1 looks like. Transaction control
+statements (BEGIN, COMMIT, SAVEPOINT, ...) are not counted, so wrapping a
+write in atomic() doesn't eat into the budget.
+"""
+import re
+from collections import Counter
+from contextlib import ContextDecorator
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from .sql import normalize
+
+_TRANSACTION_CONTROL = re.compile(r"^\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE\s+SAVEPOINT)\b", re.I)
+
+
+def _shorten(sql, limit=300):
+    return sql if len(sql) <= limit else sql[:limit] + " ..."
+
+
+class query_budget(ContextDecorator):
+    def __init__(self, max_queries, max_similar=1, using="default"):
+        self.max_queries = max_queries
+        self.max_similar = max_similar
+        self.using = using
+        self.queries = []
+
+    def __enter__(self):
+        self._capture = CaptureQueriesContext(connections[self.using])
+        self._capture.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._capture.__exit__(exc_type, exc_value, traceback)
+        self.queries = [
+            query["sql"] for query in self._capture.captured_queries
+            if not _TRANSACTION_CONTROL.match(query["sql"])
+        ]
+        if exc_type is None:
+            self.check()
+        return False
+
+    def check(self):
+        problems = []
+        if len(self.queries) > self.max_queries:
+            problems.append(f"{len(self.queries)} queries run, budget is {self.max_queries}")
+        repeated = [
+            (shape, count) for shape, count in Counter(map(normalize, self.queries)).items()
+            if count > self.max_similar
+        ]
+        for shape, count in repeated:
+            problems.append(f"{count} similar queries (max {self.max_similar}): {shape}")
+        if problems:
+            listing = "\n".join(f"{i}. {_shorten(sql)}" for i, sql in enumerate(self.queries, start=1))
+            raise AssertionError("; ".join(problems) + "\nCaptured queries were:\n" + listing)
@@ -1,9 +1,12 @@
 from django.contrib import admin
 from django.urls import path , include
+from .metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/superadmin/', include('superadmin.urls')),
     path('api/category/', include('category.urls')),
+    path('api/product/', include('product.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
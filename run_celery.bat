@@ -10,6 +10,14 @@ REM ---- Start Celery Worker ----
 echo Starting Celery Worker...
 start "Celery Worker" cmd /k "celery -A restserver worker --pool=eventlet -c 1000 --loglevel=info"
 
+REM ---- Start dedicated OTP Worker ----
+echo Starting Celery OTP Worker...
+start "Celery OTP Worker" cmd /k "celery -A restserver worker --pool=eventlet -c 100 -Q otp -n otp@%%h --loglevel=info"
+
+REM ---- Start User Import Worker (CPU bound, solo pool) ----
+echo Starting Celery Import Worker...
+start "Celery Import Worker" cmd /k "celery -A restserver worker --pool=solo -Q imports -n imports@%%h --loglevel=info"
+
 REM ---- Start Celery Beat ----
 echo Starting Celery Beat...
 start "Celery Beat" cmd /k "celery -A restserver beat --loglevel=info"
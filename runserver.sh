@@ -19,6 +19,31 @@ nohup celery -A restserver worker \
 WORKER_PID=$!
 echo "Celery Worker started with PID: $WORKER_PID"
 
+# Start dedicated OTP Worker (login codes never wait behind bulk mail)
+echo "Starting Celery OTP Worker..."
+nohup celery -A restserver worker \
+    --pool=eventlet \
+    -c 100 \
+    -Q otp \
+    -n otp@%h \
+    --loglevel=info \
+    > celery_otp_worker.log 2>&1 &
+
+OTP_WORKER_PID=$!
+echo "Celery OTP Worker started with PID: $OTP_WORKER_PID"
+
+# Start User Import Worker (CPU bound; solo pool so it can fork hashing workers)
+echo "Starting Celery Import Worker..."
+nohup celery -A restserver worker \
+    --pool=solo \
+    -Q imports \
+    -n imports@%h \
+    --loglevel=info \
+    > celery_import_worker.log 2>&1 &
+
+IMPORT_WORKER_PID=$!
+echo "Celery Import Worker started with PID: $IMPORT_WORKER_PID"
+
 # Start Celery Beat
 echo "Starting Celery Beat..."
 nohup celery -A restserver beat \
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import UserProfile
+from .models import Company, UserImportJob, UserProfile
 
 # Register your models here.
 admin.site.register(UserProfile)
+admin.site.register(Company)
+admin.site.register(UserImportJob)
@@ -0,0 +1,109 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .config import Config
+from .models import UserProfile, ROLE_SUPERADMIN, ROLE_CUSTOMER
+from .tokens import is_token_revoked, issued_at_ms
+from .utils import get_versioned, set_versioned, bump_version
+
+# Fields kept in the cached snapshot. Anything else is deferred and loaded
+# lazily from the DB if a view actually touches it.
+SNAPSHOT_FIELDS = ("id", "email", "role", "is_active")
+
+
+def _version_key(user_id):
+    return f"auth:user:{user_id}:version"
+
+
+def _snapshot_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def invalidate_user_cache(user_id):
+    """Drops the cached auth snapshot for user_id once the current transaction commits."""
+    if user_id is None:
+        return
+    transaction.on_commit(lambda: bump_version(_version_key(user_id)))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that serves the authenticated UserProfile from a
+    versioned cache snapshot instead of a SELECT per request. The snapshot
+    version is bumped by UserProfile.save()/delete(), so role or is_active
+    changes take effect on the next request.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares the password hash, which is not cached.
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        version, snapshot = get_versioned(_version_key(user_id), _snapshot_key(user_id))
+        if snapshot is None:
+            user = super().get_user(validated_token)
+            set_versioned(
+                _snapshot_key(user_id), version,
+                tuple(getattr(user, name) for name in SNAPSHOT_FIELDS),
+                Config.AUTH_USER_CACHE_TTL,
+            )
+            return user
+
+        user = UserProfile.from_db(DEFAULT_DB_ALIAS, SNAPSHOT_FIELDS, snapshot)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+
+class RoleTokenUser(TokenUser):
+    """Stateless user backed by the role/is_active claims of RoleRefreshToken."""
+
+    @cached_property
+    def role(self):
+        return self.token.get("role")
+
+    @cached_property
+    def is_active(self):
+        return bool(self.token.get("is_active"))
+
+    @property
+    def is_superadmin(self):
+        return self.role == ROLE_SUPERADMIN
+
+    @property
+    def is_customer(self):
+        return self.role == ROLE_CUSTOMER
+
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Authenticates from token claims alone: no user SELECT and no user cache
+    lookup, only one denylist read for role/is_active revocations. Tokens
+    issued before role claims existed fall back to CachedJWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        if "role" not in validated_token:
+            return CachedJWTAuthentication().get_user(validated_token)
+
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = RoleTokenUser(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if is_token_revoked(user.id, issued_at_ms(validated_token)):
+            raise AuthenticationFailed(
+                _("Your permissions have changed, please log in again"), code="token_revoked"
+            )
+        return user
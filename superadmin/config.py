@@ -18,5 +18,33 @@ class Config:
     OTP_TTL_SECONDS = int(os.getenv('OTP_TTL_SECONDS', 300))  # 5 minutes
     OTP_RATE_LIMIT_WINDOW = int(os.getenv('OTP_RATE_LIMIT_WINDOW', 300))  # 5 min rate window
     OTP_RATE_LIMIT_MAX = int(os.getenv('OTP_RATE_LIMIT_MAX', 5))  # max 5 per window
+    OTP_MAX_ATTEMPTS = int(os.getenv('OTP_MAX_ATTEMPTS', 5))  # wrong guesses before the OTP is discarded
     ERROR_RECIPIENT = os.getenv('ERROR_RECIPIENT', 'admin@gxinetworks.com')
     REDIS_URL = os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/1')
+    CATEGORY_CACHE_TTL = int(os.getenv('CATEGORY_CACHE_TTL', 600))  # 10 minutes
+    AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 300))  # 5 minutes
+    ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', 2))
+    ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', 102400))  # KiB
+    ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', 8))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))  # 0 = hash inline
+    PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', 16))  # waiting jobs before 429
+    PASSWORD_HASH_RETRY_AFTER = int(os.getenv('PASSWORD_HASH_RETRY_AFTER', 1))  # seconds
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))  # seconds a request waits for its hash before 503
+    SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', 10))  # open connections per process
+    SMTP_POOL_ACQUIRE_TIMEOUT = float(os.getenv('SMTP_POOL_ACQUIRE_TIMEOUT', 30))  # seconds
+    SMTP_POOL_IDLE_TIMEOUT = int(os.getenv('SMTP_POOL_IDLE_TIMEOUT', 60))  # close connections idle longer than this
+    SMTP_POOL_HEALTHCHECK_INTERVAL = int(os.getenv('SMTP_POOL_HEALTHCHECK_INTERVAL', 15))  # NOOP before reuse after this idle
+    SMTP_POOL_MAX_MESSAGES = int(os.getenv('SMTP_POOL_MAX_MESSAGES', 100))  # messages per connection before reconnecting
+    EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 100))  # messages per SMTP session
+    EMAIL_OUTBOX_MAX_WAIT_MS = int(os.getenv('EMAIL_OUTBOX_MAX_WAIT_MS', 500))  # how long the first message waits for company
+    EMAIL_OUTBOX_DRAIN_SECONDS = int(os.getenv('EMAIL_OUTBOX_DRAIN_SECONDS', 30))  # time budget per drain task
+    EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))  # then dead-lettered
+    EMAIL_OUTBOX_RETRY_DELAY = int(os.getenv('EMAIL_OUTBOX_RETRY_DELAY', 60))  # seconds before failed messages are retried
+    EMAIL_OUTBOX_CLAIM_TIMEOUT = int(os.getenv('EMAIL_OUTBOX_CLAIM_TIMEOUT', 300))  # claimed but unsettled messages are requeued after this
+    EMAIL_OUTBOX_DEAD_TTL = int(os.getenv('EMAIL_OUTBOX_DEAD_TTL', 7 * 24 * 3600))  # dead-letter list expires this long after its last addition
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))  # records buffered per app before dropping
+    LOG_ALERT_DEDUP_SECONDS = int(os.getenv('LOG_ALERT_DEDUP_SECONDS', 300))  # identical critical alerts suppressed for
+    LOG_ALERT_RATE_LIMIT = int(os.getenv('LOG_ALERT_RATE_LIMIT', 10))  # critical alert emails per window
+    LOG_ALERT_RATE_WINDOW = int(os.getenv('LOG_ALERT_RATE_WINDOW', 3600))  # seconds
+    USER_IMPORT_CHUNK_SIZE = int(os.getenv('USER_IMPORT_CHUNK_SIZE', 1000))  # rows validated and inserted together
+    USER_IMPORT_MAX_ERRORS = int(os.getenv('USER_IMPORT_MAX_ERRORS', 1000))  # row errors kept on the job
@@ -0,0 +1,15 @@
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+from .config import Config
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2 with deployment-specific cost (ARGON2_TIME_COST / ARGON2_MEMORY_COST /
+    ARGON2_PARALLELISM). The algorithm name is unchanged, so existing hashes
+    keep verifying and are re-hashed with the new cost on the next login.
+    Use `manage.py bench_hashers` to pick values for the target hardware.
+    """
+    time_cost = Config.ARGON2_TIME_COST
+    memory_cost = Config.ARGON2_MEMORY_COST
+    parallelism = Config.ARGON2_PARALLELISM
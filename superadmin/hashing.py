@@ -0,0 +1,138 @@
+"""
+Password hashing off the request thread.
+
+Argon2 is deliberately CPU and memory heavy; running it inline lets a login
+storm occupy every web worker. Hashes run in a bounded process pool instead,
+and once PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE jobs are in flight
+new requests are rejected with 429 + Retry-After rather than queueing
+without limit, and a request that waits longer than PASSWORD_HASH_TIMEOUT
+for its hash gets 503.
+
+Workers load the settings module afresh, so each job carries the caller's
+PASSWORD_HASHERS; override_settings (tests, bench --fast-hashers) applies
+inside the pool too.
+"""
+import functools
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.test.utils import override_settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, Throttled
+
+from .config import Config
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_QUEUE_SIZE)
+
+
+class HashingBusy(Throttled):
+    """Raised when the hashing queue is full; DRF renders it as 429 with Retry-After."""
+    default_detail = "Server is busy, please retry shortly."
+    default_code = "hashing_busy"
+
+
+class HashingTimeout(APIException):
+    """Raised when a queued hash doesn't finish within PASSWORD_HASH_TIMEOUT."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Server is busy, please retry shortly."
+    default_code = "hashing_timeout"
+
+
+def _init_worker():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "restserver.settings")
+    import django
+    django.setup()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=Config.PASSWORD_HASH_WORKERS, initializer=_init_worker
+            )
+        return _executor
+
+
+def _with_hashers(hashers, fn, *args):
+    """Runs fn in a worker under the caller's PASSWORD_HASHERS."""
+    if hashers == settings.PASSWORD_HASHERS:
+        return fn(*args)
+    with override_settings(PASSWORD_HASHERS=hashers):
+        return fn(*args)
+
+
+def _run(fn, *args):
+    if Config.PASSWORD_HASH_WORKERS <= 0:
+        return fn(*args)
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy(wait=Config.PASSWORD_HASH_RETRY_AFTER)
+    executor = _get_executor()
+    try:
+        future = executor.submit(_with_hashers, list(settings.PASSWORD_HASHERS), fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    # The slot is held until the worker is done with the job, not just until
+    # this request stops waiting, so timed-out hashes still count as load.
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=Config.PASSWORD_HASH_TIMEOUT)
+    except TimeoutError:
+        future.cancel()
+        raise HashingTimeout()
+    except BrokenProcessPool:
+        _reset_executor(executor)
+        raise
+
+
+def _reset_executor(executor):
+    # A worker died (e.g. OOM-killed): stop the broken pool without waiting
+    # and start a fresh one next time.
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _verify(raw_password, encoded):
+    upgraded = []
+    valid = check_password(raw_password, encoded, setter=lambda raw: upgraded.append(make_password(raw)))
+    return valid, (upgraded[0] if upgraded else None)
+
+
+def hash_password(raw_password):
+    return _run(make_password, raw_password)
+
+
+def hash_passwords(raw_passwords):
+    """
+    Hashes a batch across every pool worker (bulk imports). Background jobs
+    call this, not requests, so it skips the 429 back-pressure slots.
+    """
+    raw_passwords = list(raw_passwords)
+    if Config.PASSWORD_HASH_WORKERS <= 0 or len(raw_passwords) < 2:
+        return [make_password(raw) for raw in raw_passwords]
+    chunksize = max(1, len(raw_passwords) // (Config.PASSWORD_HASH_WORKERS * 4))
+    executor = _get_executor()
+    hash_one = functools.partial(_with_hashers, list(settings.PASSWORD_HASHERS), make_password)
+    try:
+        return list(executor.map(hash_one, raw_passwords, chunksize=chunksize))
+    except BrokenProcessPool:
+        _reset_executor(executor)
+        raise
+
+
+def verify_password(raw_password, encoded):
+    """
+    Returns (valid, upgraded_hash). upgraded_hash is set when the stored hash
+    uses an outdated hasher or cost and should be saved back.
+    """
+    return _run(_verify, raw_password, encoded)
@@ -0,0 +1,299 @@
+"""
+Bulk user import from CSV or XLSX.
+
+The file is read in chunks (pandas for CSV, openpyxl in read-only mode for
+XLSX), so memory stays flat for any file size. Per chunk:
+
+1. every row is shape-validated by UserImportRowSerializer (no queries),
+2. companies named in the chunk are matched, ignoring case, against root
+   companies with one query; unknown names are row errors unless the job
+   opts in to creating them,
+3. emails are checked against the table with one IN query, and against
+   earlier rows of the file,
+4. the generated passwords are hashed across the hashing process pool,
+5. the users are inserted with one bulk_create,
+6. their welcome emails go to the outbox in a single push,
+7. the job's counters are saved, which is what the status endpoint shows.
+
+Row numbers in job.errors are spreadsheet rows (header = row 1); blank
+rows are skipped but still counted. The uploaded file is deleted once the
+job finishes.
+"""
+import os
+from contextlib import nullcontext
+
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from rest_framework import serializers
+
+from .config import Config
+from .hashing import hash_passwords
+from .models import ROLE_CUSTOMER, Company, UserImportJob, UserProfile
+from .tasks import queue_welcome_emails
+
+IMPORT_FIELDS = [
+    "email", "first_name", "last_name", "user_type", "Company_name", "Street_Address",
+    "Address_Line_2", "Country_and_State", "Town_City", "Zip_Code", "phone_number",
+]
+# Headers match field names case-insensitively, with spaces for underscores.
+_HEADERS = {name.lower(): name for name in IMPORT_FIELDS}
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx", ".xlsm")
+
+
+class ImportFileError(Exception):
+    """The file as a whole can't be imported (format, missing columns)."""
+
+
+class UserImportRowSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = IMPORT_FIELDS
+        # Uniqueness is checked per chunk with one set-based query.
+        extra_kwargs = {"email": {"validators": []}}
+
+    def validate_email(self, value):
+        return value.lower().strip()
+
+
+# --------------------------
+# Reading
+# --------------------------
+def read_chunks(fileobj, filename, chunk_size):
+    """
+    Yields lists of (row number, row dict) pairs, the dict mapping import
+    field -> string, from a CSV or XLSX file. Blank rows are left out.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        return _csv_chunks(fileobj, chunk_size)
+    if extension in (".xlsx", ".xlsm"):
+        return _xlsx_chunks(fileobj, chunk_size)
+    raise ImportFileError(f"Unsupported file type; expected one of {', '.join(SUPPORTED_EXTENSIONS)}.")
+
+
+def _columns(headers):
+    columns = [_HEADERS.get(str(header or "").strip().lower().replace(" ", "_")) for header in headers]
+    if "email" not in columns:
+        raise ImportFileError("The file has no 'email' column.")
+    return columns
+
+
+def _csv_chunks(fileobj, chunk_size):
+    import pandas  # heavy; only import workers need it
+
+    try:
+        # Blank lines are kept (as empty rows) so the frame index stays the row number.
+        reader = pandas.read_csv(
+            fileobj, chunksize=chunk_size, dtype=str, keep_default_na=False, skipinitialspace=True,
+            encoding="utf-8-sig", skip_blank_lines=False,
+        )
+        for frame in reader:
+            columns = _columns(frame.columns)
+            frame.columns = [column or f"_ignored{i}" for i, column in enumerate(columns)]
+            records = frame[[column for column in columns if column]].to_dict("records")
+            yield [
+                (index + 2, record) for index, record in zip(frame.index, records) if any(record.values())
+            ]
+    except (pandas.errors.ParserError, pandas.errors.EmptyDataError, UnicodeDecodeError) as e:
+        raise ImportFileError(f"Can't read CSV: {e}") from e
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # zip codes and phone numbers typed as numbers
+    return str(value).strip()
+
+
+def _xlsx_chunks(fileobj, chunk_size):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("XLSX import needs openpyxl (pip install openpyxl); upload a CSV instead.")
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        columns = _columns(next(rows, ()))
+        chunk = []
+        for row_number, values in enumerate(rows, start=2):
+            if all(value is None for value in values):
+                continue
+            chunk.append((row_number, {
+                column: _cell(value) for column, value in zip(columns, values) if column
+            }))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
+
+
+# --------------------------
+# Importing
+# --------------------------
+def run_import(job, fileobj=None, chunk_size=None, progress=None):
+    """
+    Imports job.file (or `fileobj`) chunk by chunk, saving progress on the
+    job after each chunk; `progress(job)` is called after each save.
+    """
+    chunk_size = chunk_size or Config.USER_IMPORT_CHUNK_SIZE
+    job.status = UserImportJob.STATUS_RUNNING
+    job.started_at = timezone.now()
+    job.save(update_fields=["status", "started_at"])
+
+    try:
+        with (nullcontext(fileobj) if fileobj is not None else job.file.open("rb")) as source:
+            for chunk in read_chunks(source, job.filename, chunk_size):
+                import_chunk(job, chunk)
+                job.save(update_fields=["rows", "created", "skipped", "failed", "errors"])
+                if progress:
+                    progress(job)
+    except ImportFileError as e:
+        return _finish(job, UserImportJob.STATUS_FAILED, str(e))
+    except Exception:
+        _finish(job, UserImportJob.STATUS_FAILED, "Import failed unexpectedly; see the worker log.")
+        raise
+    return _finish(job, UserImportJob.STATUS_COMPLETED)
+
+
+def _finish(job, status, message=""):
+    job.status = status
+    job.message = message
+    job.finished_at = timezone.now()
+    fields = ["status", "message", "finished_at", "rows", "created", "skipped", "failed", "errors"]
+    if job.file:
+        # The upload is full of personal data; only the outcome is kept.
+        job.file.delete(save=False)
+        fields.append("file")
+    job.save(update_fields=fields)
+    return job
+
+
+def import_chunk(job, rows):
+    """Validates and inserts one chunk of (row number, row dict) pairs, updating the job's counters in memory."""
+    valid = []
+    for row_number, row in rows:
+        serializer = UserImportRowSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((row_number, serializer.validated_data))
+        else:
+            job.failed += 1
+            _error(job, row_number, row.get("email"), serializer.errors)
+    job.rows += len(rows)
+    if not valid:
+        return
+
+    companies = _companies([data.get("Company_name") for _, data in valid], create=job.create_companies)
+    valid = _known_companies(job, valid, companies)
+    pending = _new_users(job, valid)
+    passwords = {email: get_random_string(12) for email in pending}
+    hashes = dict(zip(passwords, hash_passwords(passwords.values())))
+    for attempt in range(2):
+        users = [
+            UserProfile(
+                **data,
+                role=ROLE_CUSTOMER,
+                is_active=job.activate,
+                parent_id=job.created_by_id,
+                company=companies.get((data.get("Company_name") or "").lower()),
+                password=hashes[email],
+            )
+            for email, data in pending.items()
+        ]
+        try:
+            with transaction.atomic():
+                UserProfile.objects.bulk_create(users)
+            break
+        except IntegrityError:
+            # An email was registered between the check and the insert; check
+            # again and skip it.
+            if attempt:
+                raise
+            pending = _new_users(job, [(row_number, data) for row_number, data in valid if data["email"] in pending])
+
+    job.created += len(users)
+    if job.send_emails and users:
+        queue_welcome_emails((user.email, _welcome_context(user, passwords[user.email], job)) for user in users)
+
+
+def _new_users(job, valid):
+    """email -> validated data for rows that are neither registered nor repeated earlier in the file."""
+    emails = [data["email"] for _, data in valid]
+    existing = set(UserProfile.objects.filter(email__in=emails).values_list("email", flat=True))
+    pending = {}
+    for row_number, data in valid:
+        email = data["email"]
+        if email in existing or email in pending:
+            job.skipped += 1
+            reason = "already registered" if email in existing else "duplicate of an earlier row"
+            _error(job, row_number, email, {"email": [f"Skipped: {reason}."]})
+            existing.add(email)
+            continue
+        pending[email] = data
+    return pending
+
+
+def _companies(names, create=False):
+    """
+    Lower-cased Company_name -> root Company, matched ignoring case. Names
+    with no company are created only if `create`.
+    """
+    names = {name.lower(): name for name in names if name}
+    if not names:
+        return {}
+    companies = {
+        company.lname: company
+        for company in Company.objects.annotate(lname=Lower("name")).filter(parent=None, lname__in=names)
+    }
+    if create:
+        for lname in names.keys() - companies.keys():
+            companies[lname] = _create_root_company(names[lname])
+    return companies
+
+
+def _create_root_company(name):
+    try:
+        with transaction.atomic():
+            return Company.objects.create(name=name)
+    except IntegrityError:
+        # Created by a concurrent import since the lookup (company_root_name_uniq).
+        return Company.objects.annotate(lname=Lower("name")).get(parent=None, lname=name.lower())
+
+
+def _known_companies(job, valid, companies):
+    """Drops (as row errors) rows naming a company that doesn't exist."""
+    known = []
+    for row_number, data in valid:
+        name = data.get("Company_name")
+        if name and name.lower() not in companies:
+            job.failed += 1
+            _error(job, row_number, data["email"], {"Company_name": [f"Unknown company: {name}."]})
+            continue
+        known.append((row_number, data))
+    return known
+
+
+def _error(job, row_number, email, errors):
+    if len(job.errors) < Config.USER_IMPORT_MAX_ERRORS:
+        job.errors.append({"row": row_number, "email": email, "errors": errors})
+
+
+def _welcome_context(user, password, job):
+    return {
+        "subject": "Welcome to E-comm",
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "email": user.email,
+        "password": password,
+        "msg": (
+            "Your account has been created with a temporary password."
+            if job.activate else
+            "Your registration is successful. Please wait for admin approval."
+        ),
+    }
@@ -0,0 +1,173 @@
+"""
+Pooled, persistent SMTP connections.
+
+Django's send_mail opens (and TLS-negotiates and authenticates) a fresh SMTP
+connection for every call. Under the eventlet worker that means hundreds of
+concurrent handshakes, and the relay starts throttling us. Instead each
+process keeps a small pool of open backend connections:
+
+- at most SMTP_POOL_SIZE connections, callers wait up to
+  SMTP_POOL_ACQUIRE_TIMEOUT seconds for a free one;
+- connections idle for longer than SMTP_POOL_IDLE_TIMEOUT are closed rather
+  than reused, and ones idle past SMTP_POOL_HEALTHCHECK_INTERVAL get a NOOP
+  before being handed out;
+- a connection is retired after SMTP_POOL_MAX_MESSAGES messages, since most
+  relays cap messages per session;
+- a send that fails because a reused connection went away is retried once on
+  a freshly opened connection. Messages go out one at a time, so only the
+  ones not yet delivered are retried.
+"""
+import logging
+import os
+import smtplib
+import threading
+import time
+
+from django.core.mail import get_connection
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the session is gone rather than the message being refused.
+_DISCONNECT_ERRORS = (smtplib.SMTPServerDisconnected, OSError)
+
+
+class _PooledConnection:
+    __slots__ = ("backend", "last_used", "messages_sent")
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.last_used = time.monotonic()
+        self.messages_sent = 0
+
+    def idle_for(self):
+        return time.monotonic() - self.last_used
+
+    def is_alive(self):
+        if not hasattr(self.backend, "connection"):
+            # Non-SMTP backends (console, locmem) have nothing to check.
+            return True
+        smtp = self.backend.connection
+        if smtp is None:
+            return False
+        try:
+            return smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def close(self):
+        try:
+            self.backend.close()
+        except Exception:
+            pass
+
+
+class SMTPConnectionPool:
+    def __init__(self, size=None, idle_timeout=None, max_messages=None,
+                 healthcheck_interval=None, acquire_timeout=None):
+        self.size = size or Config.SMTP_POOL_SIZE
+        self.idle_timeout = idle_timeout if idle_timeout is not None else Config.SMTP_POOL_IDLE_TIMEOUT
+        self.max_messages = max_messages or Config.SMTP_POOL_MAX_MESSAGES
+        self.healthcheck_interval = (
+            healthcheck_interval if healthcheck_interval is not None else Config.SMTP_POOL_HEALTHCHECK_INTERVAL
+        )
+        self.acquire_timeout = acquire_timeout if acquire_timeout is not None else Config.SMTP_POOL_ACQUIRE_TIMEOUT
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    def _open(self):
+        backend = get_connection(fail_silently=False)
+        backend.open()
+        return _PooledConnection(backend)
+
+    def _checkout(self):
+        """Returns (connection, reused). Caller must hold a slot."""
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._open(), False
+            idle = conn.idle_for()
+            if idle > self.idle_timeout:
+                conn.close()
+            elif idle > self.healthcheck_interval and not conn.is_alive():
+                conn.close()
+            else:
+                return conn, True
+
+    def _checkin(self, conn):
+        conn.last_used = time.monotonic()
+        if conn.messages_sent >= self.max_messages:
+            conn.close()
+            return
+        with self._lock:
+            self._idle.append(conn)
+
+    def send_messages(self, email_messages):
+        """Sends EmailMessage objects over a pooled connection; returns the number sent."""
+        if not email_messages:
+            return 0
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError("No SMTP connection available from the pool")
+        try:
+            conn, reused = self._checkout()
+            sent = delivered = 0
+            try:
+                while delivered < len(email_messages):
+                    sent += conn.backend.send_messages([email_messages[delivered]]) or 0
+                    delivered += 1
+                    conn.messages_sent += 1
+            except _DISCONNECT_ERRORS as e:
+                conn.close()
+                if not reused:
+                    raise
+                logger.info("Pooled SMTP connection dropped (%s), reconnecting", e)
+                conn = self._open()
+                try:
+                    sent += conn.backend.send_messages(email_messages[delivered:]) or 0
+                except Exception:
+                    conn.close()
+                    raise
+                conn.messages_sent += len(email_messages) - delivered
+            except Exception:
+                conn.close()
+                raise
+            self._checkin(conn)
+            return sent
+        finally:
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPConnectionPool()
+        return _pool
+
+
+def _reset_after_fork():
+    # Sockets inherited from the parent must not be shared with it.
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def send_messages(email_messages):
+    return get_pool().send_messages(email_messages)
@@ -0,0 +1,231 @@
+import json
+import platform
+import random
+import subprocess
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from unittest import mock
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from category.models import Category
+from restserver.benchmark import (
+    bypass_throttles, run_concurrently, summarize, throwaway_database, use_memory_broker,
+)
+from superadmin.config import Config
+from superadmin.models import ROLE_CUSTOMER, ROLE_SUPERADMIN, UserProfile
+from superadmin.tokens import RoleRefreshToken
+
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+PASSWORD = "bench-Passw0rd"
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test of the REST API through the real URLconf, middleware and "
+        "throttles against a throwaway SQLite database and locmem cache. Drives "
+        "signup -> OTP -> password reset -> login and category read/write "
+        "workloads with concurrent clients and reports throughput, latency "
+        "percentiles and queries per request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="Existing customers to seed.")
+        parser.add_argument("--categories", type=int, default=1000, help="Existing categories to seed.")
+        parser.add_argument("--flow-users", type=int, default=50,
+                            help="New users driven through signup, OTP, password reset and login.")
+        parser.add_argument("--requests", type=int, default=500, help="Requests per category workload.")
+        parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients.")
+        parser.add_argument("--write-ratio", type=float, default=0.1,
+                            help="Share of writes in the mixed category workload.")
+        parser.add_argument("--no-throttle", action="store_true", help="Bypass DRF throttles.")
+        parser.add_argument("--fast-hashers", action="store_true",
+                            help="Use MD5 instead of Argon2 so hashing doesn't dominate the auth flow.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        use_memory_broker()  # OTP emails are enqueued, never delivered
+        rng = random.Random(options["seed"])
+        overrides = {"PASSWORD_HASHERS": FAST_HASHERS} if options["fast_hashers"] else {}
+
+        with throwaway_database(concurrent=True), override_settings(**overrides), \
+                (bypass_throttles() if options["no_throttle"] else nullcontext()), \
+                _capture_otps() as otps:
+            admins = self.seed(options)
+            results = {}
+            results.update(self.auth_flow(options, otps))
+            results.update(self.category_workloads(options, rng, admins))
+
+        report = {
+            "meta": self.meta(options),
+            "results": results,
+        }
+        for name, result in results.items():
+            statuses = ", ".join(f"{code}x{count}" for code, count in sorted(result["status_codes"].items()))
+            self.stdout.write(
+                f"{name:<24} {result['throughput_rps']:>8.1f} req/s  p50={result['p50_ms']:>8.2f}ms  "
+                f"p95={result['p95_ms']:>8.2f}ms  p99={result['p99_ms']:>8.2f}ms  "
+                f"queries/request={result['queries_per_request']:<5} [{statuses}]"
+            )
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+    # --------------------------
+    # Seeding
+    # --------------------------
+    def seed(self, options):
+        password = make_password(PASSWORD)
+        UserProfile.objects.bulk_create(
+            [
+                UserProfile(email=f"seed{i}@example.com", first_name="Seed", last_name=str(i),
+                            role=ROLE_CUSTOMER, is_active=True, password=password)
+                for i in range(options["users"])
+            ],
+            batch_size=2000,
+        )
+        # One superadmin per client so the per-user throttle applies per client.
+        admins = UserProfile.objects.bulk_create(
+            UserProfile(email=f"admin{i}@example.com", role=ROLE_SUPERADMIN, is_active=True, password=password)
+            for i in range(max(1, options["concurrency"]))
+        )
+        Category.objects.bulk_create(
+            [Category(name=f"Category {i}") for i in range(options["categories"])], batch_size=2000
+        )
+        return [
+            f"Bearer {RoleRefreshToken.for_user(admin).access_token}"
+            for admin in UserProfile.objects.filter(pk__in=[a.pk for a in admins])
+        ]
+
+    # --------------------------
+    # Workloads
+    # --------------------------
+    def auth_flow(self, options, otps):
+        emails = [f"flow{i}@example.com" for i in range(options["flow_users"])]
+        ips = {email: _client_ip(i) for i, email in enumerate(emails)}
+
+        def post(path, data, email):
+            return lambda client: client.post(
+                path, data, content_type="application/json", REMOTE_ADDR=ips[email]
+            )
+
+        results = {}
+        results["signup"] = self.run_phase(options, [
+            post(reverse("signup"), {"email": email, "first_name": "Flow"}, email) for email in emails
+        ])
+        results["send-otp"] = self.run_phase(options, [
+            post(reverse("send-otp"), {"email": email}, email) for email in emails
+        ])
+        results["password-reset"] = self.run_phase(options, [
+            post(reverse("forgot-password"), {
+                "email": email, "otp": otps.get(email, ""), "password": PASSWORD, "confirm_password": PASSWORD,
+            }, email)
+            for email in emails
+        ])
+        # Admin approval isn't part of the public API; do it directly.
+        UserProfile.objects.filter(email__in=emails).update(is_active=True)
+        results["login"] = self.run_phase(options, [
+            post(reverse("login"), {"email": email, "password": PASSWORD}, email) for email in emails
+        ])
+        return results
+
+    def category_workloads(self, options, rng, admins):
+        count = options["requests"]
+        ids = list(Category.objects.values_list("id", flat=True))
+        list_url = reverse("category-list-create")
+        created = iter(range(10 ** 9))
+
+        def read(i):
+            roll = rng.random()
+            if roll < 0.4:
+                path = f"{list_url}?limit=50"
+            elif roll < 0.6:
+                path = f"{list_url}?limit=50&fields=id,name"
+            else:
+                path = reverse("category-detail", args=[rng.choice(ids)])
+            return lambda client: client.get(path, REMOTE_ADDR=_client_ip(i))
+
+        def write(i):
+            auth = admins[i % len(admins)]
+            if rng.random() < 0.5:
+                name = f"Bench {next(created)}"
+                return lambda client: client.post(
+                    list_url, {"name": name}, content_type="application/json", HTTP_AUTHORIZATION=auth
+                )
+            path = reverse("category-detail", args=[rng.choice(ids)])
+            active = rng.random() < 0.5
+            return lambda client: client.patch(
+                path, {"is_active": active}, content_type="application/json", HTTP_AUTHORIZATION=auth
+            )
+
+        return {
+            "category-read": self.run_phase(options, [read(i) for i in range(count)]),
+            "category-write": self.run_phase(options, [write(i) for i in range(count)]),
+            "category-mixed": self.run_phase(options, [
+                write(i) if rng.random() < options["write_ratio"] else read(i) for i in range(count)
+            ]),
+        }
+
+    def run_phase(self, options, jobs):
+        records, wall = run_concurrently(jobs, options["concurrency"])
+        latencies = [record[0] for record in records]
+        result = summarize(latencies, [record[1] for record in records])
+        result["throughput_rps"] = round(len(records) / wall, 1) if wall else 0.0
+        result["status_codes"] = dict(Counter(str(record[2]) for record in records))
+        return result
+
+    def meta(self, options):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": settings.DATABASES["default"]["ENGINE"],
+            "password_hash_workers": Config.PASSWORD_HASH_WORKERS,
+            "options": {key: options[key] for key in (
+                "users", "categories", "flow_users", "requests", "concurrency", "write_ratio",
+                "no_throttle", "fast_hashers", "seed",
+            )},
+        }
+
+
+def _client_ip(i):
+    # A distinct address per virtual client, so anonymous throttles apply per client.
+    return f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+
+class _capture_otps:
+    """Records the code passed to each enqueued OTP email, still enqueueing it."""
+    def __enter__(self):
+        from superadmin.otp import open_otp
+        from superadmin.tasks import send_otp_email
+        self.codes = {}
+        original = send_otp_email.delay
+
+        def delay(email, sealed_otp, *args, **kwargs):
+            self.codes[email] = open_otp(email, sealed_otp)
+            return original(email, sealed_otp, *args, **kwargs)
+
+        self._patcher = mock.patch.object(send_otp_email, "delay", side_effect=delay)
+        self._patcher.start()
+        return self.codes
+
+    def __exit__(self, *exc):
+        self._patcher.stop()
+        return False
@@ -0,0 +1,136 @@
+import json
+import time
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.mail import EmailMessage
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from restserver.benchmark import FakeSMTPServer, LOCMEM_CACHES, use_memory_broker
+from superadmin import outbox
+from superadmin.mail import SMTPConnectionPool
+
+
+class Command(BaseCommand):
+    help = (
+        "Email delivery benchmarks against a local fake relay. --mode connections "
+        "compares a new SMTP connection per message with the pooled connections; "
+        "--mode pipeline compares one welcome-email task per message with the "
+        "batched outbox."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mode", choices=("connections", "pipeline"), default="connections")
+        parser.add_argument("--messages", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--pool-size", type=int, default=10)
+        parser.add_argument("--smtp-connect-ms", type=float, default=150.0,
+                            help="Simulated greeting/TLS handshake latency.")
+        parser.add_argument("--smtp-message-ms", type=float, default=20.0,
+                            help="Simulated per-message relay latency.")
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        if options["mode"] == "pipeline":
+            return self.handle_pipeline(options)
+
+        results = {}
+        pool = SMTPConnectionPool(size=options["pool_size"])
+        modes = {
+            "per-message": lambda message: message.send(fail_silently=False),
+            "pooled": lambda message: pool.send_messages([message]),
+        }
+        for mode, send in modes.items():
+            server = FakeSMTPServer(options["smtp_connect_ms"] / 1000, options["smtp_message_ms"] / 1000)
+            with server, override_settings(**server.email_settings()):
+                elapsed = self.run(send, options["messages"], options["concurrency"])
+                pool.close()
+            results[mode] = {
+                "messages": server.messages,
+                "smtp_sessions": server.sessions,
+                "seconds": round(elapsed, 3),
+                "messages_per_second": round(server.messages / elapsed, 1),
+            }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for mode, r in results.items():
+            self.stdout.write(
+                f"{mode:<12} {r['messages_per_second']:>8.1f} msg/s  "
+                f"sessions={r['smtp_sessions']:<5} messages={r['messages']}"
+            )
+
+    @staticmethod
+    def run(send, count, concurrency):
+        messages = [
+            EmailMessage("Bench", "body", "bench@example.com", [f"user{i}@example.com"])
+            for i in range(count)
+        ]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(send, messages))
+        return time.perf_counter() - start
+
+    def handle_pipeline(self, options):
+        """
+        Runs the whole pipeline in-process: tasks publish to an in-memory
+        broker and are then executed eagerly, the outbox is drained directly.
+        CPU time covers rendering, task/broker overhead and SMTP for both.
+        """
+        use_memory_broker()
+        from superadmin.tasks import queue_welcome_email, send_welcome_email
+
+        count = options["messages"]
+        contexts = [
+            {"subject": "Welcome", "first_name": "Bench", "last_name": str(i),
+             "email": f"user{i}@example.com", "password": "x", "msg": "Welcome aboard."}
+            for i in range(count)
+        ]
+
+        def task_per_message(pool):
+            for context in contexts:
+                send_welcome_email.delay(context["email"], context)
+                send_welcome_email.apply(args=(context["email"], context))
+            return count
+
+        def batched(pool):
+            for context in contexts:
+                queue_welcome_email(context["email"], context)
+            drains = 0
+            while len(outbox.get_outbox()):
+                outbox.drain(pool=pool)
+                drains += 1
+            return drains
+
+        results = {}
+        for mode, run in (("task-per-message", task_per_message), ("outbox", batched)):
+            server = FakeSMTPServer(options["smtp_connect_ms"] / 1000, options["smtp_message_ms"] / 1000)
+            pool = SMTPConnectionPool(size=options["pool_size"])
+            with server, override_settings(CACHES=LOCMEM_CACHES, **server.email_settings()), \
+                    self.patched_pool(pool):
+                wall, cpu = time.perf_counter(), time.process_time()
+                tasks = run(pool)
+                wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+                pool.close()
+            results[mode] = {
+                "messages": server.messages,
+                "smtp_sessions": server.sessions,
+                "tasks_executed": tasks,
+                "cpu_ms_per_email": round(cpu / count * 1000, 3),
+                "wall_ms_per_email": round(wall / count * 1000, 3),
+            }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for mode, r in results.items():
+            self.stdout.write(
+                f"{mode:<17} cpu={r['cpu_ms_per_email']:>7.3f}ms/email  wall={r['wall_ms_per_email']:>7.3f}ms/email  "
+                f"tasks={r['tasks_executed']:<5} sessions={r['smtp_sessions']:<4} messages={r['messages']}"
+            )
+
+    @staticmethod
+    def patched_pool(pool):
+        return mock.patch("superadmin.mail.get_pool", return_value=pool)
@@ -0,0 +1,63 @@
+import json
+import time
+from itertools import product
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand
+
+from superadmin.hashers import TunableArgon2PasswordHasher
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures password verifications per second on one core for each Argon2 "
+        "cost setting (one verification = one login)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--time-cost", default="1,2,3")
+        parser.add_argument("--memory-cost", default="19456,65536,102400", help="KiB, comma separated.")
+        parser.add_argument("--parallelism", default="1,8")
+        parser.add_argument("--seconds", type=float, default=2.0, help="Measurement time per setting.")
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        settings = [
+            (f"argon2 t={t} m={m} p={p}", type(
+                "BenchArgon2Hasher", (TunableArgon2PasswordHasher,),
+                {"time_cost": t, "memory_cost": m, "parallelism": p},
+            )())
+            for t, m, p in product(
+                self._ints(options["time_cost"]),
+                self._ints(options["memory_cost"]),
+                self._ints(options["parallelism"]),
+            )
+        ]
+        settings.append((f"pbkdf2_sha256 i={PBKDF2PasswordHasher.iterations}", PBKDF2PasswordHasher()))
+
+        results = []
+        for label, hasher in settings:
+            encoded = hasher.encode("correct horse battery staple", hasher.salt())
+            count = 0
+            start = time.perf_counter()
+            while time.perf_counter() - start < options["seconds"]:
+                hasher.verify("correct horse battery staple", encoded)
+                count += 1
+            elapsed = time.perf_counter() - start
+            results.append({
+                "hasher": label,
+                "logins_per_sec_per_core": round(count / elapsed, 2),
+                "ms_per_login": round(elapsed / count * 1000, 2),
+            })
+            if not options["json"]:
+                self.stdout.write(
+                    f"{label:<34} {results[-1]['logins_per_sec_per_core']:>9.2f} logins/s/core  "
+                    f"{results[-1]['ms_per_login']:>8.2f} ms/login"
+                )
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+
+    @staticmethod
+    def _ints(value):
+        return [int(part) for part in value.split(",")]
@@ -0,0 +1,64 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from restserver.benchmark import FakeSMTPServer, LOCMEM_CACHES, summarize, use_memory_broker
+from superadmin import utils
+from superadmin.otp import get_otp_store
+from superadmin.utils import EmailService
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares send_otp latency with inline SMTP delivery against the queued "
+        "Celery task, using a local fake SMTP server with configurable latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--smtp-connect-ms", type=float, default=150.0,
+                            help="Simulated greeting/TLS handshake latency.")
+        parser.add_argument("--smtp-message-ms", type=float, default=50.0,
+                            help="Simulated per-message relay latency.")
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        use_memory_broker()
+
+        results = {}
+        server = FakeSMTPServer(options["smtp_connect_ms"] / 1000, options["smtp_message_ms"] / 1000)
+        with server, override_settings(CACHES=LOCMEM_CACHES, **server.email_settings()):
+            results["inline"] = self.measure(options["requests"], "inline", self.send_inline)
+
+            # Queued: in-memory broker and no worker, so only the enqueue is
+            # timed, which is what the request thread pays.
+            results["queued"] = self.measure(options["requests"], "queued", utils.send_otp)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for mode, summary in results.items():
+            self.stdout.write(
+                f"{mode:<7} p50={summary['p50_ms']:>9.2f}ms  p95={summary['p95_ms']:>9.2f}ms  "
+                f"p99={summary['p99_ms']:>9.2f}ms"
+            )
+
+    def measure(self, count, mode, send):
+        latencies = []
+        for i in range(count):
+            start = time.perf_counter()
+            ok, msg = send(f"bench-{mode}-{i}@example.com")
+            latencies.append(time.perf_counter() - start)
+            assert ok, msg
+        return summarize(latencies)
+
+    @staticmethod
+    def send_inline(email):
+        """The pre-queue behaviour: store the OTP, then SMTP on the request thread."""
+        otp = utils.generate_otp()
+        if not get_otp_store().issue(email, otp):
+            return False, "rate limited"
+        EmailService.send_html([email], "Your OTP Code", "otp_email.html", {"otp": otp})
+        return True, "sent"
@@ -0,0 +1,63 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+
+from superadmin import rendering
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures transactional email renders per second: render_to_string + "
+        "strip_tags per message versus the cached rendering layer, one at a "
+        "time and batched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=5000)
+        parser.add_argument("--template", default="welcome_email_template.html")
+        parser.add_argument("--text-template", default=None,
+                            help="Explicit plain-text template; derived from the HTML when omitted.")
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        template, text_template = options["template"], options["text_template"]
+        contexts = [
+            {"first_name": "Bench", "last_name": str(i), "email": f"user{i}@example.com",
+             "password": "x" * 12, "msg": "Your registration is successful."}
+            for i in range(options["messages"])
+        ]
+
+        def uncached():
+            for context in contexts:
+                html = render_to_string(template, context)
+                if text_template:
+                    render_to_string(text_template, context)
+                else:
+                    strip_tags(html)
+
+        def cached():
+            for context in contexts:
+                rendering.render_email(template, context, text_template)
+
+        def batched():
+            rendering.render_many(template, contexts, text_template)
+
+        rendering.render_email(template, contexts[0], text_template)  # compile outside the timings
+        results = {}
+        for mode, run in (("render_to_string", uncached), ("render_email", cached), ("render_many", batched)):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            results[mode] = {
+                "messages_per_second": round(len(contexts) / elapsed, 1),
+                "us_per_message": round(elapsed / len(contexts) * 1e6, 1),
+            }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for mode, r in results.items():
+            self.stdout.write(f"{mode:<17} {r['messages_per_second']:>10.1f} msg/s  {r['us_per_message']:>8.1f} us/msg")
@@ -0,0 +1,109 @@
+import json
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework import throttling as drf_throttling
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from restserver.benchmark import LOCMEM_CACHES, summarize
+from superadmin import throttles
+
+IMPLEMENTATIONS = {
+    "drf": drf_throttling.AnonRateThrottle,
+    "gcra": throttles.AnonRateThrottle,
+}
+
+
+def _request(ip):
+    request = Request(APIRequestFactory().get("/", REMOTE_ADDR=ip))
+    request.user = AnonymousUser()
+    return request
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures per-request throttle overhead of DRF's cache-based "
+        "AnonRateThrottle against the GCRA throttle in superadmin.throttles: "
+        "latency of one allow_request() while a single client's history fills "
+        "up to --limit, then how many requests each admits when --threads "
+        "threads race on one key with a limit of --race-limit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=5000, help="Checks timed per implementation.")
+        parser.add_argument("--limit", type=int, default=None,
+                            help="Requests per minute allowed to the client (default: --requests, so all are admitted).")
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--race-limit", type=int, default=200)
+        parser.add_argument("--redis", action="store_true",
+                            help="Use the configured django_redis cache instead of locmem.")
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        results = {}
+        with (nullcontext() if options["redis"] else override_settings(CACHES=LOCMEM_CACHES)):
+            for name, base in IMPLEMENTATIONS.items():
+                results[name] = self.overhead(base, options["requests"], options["limit"] or options["requests"])
+                results[name]["race"] = self.race(base, options["threads"], options["race_limit"])
+            cache.clear()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, result in results.items():
+            race = result["race"]
+            self.stdout.write(
+                f"{name:<5} p50={result['p50_ms'] * 1000:>8.1f}us  p95={result['p95_ms'] * 1000:>8.1f}us  "
+                f"p99={result['p99_ms'] * 1000:>8.1f}us  denied={result['denied']:>5}  "
+                f"race: admitted {race['admitted']} of {race['attempts']} (limit {race['limit']})"
+            )
+
+    @staticmethod
+    def throttle_class(base, rate):
+        return type(f"Bench{base.__name__}", (base,), {"rate": rate})
+
+    def overhead(self, base, count, limit):
+        cache.clear()
+        throttle_class = self.throttle_class(base, f"{limit}/min")
+        request = _request("10.1.0.1")
+        latencies = []
+        denied = 0
+        for _ in range(count):
+            start = time.perf_counter()
+            allowed = throttle_class().allow_request(request, None)
+            latencies.append(time.perf_counter() - start)
+            denied += not allowed
+        return {**summarize(latencies), "denied": denied}
+
+    def race(self, base, threads, limit):
+        cache.clear()
+        throttle_class = self.throttle_class(base, f"{limit}/hour")
+        attempts = limit * 2 // threads
+        admitted = []
+        barrier = threading.Barrier(threads)
+
+        def worker():
+            request = _request("10.2.0.1")
+            barrier.wait()
+            admitted.append(sum(throttle_class().allow_request(request, None) for _ in range(attempts)))
+
+        # Switch threads often so read-modify-write cycles interleave the way
+        # they do when each cache call is a network round-trip.
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            workers = [threading.Thread(target=worker) for _ in range(threads)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        return {"limit": limit, "attempts": attempts * threads, "admitted": sum(admitted)}
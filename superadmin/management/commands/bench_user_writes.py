@@ -0,0 +1,79 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from restserver.benchmark import LOCMEM_CACHES, throwaway_database
+from superadmin.models import ROLE_CUSTOMER, UserProfile
+
+
+def _profile(i, generation=0):
+    return {
+        "first_name": f"First{i}-{generation}",
+        "last_name": f"Last{i}-{generation}",
+        "Company_name": f"Company {i % 500}-{generation}",
+        "Street_Address": f"{i} Main Street {generation}",
+        "Address_Line_2": f"Suite {i % 100}-{generation}",
+        "Country_and_State": ("CA", "NY", "TX", "WA")[(i + generation) % 4],
+        "Town_City": f"Town {i % 300}-{generation}",
+        "Zip_Code": f"{(i * 7 + generation) % 100000:05d}",
+        "phone_number": f"+1555{(i + generation) % 10000000:07d}",
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures UserProfile write throughput the way signup and profile "
+        "updates write it: one INSERT or full-row UPDATE per transaction, every "
+        "profile column filled, against a throwaway database with the current "
+        "migrations. Reports the number of indexes each write maintains."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20000, help="Rows inserted, then updated.")
+        parser.add_argument("--durable", action="store_true",
+                            help="Use a WAL SQLite file (commits hit the disk) instead of an in-memory database.")
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        count = options["users"]
+        # locmem cache: auth-cache invalidation on save() shouldn't hit the network
+        with throwaway_database(concurrent=options["durable"]), override_settings(CACHES=LOCMEM_CACHES):
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(cursor, UserProfile._meta.db_table)
+            indexes = sum(1 for constraint in constraints.values() if constraint["index"] or constraint["unique"])
+
+            start = time.perf_counter()
+            for i in range(count):
+                UserProfile(
+                    email=f"user{i}@example.com", role=ROLE_CUSTOMER, password="!", **_profile(i)
+                ).save()
+            insert_seconds = time.perf_counter() - start
+
+            users = list(UserProfile.objects.order_by("id"))
+            start = time.perf_counter()
+            for i, user in enumerate(users):
+                for name, value in _profile(i, generation=1).items():
+                    setattr(user, name, value)
+                user.save()
+            update_seconds = time.perf_counter() - start
+
+        result = {
+            "users": count,
+            "indexes_on_table": indexes,
+            "database": "sqlite file (WAL)" if options["durable"] else "sqlite memory",
+            "inserts_per_sec": round(count / insert_seconds, 1),
+            "updates_per_sec": round(count / update_seconds, 1),
+            "insert_us": round(insert_seconds / count * 1e6, 1),
+            "update_us": round(update_seconds / count * 1e6, 1),
+        }
+        if options["json"]:
+            self.stdout.write(json.dumps(result, indent=2))
+        else:
+            self.stdout.write(
+                f"{result['indexes_on_table']} indexes on {UserProfile._meta.db_table} ({result['database']})\n"
+                f"INSERT {result['inserts_per_sec']:>10.1f}/s  {result['insert_us']:>8.1f} us/row\n"
+                f"UPDATE {result['updates_per_sec']:>10.1f}/s  {result['update_us']:>8.1f} us/row"
+            )
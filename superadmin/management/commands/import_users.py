@@ -0,0 +1,59 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from superadmin.imports import SUPPORTED_EXTENSIONS, run_import
+from superadmin.models import UserImportJob, UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports users from a CSV or XLSX file (columns named like UserProfile "
+        "fields; email required). Runs in this process; the upload endpoint "
+        "queues the same import on the imports worker instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--chunk-size", type=int, help="Rows per chunk (default USER_IMPORT_CHUNK_SIZE).")
+        parser.add_argument("--inactive", action="store_true", help="Create accounts pending admin approval.")
+        parser.add_argument("--no-emails", action="store_true", help="Don't queue welcome emails.")
+        parser.add_argument("--create-companies", action="store_true",
+                            help="Create root companies for unknown Company_name values instead of rejecting the rows.")
+        parser.add_argument("--created-by", help="Email of the admin recorded as the users' creator.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.isfile(path):
+            raise CommandError(f"No such file: {path}")
+        if not path.lower().endswith(SUPPORTED_EXTENSIONS):
+            raise CommandError(f"Supported file types: {', '.join(SUPPORTED_EXTENSIONS)}")
+
+        created_by = None
+        if options["created_by"]:
+            created_by = UserProfile.objects.filter(email=options["created_by"].lower()).first()
+            if created_by is None:
+                raise CommandError(f"No user with email {options['created_by']}")
+
+        job = UserImportJob.objects.create(
+            filename=os.path.basename(path),
+            created_by=created_by,
+            activate=not options["inactive"],
+            send_emails=not options["no_emails"],
+            create_companies=options["create_companies"],
+        )
+        with open(path, "rb") as fh:
+            run_import(job, fh, chunk_size=options["chunk_size"], progress=self.report)
+
+        self.stdout.write(
+            f"Import {job.pk} {job.status}: {job.rows} rows, {job.created} created, "
+            f"{job.skipped} skipped, {job.failed} invalid"
+            + (f" ({job.message})" if job.message else "")
+        )
+        for error in job.errors[:20]:
+            self.stdout.write(f"  row {error['row']} {error['email'] or ''}: {error['errors']}")
+        if len(job.errors) > 20:
+            self.stdout.write(f"  ... {len(job.errors) - 20} more on import job {job.pk}")
+
+    def report(self, job):
+        self.stdout.write(f"  {job.rows} rows: {job.created} created, {job.skipped} skipped, {job.failed} invalid")
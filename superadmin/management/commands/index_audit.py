@@ -0,0 +1,163 @@
+import glob
+import json
+import os
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from restserver.sql import predicate_columns, written_table
+
+
+def declared_indexes(model):
+    """
+    (label, columns, kind) for every index the model declares: primary key,
+    unique fields, db_index fields, foreign keys, Meta.indexes and unique
+    constraints. kind is "primary", "unique" or "index".
+    """
+    opts = model._meta
+    found = []
+    for field in opts.local_fields:
+        if not field.column:
+            continue
+        if field.primary_key:
+            found.append((f"{field.name} (primary key)", (field.column,), "primary"))
+        elif field.unique:
+            found.append((f"{field.name} (unique)", (field.column,), "unique"))
+        elif field.db_index:
+            source = "foreign key" if field.is_relation else "db_index"
+            found.append((f"{field.name} ({source})", (field.column,), "index"))
+    for index in opts.indexes:
+        columns = tuple(opts.get_field(name.lstrip("-")).column for name in index.fields)
+        found.append((f"{index.name or ','.join(index.fields)} (Meta.indexes)", columns, "index"))
+    for constraint in opts.constraints:
+        fields = getattr(constraint, "fields", ())
+        if fields and getattr(constraint, "condition", None) is None:
+            columns = tuple(opts.get_field(name).column for name in fields)
+            found.append((f"{constraint.name} (constraint)", columns, "unique"))
+    for fields in opts.unique_together:
+        columns = tuple(opts.get_field(name).column for name in fields)
+        found.append((f"{','.join(fields)} (unique_together)", columns, "unique"))
+    return found
+
+
+def audit_model(model, uses, writes):
+    """
+    Classifies each declared index of `model` against the recorded query
+    patterns: `uses` counts (table, column) predicate uses and `writes`
+    counts write statements per table.
+    """
+    table = model._meta.db_table
+    indexes = declared_indexes(model)
+    report = []
+    for label, columns, kind in indexes:
+        status = "used" if uses[(table, columns[0])] else "unused"
+        same_or_wider = [
+            other for other_label, other, _ in indexes
+            if other_label != label and other[:len(columns)] == columns
+        ]
+        if kind == "index" and same_or_wider:
+            status = "redundant"  # another index covers the same leading columns
+        elif kind != "index" and status == "unused":
+            status = "constraint"  # kept for integrity, not for reads
+        report.append({
+            "index": label,
+            "columns": list(columns),
+            "kind": kind,
+            "predicate_uses": uses[(table, columns[0])],
+            "status": status,
+        })
+    leading = {columns[0] for _, columns, _ in indexes}
+    missing = sorted(
+        (column, count) for (used_table, column), count in uses.items()
+        if used_table == table and column not in leading
+    )
+    return {
+        "table": table,
+        "writes": writes[table],
+        "indexes": report,
+        "unindexed_predicates": [{"column": column, "uses": count} for column, count in missing],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the indexes declared on project models with the columns "
+        "queries actually filter, join and sort on. Query patterns come from "
+        "logs/perf, written by PerformanceMiddleware when PERF_LOG_QUERIES=1 "
+        "(e.g. PERF_LOG_QUERIES=1 python manage.py bench). Flags indexes no "
+        "recorded query uses, indexes made redundant by another index, and "
+        "filtered columns with no index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--log", action="append", dest="logs",
+                            help="Perf log file or glob (repeatable). Defaults to logs/perf/*.log.")
+        parser.add_argument("--app", action="append", dest="app_labels",
+                            help="Limit to these app labels (repeatable).")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        patterns = options["logs"] or [os.path.join(settings.BASE_DIR, "logs", "perf", "*.log")]
+        paths = sorted({path for pattern in patterns for path in glob.glob(pattern)})
+        uses, writes, requests = self.load_patterns(paths)
+        if not requests:
+            raise CommandError(
+                "No recorded queries found. Run traffic (or manage.py bench) with PERF_LOG_QUERIES=1 first."
+            )
+
+        reports = [audit_model(model, uses, writes) for model in self.project_models(options["app_labels"])]
+        if options["json"]:
+            self.stdout.write(json.dumps({"requests": requests, "logs": paths, "models": reports}, indent=2))
+            return
+
+        self.stdout.write(f"{requests} requests from {len(paths)} log file(s)\n")
+        for report in reports:
+            self.stdout.write(
+                f"{report['table']}: {len(report['indexes'])} indexes, "
+                f"{report['writes']} recorded write statements"
+            )
+            for index in report["indexes"]:
+                self.stdout.write(
+                    f"  {index['status']:<10} {index['predicate_uses']:>7}  {index['index']}  "
+                    f"({', '.join(index['columns'])})"
+                )
+            for missing in report["unindexed_predicates"]:
+                self.stdout.write(f"  {'missing':<10} {missing['uses']:>7}  {missing['column']} has no leading index")
+            self.stdout.write("")
+
+    def load_patterns(self, paths):
+        """Counts predicate columns and written tables over every recorded request."""
+        uses, writes = Counter(), Counter()
+        requests = 0
+        for path in paths:
+            with open(path, encoding="utf-8", errors="replace") as fh:
+                for line in fh:
+                    start = line.find("{")
+                    if start == -1:
+                        continue
+                    try:
+                        entry = json.loads(line[start:])
+                    except ValueError:
+                        continue
+                    queries = entry.get("queries")
+                    if queries is None:
+                        continue
+                    requests += 1
+                    for sql in queries:
+                        uses.update(predicate_columns(sql))
+                        table = written_table(sql)
+                        if table:
+                            writes[table] += 1
+        return uses, writes, requests
+
+    @staticmethod
+    def project_models(app_labels):
+        base_dir = str(settings.BASE_DIR)
+        for app_config in apps.get_app_configs():
+            if app_labels and app_config.label not in app_labels:
+                continue
+            if not app_labels and not str(app_config.path).startswith(base_dir):
+                continue
+            yield from (model for model in app_config.get_models() if not model._meta.proxy)
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+from django.db.models.functions import Lower
+
+
+def companies_from_names(apps, schema_editor):
+    """
+    One root company per distinct Company_name, ignoring case; users are
+    attached to it. The lowest spelling (by MIN) names the company.
+    """
+    Company = apps.get_model("superadmin", "Company")
+    UserProfile = apps.get_model("superadmin", "UserProfile")
+    names = list(
+        UserProfile.objects.exclude(Company_name__isnull=True).exclude(Company_name="")
+        .values(lname=Lower("Company_name")).annotate(name=Min("Company_name"))
+        .values_list("name", flat=True).order_by("lname")
+    )
+    for name in names:
+        company = Company.objects.create(name=name)
+        Company.objects.filter(pk=company.pk).update(path=str(company.pk).zfill(10), depth=0)
+        UserProfile.objects.filter(Company_name__iexact=name).update(company=company)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('superadmin', '0004_alter_userprofile_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='children', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='Company',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=255)),
+                ('path', models.CharField(db_index=True, editable=False, max_length=250)),
+                ('depth', models.PositiveSmallIntegerField(default=0, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='children', to='superadmin.company')),
+            ],
+            options={
+                'verbose_name': 'Company',
+                'verbose_name_plural': 'Companies',
+                'ordering': ['path'],
+            },
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='company',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='users', to='superadmin.company'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['company', 'role', 'is_active'], name='user_company_role_active_idx'),
+        ),
+        migrations.RunPython(companies_from_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:52
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0007_userimportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userimportjob',
+            name='create_companies',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name='company',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), condition=models.Q(('parent', None)), name='company_root_name_uniq'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 # models.py
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Lower, Substr
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.utils import timezone
 from django.db.models import Q
@@ -21,6 +23,85 @@ ROLE_TYPE = [
 ]
 
 
+class CompanyQuerySet(models.QuerySet):
+    def subtree(self, path):
+        """The company at `path` and all of its descendants: one range scan on the path index."""
+        return self.filter(path__gte=path, path__lt=Company.path_upper_bound(path))
+
+
+class Company(models.Model):
+    """
+    Tenant hierarchy stored as a materialized path: each company's path is
+    its parent's path plus its own id as a fixed-width digit segment, so a
+    subtree is the contiguous range [path, next sibling path) and never
+    needs recursive lookups. Paths are digits only, so every collation
+    orders them the same way.
+    """
+    SEGMENT_WIDTH = 10
+    MAX_PATH_LENGTH = 250  # 25 levels
+
+    name = models.CharField(max_length=255, db_index=True)
+    parent = models.ForeignKey("self", null=True, blank=True, on_delete=models.PROTECT, related_name="children")
+    path = models.CharField(max_length=MAX_PATH_LENGTH, db_index=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = CompanyQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Company"
+        verbose_name_plural = "Companies"
+        ordering = ["path"]
+        constraints = [
+            # Root companies are tenants: one per name, ignoring case.
+            models.UniqueConstraint(Lower("name"), condition=Q(parent=None), name="company_root_name_uniq"),
+        ]
+
+    @classmethod
+    def segment(cls, pk):
+        return str(pk).zfill(cls.SEGMENT_WIDTH)
+
+    @staticmethod
+    def path_upper_bound(path):
+        # The next path of the same length; every descendant sorts before it.
+        return str(int(path) + 1).zfill(len(path))
+
+    def descendants(self, include_self=True):
+        companies = Company.objects.subtree(self.path)
+        return companies if include_self else companies.exclude(pk=self.pk)
+
+    def save(self, *args, **kwargs):
+        parent_path = self.parent.path if self.parent_id else ""
+        with transaction.atomic():
+            if self.pk is None:
+                # The path embeds the id, so it's filled in right after the INSERT.
+                super().save(*args, **kwargs)
+                self.path, self.depth = self._path_under(parent_path)
+                Company.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+                return
+
+            new_path, new_depth = self._path_under(parent_path)
+            if new_path != self.path:
+                if self.path and parent_path.startswith(self.path):
+                    raise ValidationError({"parent": "A company can't be moved under its own subtree."})
+                # Move: rewrite the whole subtree's prefix in one UPDATE.
+                Company.objects.subtree(self.path).update(
+                    path=Concat(Value(new_path), Substr("path", len(self.path) + 1)),
+                    depth=F("depth") + (new_depth - self.depth),
+                )
+                self.path, self.depth = new_path, new_depth
+            super().save(*args, **kwargs)
+
+    def _path_under(self, parent_path):
+        path = parent_path + self.segment(self.pk)
+        if len(path) > self.MAX_PATH_LENGTH:
+            raise ValidationError({"parent": "Company hierarchy is too deep."})
+        return path, len(path) // self.SEGMENT_WIDTH - 1
+
+    def __str__(self):
+        return self.name
+
+
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -43,18 +124,24 @@ class UserManager(BaseUserManager):
 
 
 class UserProfile(AbstractBaseUser, PermissionsMixin):
-    email = models.EmailField(max_length=255, unique=True,db_index=True)
-    user_type = models.CharField(max_length=255, blank=True, db_index=True , choices=ROLE_TYPE)
-    first_name = models.CharField(max_length=255, blank=True, null=True, db_index=True)
-    last_name = models.CharField(max_length=255, blank=True, null=True, db_index=True)
-    Company_name = models.CharField(max_length=255, blank=True, null=True, db_index=True)
-    role = models.CharField(max_length=32, choices=ROLE_CHOICES, db_index=True)
-    Street_Address = models.CharField(max_length=255, blank=True, null=True, db_index=True)
-    Address_Line_2 = models.CharField(max_length=255, blank=True, null=True, db_index=True)
-    Country_and_State = models.CharField(max_length=255, blank=True, null=True, db_index=True , choices=USA_STATES)
-    Town_City = models.CharField(max_length=255, blank=True, null=True, db_index=True)
-    Zip_Code = models.CharField(max_length=255, blank=True, null=True, db_index=True)
-    phone_number = models.CharField(max_length=20, blank=True, null=True, db_index=True)
+    email = models.EmailField(max_length=255, unique=True)
+    user_type = models.CharField(max_length=255, blank=True, choices=ROLE_TYPE)
+    first_name = models.CharField(max_length=255, blank=True, null=True)
+    last_name = models.CharField(max_length=255, blank=True, null=True)
+    Company_name = models.CharField(max_length=255, blank=True, null=True)
+    # Indexed through the (company, role, is_active) composite below.
+    company = models.ForeignKey(
+        Company, null=True, blank=True, on_delete=models.SET_NULL, related_name="users", db_index=False
+    )
+    # The user who created this account; may edit and delete it.
+    parent = models.ForeignKey("self", null=True, blank=True, on_delete=models.SET_NULL, related_name="children")
+    role = models.CharField(max_length=32, choices=ROLE_CHOICES)
+    Street_Address = models.CharField(max_length=255, blank=True, null=True)
+    Address_Line_2 = models.CharField(max_length=255, blank=True, null=True)
+    Country_and_State = models.CharField(max_length=255, blank=True, null=True, choices=USA_STATES)
+    Town_City = models.CharField(max_length=255, blank=True, null=True)
+    Zip_Code = models.CharField(max_length=255, blank=True, null=True)
+    phone_number = models.CharField(max_length=20, blank=True, null=True)
     is_active = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
     date_joined = models.DateTimeField(default=timezone.now)
@@ -67,15 +154,47 @@ class UserProfile(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = "User"
         verbose_name_plural = "Users"
+        # Only what queries use (see manage.py index_audit): email lookups are
+        # served by its unique index, tenant listings by the composite, and
+        # parent by its FK index. Every extra index is paid on each write.
         indexes = [
-            models.Index(fields=["email"]),
-            models.Index(fields=["role"]),
+            models.Index(fields=["company", "role", "is_active"], name="user_company_role_active_idx"),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the claims baked into issued tokens so save() can tell
+        # when they go stale.
+        if "role" in instance.__dict__ and "is_active" in instance.__dict__:
+            instance._loaded_claims = (instance.role, instance.is_active)
+        return instance
+
     def save(self, *args, **kwargs):
         if self.email:
             self.email = self.email.strip().lower()
+        claims_changed = (
+            not self._state.adding
+            and getattr(self, "_loaded_claims", None) is not None
+            and self._loaded_claims != (self.role, self.is_active)
+        )
         super().save(*args, **kwargs)
+        self._loaded_claims = (self.role, self.is_active)
+        self.invalidate_auth_cache(revoke_tokens=claims_changed)
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        self.invalidate_auth_cache(pk, revoke_tokens=True)
+        return result
+
+    def invalidate_auth_cache(self, pk=None, revoke_tokens=False):
+        # Local import: authentication imports this module.
+        from .authentication import invalidate_user_cache
+        from .tokens import revoke_user_tokens
+        invalidate_user_cache(pk or self.pk)
+        if revoke_tokens:
+            revoke_user_tokens(pk or self.pk)
 
     def clean(self):
         allowed_roles = {r[0] for r in ROLE_CHOICES}
@@ -96,5 +215,52 @@ class UserProfile(AbstractBaseUser, PermissionsMixin):
     def is_customer(self):
         return self.role == ROLE_CUSTOMER
 
+    @staticmethod
+    def join_name(first_name, last_name):
+        return " ".join(part for part in (first_name, last_name) if part)
+
+    @property
+    def full_name(self):
+        return self.join_name(self.first_name, self.last_name)
+
+    def __str__(self):
+        return self.email
+
+class UserImportJob(models.Model):
+    """A bulk user import (see superadmin.imports); its progress is polled by the uploader."""
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "pending"),
+        (STATUS_RUNNING, "running"),
+        (STATUS_COMPLETED, "completed"),
+        (STATUS_FAILED, "failed"),
+    ]
+
+    file = models.FileField(upload_to="imports/", blank=True)  # empty for manage.py import_users
+    filename = models.CharField(max_length=255)
+    created_by = models.ForeignKey(
+        UserProfile, null=True, blank=True, on_delete=models.SET_NULL, related_name="import_jobs"
+    )
+    activate = models.BooleanField(default=True)
+    send_emails = models.BooleanField(default=True)
+    create_companies = models.BooleanField(default=False)  # else unknown Company_name values are row errors
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    rows = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "User import"
+        verbose_name_plural = "User imports"
+
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return f"{self.filename} ({self.status})"
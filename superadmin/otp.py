@@ -0,0 +1,196 @@
+"""
+OTP storage with atomic issue/verify.
+
+On django_redis each operation is a single Lua script (one round-trip), so
+the rate-limit check, counter increment and OTP write can't interleave with
+a concurrent request. Other cache backends (locmem in tests) use the same
+logic under a process-local lock.
+"""
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+from .config import Config
+
+VERIFIED = "verified"
+INVALID = "invalid"
+EXPIRED = "expired"
+LOCKED = "locked"
+
+# KEYS: rate key, otp key. ARGV: rate max, rate window, otp hash, otp ttl.
+# Returns 0 when rate limited, otherwise the request count in the window.
+ISSUE_SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+if count > tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('HSET', KEYS[2], 'hash', ARGV[3], 'attempts', 0)
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return count
+"""
+
+# KEYS: otp key. ARGV: otp hash, max attempts.
+# Returns 1 verified, 0 invalid, -1 missing/expired, -2 locked out.
+VERIFY_SCRIPT = """
+local stored = redis.call('HGET', KEYS[1], 'hash')
+if not stored then
+    return -1
+end
+if stored == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return -2
+end
+return 0
+"""
+
+_VERIFY_RESULTS = {1: VERIFIED, 0: INVALID, -1: EXPIRED, -2: LOCKED}
+
+
+def _otp_hash(email, otp):
+    # Only a keyed hash is stored, so a cache dump doesn't reveal live OTPs.
+    message = f"{email}:{otp}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+# --------------------------
+# Sealed secrets
+# --------------------------
+# The email task needs the code, but Celery args sit in the broker (and in
+# its retry/redelivery copies), which shouldn't hold live OTPs any more than
+# the cache should; the email outbox (outbox.py) has the same problem with
+# generated passwords. A secret is encrypted with an HMAC-SHA256 keystream
+# under a fresh nonce, and the envelope is signed and timestamped with
+# django.core.signing, so it only opens for the value it was bound to (the
+# email, or the outbox message id) and, for OTPs, within their lifetime.
+_SEAL_SALT = "superadmin.otp.seal"
+
+
+def _keystream(salt, nonce, length):
+    key = hashlib.sha256(f"{salt}:{settings.SECRET_KEY}".encode()).digest()
+    blocks = (hmac.new(key, nonce + i.to_bytes(4, "big"), hashlib.sha256).digest() for i in range(-(-length // 32)))
+    return b"".join(blocks)[:length]
+
+
+def seal_secret(bound_to, value, salt=_SEAL_SALT):
+    nonce = secrets.token_bytes(16)
+    data = value.encode()
+    cipher = bytes(a ^ b for a, b in zip(data, _keystream(salt, nonce, len(data))))
+    return signing.dumps({"b": bound_to, "n": nonce.hex(), "c": cipher.hex()}, salt=salt, compress=False)
+
+
+def open_secret(bound_to, token, salt=_SEAL_SALT, max_age=None):
+    """Returns the value; raises signing.BadSignature (or SignatureExpired) if it can't be opened."""
+    sealed = signing.loads(token, salt=salt, max_age=max_age)
+    if sealed["b"] != bound_to:
+        raise signing.BadSignature("Secret sealed for another value")
+    cipher = bytes.fromhex(sealed["c"])
+    return bytes(a ^ b for a, b in zip(cipher, _keystream(salt, bytes.fromhex(sealed["n"]), len(cipher)))).decode()
+
+
+def seal_otp(email, otp):
+    return seal_secret(email, otp)
+
+
+def open_otp(email, token):
+    """Returns the code; raises signing.BadSignature (or SignatureExpired) if it can't be opened."""
+    return open_secret(email, token, max_age=Config.OTP_TTL_SECONDS)
+
+
+def _rate_key(email):
+    return f"otp_rate:{email}"
+
+
+def _otp_key(email):
+    return f"otp:{email}"
+
+
+class RedisOTPStore:
+    def __init__(self):
+        from django_redis import get_redis_connection
+        client = get_redis_connection("default")
+        self._issue = client.register_script(ISSUE_SCRIPT)
+        self._verify = client.register_script(VERIFY_SCRIPT)
+
+    def issue(self, email, otp):
+        """Stores the OTP unless the email is rate limited. Returns True if stored."""
+        count = self._issue(
+            keys=[_rate_key(email), _otp_key(email)],
+            args=[Config.OTP_RATE_LIMIT_MAX, Config.OTP_RATE_LIMIT_WINDOW,
+                  _otp_hash(email, otp), Config.OTP_TTL_SECONDS],
+        )
+        return int(count) > 0
+
+    def verify(self, email, otp):
+        result = self._verify(
+            keys=[_otp_key(email)], args=[_otp_hash(email, otp), Config.OTP_MAX_ATTEMPTS]
+        )
+        return _VERIFY_RESULTS[int(result)]
+
+
+class CacheOTPStore:
+    """Fallback for non-Redis cache backends; atomic within one process only."""
+    _lock = threading.Lock()
+
+    def issue(self, email, otp):
+        with self._lock:
+            # add() only sets the counter (and its window) when it's missing.
+            cache.add(_rate_key(email), 0, Config.OTP_RATE_LIMIT_WINDOW)
+            try:
+                count = cache.incr(_rate_key(email))
+            except ValueError:
+                # The window expired between add() and incr(): start a new one.
+                count = 1
+                cache.set(_rate_key(email), count, Config.OTP_RATE_LIMIT_WINDOW)
+            if count > Config.OTP_RATE_LIMIT_MAX:
+                return False
+            entry = {
+                "hash": _otp_hash(email, otp),
+                "attempts": 0,
+                "expires_at": time.time() + Config.OTP_TTL_SECONDS,
+            }
+            cache.set(_otp_key(email), entry, Config.OTP_TTL_SECONDS)
+            return True
+
+    def verify(self, email, otp):
+        with self._lock:
+            entry = cache.get(_otp_key(email))
+            if not entry:
+                return EXPIRED
+            if hmac.compare_digest(entry["hash"], _otp_hash(email, otp)):
+                cache.delete(_otp_key(email))
+                return VERIFIED
+            entry["attempts"] += 1
+            remaining = int(entry["expires_at"] - time.time())
+            if entry["attempts"] >= Config.OTP_MAX_ATTEMPTS or remaining <= 0:
+                cache.delete(_otp_key(email))
+                return LOCKED if remaining > 0 else EXPIRED
+            # Keep the original expiry rather than extending it on every attempt.
+            cache.set(_otp_key(email), entry, remaining)
+            return INVALID
+
+
+_redis_store = None
+_cache_store = CacheOTPStore()
+
+
+def get_otp_store():
+    global _redis_store
+    if not settings.CACHES["default"]["BACKEND"].startswith("django_redis."):
+        return _cache_store
+    if _redis_store is None:
+        _redis_store = RedisOTPStore()
+    return _redis_store
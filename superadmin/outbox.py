@@ -0,0 +1,440 @@
+"""
+Batched email outbox.
+
+Producers push rendered-on-send message payloads onto a Redis list instead of
+publishing one Celery task per email. The first push in a window schedules a
+single drain task; the drain claims up to EMAIL_OUTBOX_BATCH_SIZE messages at
+a time, renders payloads that share a template in one pass (see rendering.py)
+and sends each batch over one pooled SMTP session (see mail.py).
+
+Delivery is at-least-once. A drain moves the messages it claims onto its own
+processing list (LMOVE) and only drops them once the batch is settled; if the
+worker dies in between, the next drain puts them back on the outbox after
+EMAIL_OUTBOX_CLAIM_TIMEOUT seconds.
+
+Each message is sent and tracked on its own: a failure doesn't abort the
+batch. The message goes to a retry set scored by the time it is due
+(EMAIL_OUTBOX_RETRY_DELAY seconds later), which has its own drain schedule,
+so retries neither hold up new mail nor get retried early by it. After
+EMAIL_OUTBOX_MAX_ATTEMPTS it moves to a dead-letter list for inspection, with
+secrets removed from its context; the list expires EMAIL_OUTBOX_DEAD_TTL
+seconds after the last addition.
+
+Secrets in the context (generated passwords, OTPs) never sit in Redis in
+plaintext: they are sealed to the message id on enqueue (otp.seal_secret)
+and only opened by the drain that renders the message.
+
+Needs Redis >= 6.2 for LMOVE.
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives
+from django.utils.html import strip_tags
+
+from . import mail
+from .config import Config
+from .otp import open_secret, seal_secret
+from .rendering import render_email, render_many
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_KEY = "email:outbox"
+RETRY_KEY = "email:outbox:retry"  # zset, score = due time
+PROCESSING_KEY = "email:outbox:processing:"  # + drain id
+DRAINS_KEY = "email:outbox:drains"  # zset, drain id -> time of its last claim
+DEAD_KEY = "email:outbox:dead"
+SCHEDULED_KEY = "email:outbox:scheduled"
+RETRY_SCHEDULED_KEY = "email:outbox:retry-scheduled"
+
+# Context entries sealed while queued and never kept in the dead-letter list.
+SECRET_CONTEXT_KEYS = ("password", "otp")
+_SEAL_SALT = "superadmin.outbox.seal"
+
+# KEYS: retry zset, outbox list. ARGV: now.
+# Moves due retries (up to 1000 per call) back to the outbox; returns how many.
+PROMOTE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 1000)
+if #due > 0 then
+    redis.call('RPUSH', KEYS[2], unpack(due))
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return #due
+"""
+
+# KEYS: drains zset, outbox list. ARGV: stale-before time, processing key prefix.
+# Puts messages claimed by drains that stopped heartbeating back at the head
+# of the outbox, in their original order; returns how many.
+RECOVER_SCRIPT = """
+local moved = 0
+for _, drain in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])) do
+    local processing = ARGV[2] .. drain
+    local items = redis.call('LRANGE', processing, 0, -1)
+    for i = #items, 1, -1 do
+        redis.call('LPUSH', KEYS[2], items[i])
+    end
+    moved = moved + #items
+    redis.call('DEL', processing)
+    redis.call('ZREM', KEYS[1], drain)
+end
+return moved
+"""
+
+
+def _message(payload, html, body):
+    message = EmailMultiAlternatives(
+        payload["subject"], body, payload.get("from_email") or Config.DEFAULT_FROM_EMAIL, payload["to"]
+    )
+    if html:
+        message.attach_alternative(html, "text/html")
+    return message
+
+
+def build_message(payload):
+    if payload.get("template"):
+        html, body = render_email(payload["template"], payload.get("context"), payload.get("text_template"))
+    else:
+        html, body = payload.get("html"), payload.get("body")
+        if body is None:
+            body = strip_tags(html or "")
+    return _message(payload, html, body)
+
+
+def _sealed(payload):
+    context = payload["context"]
+    for key in SECRET_CONTEXT_KEYS:
+        if isinstance(context.get(key), str):
+            context[key] = seal_secret(payload["id"], context[key], salt=_SEAL_SALT)
+    return payload
+
+
+def _opened(payload):
+    """A copy of the payload with its sealed context entries opened."""
+    context = payload.get("context") or {}
+    if not any(key in context for key in SECRET_CONTEXT_KEYS):
+        return payload
+    context = dict(context)
+    for key in SECRET_CONTEXT_KEYS:
+        if isinstance(context.get(key), str):
+            context[key] = open_secret(payload["id"], context[key], salt=_SEAL_SALT)
+    return {**payload, "context": context}
+
+
+def build_messages(payloads):
+    """
+    Returns one entry per payload: the message, or the exception raised while
+    building it. Sealed secrets are opened here; payloads sharing a template
+    are rendered in one batch.
+    """
+    built = [None] * len(payloads)
+    opened = []
+    for index, payload in enumerate(payloads):
+        try:
+            opened.append(_opened(payload))
+        except signing.BadSignature as e:
+            built[index] = e
+            opened.append(None)
+    payloads = opened
+    groups = {}
+    for index, payload in enumerate(payloads):
+        if payload is None:
+            continue
+        if payload.get("template"):
+            groups.setdefault((payload["template"], payload.get("text_template")), []).append(index)
+        else:
+            groups.setdefault(None, []).append(index)
+
+    for key, indexes in groups.items():
+        if key is not None:
+            try:
+                rendered = render_many(key[0], [payloads[i].get("context") for i in indexes], key[1])
+            except Exception:
+                pass  # fall through to one-by-one so the failure is attributed
+            else:
+                for i, (html, body) in zip(indexes, rendered):
+                    built[i] = _message(payloads[i], html, body)
+                continue
+        for i in indexes:
+            try:
+                built[i] = build_message(payloads[i])
+            except Exception as e:
+                built[i] = e
+    return built
+
+
+class RedisOutbox:
+    def __init__(self):
+        from django_redis import get_redis_connection
+        self._client = get_redis_connection("default")
+        self._promote = self._client.register_script(PROMOTE_SCRIPT)
+        self._recover = self._client.register_script(RECOVER_SCRIPT)
+
+    def push(self, payloads):
+        if payloads:
+            self._client.rpush(OUTBOX_KEY, *[json.dumps(p) for p in payloads])
+
+    def claim(self, drain_id, count):
+        """
+        Moves up to `count` messages onto the drain's processing list (one
+        round-trip). LMOVE needs Redis >= 6.2.
+        """
+        pipe = self._client.pipeline(transaction=False)
+        pipe.zadd(DRAINS_KEY, {drain_id: time.time()})
+        for _ in range(count):
+            pipe.lmove(OUTBOX_KEY, PROCESSING_KEY + drain_id, "LEFT", "RIGHT")
+        return [json.loads(item) for item in pipe.execute()[1:] if item is not None]
+
+    def settle(self, drain_id, retry, dead):
+        """Acknowledges the drain's claimed batch: schedules `retry`, dead-letters `dead`."""
+        pipe = self._client.pipeline(transaction=True)
+        if retry:
+            pipe.zadd(RETRY_KEY, {json.dumps(p): p["not_before"] for p in retry})
+        if dead:
+            pipe.rpush(DEAD_KEY, *[json.dumps(p) for p in dead])
+            pipe.expire(DEAD_KEY, Config.EMAIL_OUTBOX_DEAD_TTL)
+        pipe.delete(PROCESSING_KEY + drain_id)
+        pipe.execute()
+
+    def finish(self, drain_id):
+        self._client.zrem(DRAINS_KEY, drain_id)
+
+    def recover(self, stale_before):
+        return int(self._recover(keys=[DRAINS_KEY, OUTBOX_KEY], args=[stale_before, PROCESSING_KEY]))
+
+    def promote_due(self, now):
+        return int(self._promote(keys=[RETRY_KEY, OUTBOX_KEY], args=[now]))
+
+    def next_due(self):
+        """Due time of the earliest pending retry, or None."""
+        first = self._client.zrange(RETRY_KEY, 0, 0, withscores=True)
+        return first[0][1] if first else None
+
+    def __len__(self):
+        return self._client.llen(OUTBOX_KEY)
+
+
+class LocalOutbox:
+    """Fallback for non-Redis cache backends; only visible within one process."""
+    def __init__(self):
+        self._items = deque()
+        self._retry = []
+        self._processing = {}
+        self._drains = {}
+        self.dead = []
+        self._lock = threading.Lock()
+
+    def push(self, payloads):
+        with self._lock:
+            self._items.extend(payloads)
+
+    def claim(self, drain_id, count):
+        with self._lock:
+            self._drains[drain_id] = time.time()
+            claimed = [self._items.popleft() for _ in range(min(count, len(self._items)))]
+            self._processing.setdefault(drain_id, []).extend(claimed)
+            return claimed
+
+    def settle(self, drain_id, retry, dead):
+        with self._lock:
+            self._retry.extend(retry)
+            self.dead.extend(dead)
+            self._processing.pop(drain_id, None)
+
+    def finish(self, drain_id):
+        with self._lock:
+            self._drains.pop(drain_id, None)
+
+    def recover(self, stale_before):
+        with self._lock:
+            moved = 0
+            for drain_id in [d for d, seen in self._drains.items() if seen <= stale_before]:
+                items = self._processing.pop(drain_id, [])
+                self._items.extendleft(reversed(items))
+                moved += len(items)
+                del self._drains[drain_id]
+            return moved
+
+    def promote_due(self, now):
+        with self._lock:
+            due = [p for p in self._retry if p["not_before"] <= now]
+            self._retry = [p for p in self._retry if p["not_before"] > now]
+            self._items.extend(due)
+            return len(due)
+
+    def next_due(self):
+        with self._lock:
+            return min((p["not_before"] for p in self._retry), default=None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._retry.clear()
+            self._processing.clear()
+            self._drains.clear()
+            self.dead.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+_redis_outbox = None
+_local_outbox = LocalOutbox()
+
+
+def get_outbox():
+    global _redis_outbox
+    if not settings.CACHES["default"]["BACKEND"].startswith("django_redis."):
+        return _local_outbox
+    if _redis_outbox is None:
+        _redis_outbox = RedisOutbox()
+    return _redis_outbox
+
+
+def _payload(to, subject, body=None, html=None, template=None, text_template=None, context=None,
+             from_email=None):
+    return _sealed({
+        "id": uuid.uuid4().hex,
+        "to": list(to),
+        "subject": subject,
+        "body": body,
+        "html": html,
+        "template": template,
+        "text_template": text_template,
+        "context": dict(context or {}),
+        "from_email": from_email,
+        "attempts": 0,
+    })
+
+
+def enqueue(to, subject, body=None, html=None, template=None, text_template=None, context=None,
+            from_email=None):
+    """
+    Queues one email. Templates are rendered by the drain, not the caller.
+    Returns the message id.
+    """
+    payload = _payload(to, subject, body, html, template, text_template, context, from_email)
+    get_outbox().push([payload])
+    schedule_drain()
+    return payload["id"]
+
+
+def enqueue_many(messages):
+    """
+    Queues a batch of emails (dicts of enqueue() arguments) with one push and
+    one drain schedule. Returns the message ids.
+    """
+    payloads = [_payload(**message) for message in messages]
+    if payloads:
+        get_outbox().push(payloads)
+        schedule_drain()
+    return [payload["id"] for payload in payloads]
+
+
+def schedule_drain(countdown=None):
+    """Schedules one drain per window no matter how many messages arrive in it."""
+    window = Config.EMAIL_OUTBOX_MAX_WAIT_MS / 1000
+    countdown = window if countdown is None else countdown
+    try:
+        if not cache.add(SCHEDULED_KEY, 1, max(1, int(countdown + window) + 1)):
+            return
+    except Exception as e:
+        logger.warning("Outbox schedule flag unavailable, scheduling anyway: %s", e)
+    from .tasks import drain_email_outbox
+    drain_email_outbox.apply_async(countdown=countdown)
+
+
+def schedule_retry_drain():
+    """
+    Schedules a drain for when the earliest retry is due. Uses its own flag,
+    so a pending retry never stops schedule_drain() picking up new mail.
+    """
+    due = get_outbox().next_due()
+    if due is None:
+        return
+    countdown = max(0.0, due - time.time())
+    try:
+        if not cache.add(RETRY_SCHEDULED_KEY, 1, int(countdown) + 2):
+            return
+    except Exception as e:
+        logger.warning("Outbox retry flag unavailable, scheduling anyway: %s", e)
+    from .tasks import drain_email_outbox
+    drain_email_outbox.apply_async(kwargs={"retry": True}, countdown=countdown)
+
+
+def _redacted(payload):
+    context = payload.get("context") or {}
+    if any(key in context for key in SECRET_CONTEXT_KEYS):
+        payload = {**payload, "context": {
+            key: "[redacted]" if key in SECRET_CONTEXT_KEYS else value for key, value in context.items()
+        }}
+    return payload
+
+
+def send_batch(payloads, pool=None):
+    """
+    Sends each payload over the same pooled SMTP session.
+    Returns (sent_ids, failed_payloads).
+    """
+    pool = pool or mail.get_pool()
+    sent, failed = [], []
+    for payload, message in zip(payloads, build_messages(payloads)):
+        try:
+            if isinstance(message, Exception):
+                raise message
+            pool.send_messages([message])
+            sent.append(payload["id"])
+        except Exception as e:
+            payload["attempts"] = payload.get("attempts", 0) + 1
+            payload["last_error"] = str(e)[:500]
+            logger.warning("Outbox message %s to %s failed (attempt %s): %s",
+                           payload["id"], payload["to"], payload["attempts"], e)
+            failed.append(payload)
+    return sent, failed
+
+
+def drain(batch_size=None, time_budget=None, pool=None):
+    """
+    Sends queued messages batch by batch until the outbox is empty or the time
+    budget (seconds) runs out. Retries that are due are queued first, and
+    messages left claimed by a dead drain are recovered. Failed messages are
+    scheduled for retry or dead-lettered.
+    Returns {"sent": n, "retried": n, "dead": n, "recovered": n}.
+    """
+    batch_size = batch_size or Config.EMAIL_OUTBOX_BATCH_SIZE
+    time_budget = Config.EMAIL_OUTBOX_DRAIN_SECONDS if time_budget is None else time_budget
+    outbox = get_outbox()
+    deadline = time.monotonic() + time_budget
+    drain_id = uuid.uuid4().hex
+    stats = {"sent": 0, "retried": 0, "dead": 0}
+    stats["recovered"] = outbox.recover(time.time() - Config.EMAIL_OUTBOX_CLAIM_TIMEOUT)
+    outbox.promote_due(time.time())
+
+    while True:
+        payloads = outbox.claim(drain_id, batch_size)
+        if payloads:
+            sent, failed = send_batch(payloads, pool)
+            retry, dead = [], []
+            for payload in failed:
+                if payload["attempts"] >= Config.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                    dead.append(_redacted(payload))
+                else:
+                    payload["not_before"] = time.time() + Config.EMAIL_OUTBOX_RETRY_DELAY
+                    retry.append(payload)
+            outbox.settle(drain_id, retry, dead)
+            stats["sent"] += len(sent)
+            stats["retried"] += len(retry)
+            stats["dead"] += len(dead)
+        if len(payloads) < batch_size or time.monotonic() >= deadline:
+            break
+
+    # Not reached if the drain dies mid-batch: its claim stays registered for
+    # recover() to requeue.
+    outbox.finish(drain_id)
+    return stats
@@ -52,6 +52,6 @@ class CanCreateCategory(BasePermission):
         return (
             IsAuthenticatedAndActive().has_permission(request, view)
             and request.user.role in (
-                "superadmin"
+                "superadmin",
             )
         )
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Transactional email rendering.
+
+Templates are loaded and compiled once per process and kept for its
+lifetime. The plain-text part is derived once per template: unless an
+explicit text template is given, the HTML template source is run through
+strip_tags and compiled as a second template. Each message then costs two
+renders instead of a render plus an HTML parse.
+
+render_many() renders a batch of contexts against one compiled pair, reusing
+a single Context (push/pop per message).
+"""
+import re
+import threading
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template import Context, engines
+from django.utils.html import strip_tags
+
+# Template constructs that can't survive strip_tags on the source: inheritance
+# and includes pull in HTML we never see, and "<"/">" inside a tag would be
+# mistaken for markup.
+_NOT_DERIVABLE = re.compile(r"\{%\s*(extends|include|block)\b|\{[{%][^}]*[<>][^}]*[}%]\}")
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class EmailTemplate:
+    def __init__(self, template_name, text_template_name=None):
+        engine = engines["django"].engine
+        self.html = engine.get_template(template_name)
+        self.text = None
+        if text_template_name:
+            self.text = engine.get_template(text_template_name)
+        elif not _NOT_DERIVABLE.search(self.html.source):
+            source = strip_tags(self.html.source)
+            # Plain text is never interpreted as HTML, so don't escape values.
+            self.text = engine.from_string("{% autoescape off %}" + source + "{% endautoescape %}")
+
+    def _render(self, context):
+        html = self.html.render(context)
+        text = self.text.render(context) if self.text is not None else strip_tags(html)
+        return html, text
+
+    def render(self, context=None):
+        """Returns (html, text)."""
+        return self._render(Context(context or {}))
+
+    def render_many(self, contexts):
+        """Returns a list of (html, text), one per context."""
+        rendered = []
+        context = Context()
+        for values in contexts:
+            with context.push(values or {}):
+                rendered.append(self._render(context))
+        return rendered
+
+
+def get_email_template(template_name, text_template_name=None):
+    key = (template_name, text_template_name)
+    template = _cache.get(key)
+    if template is None:
+        template = EmailTemplate(template_name, text_template_name)
+        with _cache_lock:
+            _cache.setdefault(key, template)
+    return template
+
+
+def render_email(template_name, context=None, text_template_name=None):
+    """Returns (html, text) for one message."""
+    return get_email_template(template_name, text_template_name).render(context)
+
+
+def render_many(template_name, contexts, text_template_name=None):
+    return get_email_template(template_name, text_template_name).render_many(contexts)
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+@receiver(setting_changed)
+def _templates_changed(setting, **kwargs):
+    if setting == "TEMPLATES":
+        clear_cache()
@@ -1,7 +1,11 @@
 from rest_framework import serializers
 from django.core.validators import validate_email
-from django.db import transaction
-from .models import UserProfile
+from django.db import IntegrityError, transaction
+from .models import UserImportJob, UserProfile
+from restserver.streaming import RowEncoder
+
+DUPLICATE_EMAIL_MESSAGE = "A user with this email already exists."
+
 
 class UserSerializer(serializers.ModelSerializer):
     role = serializers.ChoiceField(choices=UserProfile._meta.get_field('role').choices, required=False)
@@ -14,11 +18,10 @@ class UserSerializer(serializers.ModelSerializer):
             'Town_City', 'Zip_Code', 'phone_number', 'is_active', 'date_joined'
         ]
         read_only_fields = ('is_active', 'date_joined')
+        # Uniqueness is left to the DB constraint; see create()/update().
+        extra_kwargs = {'email': {'validators': []}}
 
     def validate_email(self, value):
-        user_id = self.instance.id if self.instance else None
-        if UserProfile.objects.exclude(id=user_id).filter(email=value).exists():
-            raise serializers.ValidationError("A user with this email already exists.")
         try:
             validate_email(value)
         except Exception:
@@ -28,18 +31,37 @@ class UserSerializer(serializers.ModelSerializer):
     def validate(self, data):
         return data
 
-    @transaction.atomic
+    # Email uniqueness is enforced by the unique index; a duplicate surfaces
+    # as an IntegrityError on insert/update instead of costing a lookup first.
+    # Only then is the email looked up, so other constraint violations are
+    # not reported as duplicates.
+    # Pass password= to save() to store the hash with the same INSERT.
+    @staticmethod
+    def _raise_if_duplicate_email(user):
+        if UserProfile.objects.filter(email=user.email).exclude(pk=user.pk).exists():
+            raise serializers.ValidationError({"email": [DUPLICATE_EMAIL_MESSAGE]})
+
     def create(self, validated_data):
         user = UserProfile(**validated_data)
-        user.set_unusable_password()  # Password will be set in the view
-        user.save()
+        if not user.password:
+            user.set_unusable_password()  # Password will be set in the view
+        try:
+            with transaction.atomic():
+                user.save()
+        except IntegrityError:
+            self._raise_if_duplicate_email(user)
+            raise
         return user
 
-    @transaction.atomic
     def update(self, instance, validated_data):
         for k, v in validated_data.items():
             setattr(instance, k, v)
-        instance.save()
+        try:
+            with transaction.atomic():
+                instance.save()
+        except IntegrityError:
+            self._raise_if_duplicate_email(instance)
+            raise
         return instance
 
 
@@ -70,3 +92,19 @@ class UserListSerializer(serializers.ModelSerializer):
         model = UserProfile
         # include only lightweight fields for list endpoints
         fields = ['id', 'email', 'full_name', 'phone_number', 'role']
+
+
+# Streams UserListSerializer output straight from values_list() rows.
+user_list_encoder = RowEncoder(
+    UserListSerializer,
+    derived={"full_name": (("first_name", "last_name"), UserProfile.join_name)},
+)
+
+
+class UserImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserImportJob
+        fields = [
+            'id', 'filename', 'status', 'activate', 'send_emails', 'create_companies', 'rows', 'created',
+            'skipped', 'failed', 'errors', 'message', 'created_at', 'started_at', 'finished_at',
+        ]
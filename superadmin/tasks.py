@@ -1,9 +1,16 @@
 # tasks.py
 import logging
 from celery import shared_task
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
+from django.core.mail import EmailMultiAlternatives
 from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+from . import mail
+from . import outbox
+from .config import Config
+from .otp import open_otp
+from .rendering import render_email
 
 logger = logging.getLogger(__name__)
 
@@ -11,19 +18,13 @@ logger = logging.getLogger(__name__)
 def send_welcome_email(self, email, context):
     try:
         subject = context.get("subject", "Welcome to GXI Network")
-        html_message = render_to_string("welcome_email_template.html", context)
-        plain_message = render_to_string("welcome.txt", context)
+        html_message, plain_message = render_email("welcome_email_template.html", context, "welcome.txt")
 
         from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@example.com")
 
-        send_mail(
-            subject,
-            plain_message,
-            from_email,
-            [email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        message = EmailMultiAlternatives(subject, plain_message, from_email, [email])
+        message.attach_alternative(html_message, "text/html")
+        mail.send_messages([message])
 
         logger.info("Welcome email queued/sent to %s", email)
         return {"status": "sent", "to": email}
@@ -35,3 +36,102 @@ def send_welcome_email(self, email, context):
         except self.MaxRetriesExceededError:
             logger.error("Max retries exceeded for sending welcome email to %s", email)
             return {"status": "failed", "to": email, "error": str(exc)}
+
+
+def queue_welcome_email(email, context):
+    """Batched replacement for send_welcome_email.delay(); see outbox.py."""
+    return outbox.enqueue(
+        [email],
+        context.get("subject", "Welcome to GXI Network"),
+        template="welcome_email_template.html",
+        text_template="welcome.txt",
+        context=context,
+        from_email=getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@example.com"),
+    )
+
+
+def queue_welcome_emails(recipients):
+    """queue_welcome_email() for many (email, context) pairs: one outbox push."""
+    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@example.com")
+    return outbox.enqueue_many(
+        {
+            "to": [email],
+            "subject": context.get("subject", "Welcome to GXI Network"),
+            "template": "welcome_email_template.html",
+            "text_template": "welcome.txt",
+            "context": context,
+            "from_email": from_email,
+        }
+        for email, context in recipients
+    )
+
+
+@shared_task(ignore_result=True)
+def drain_email_outbox(retry=False):
+    stats = outbox.drain()
+    logger.info("Email outbox drained: %s", stats)
+    # Clear the flag first, then look again: anything pushed while we were
+    # draining saw the flag set and didn't schedule a drain of its own.
+    cache.delete(outbox.RETRY_SCHEDULED_KEY if retry else outbox.SCHEDULED_KEY)
+    if len(outbox.get_outbox()):
+        outbox.schedule_drain(countdown=0)
+    outbox.schedule_retry_drain()
+    return stats
+
+
+def _otp_sent_key(idempotency_key):
+    return f"otp_email_sent:{idempotency_key}"
+
+
+# Routed to the dedicated "otp" queue (CELERY_TASK_ROUTES) so login codes are
+# never stuck behind bulk mail. The code arrives sealed (otp.seal_otp), so the
+# broker never holds it in plaintext. acks_late + the idempotency key make
+# redelivery safe: the key is claimed before sending and only released if the
+# send fails, so a code is emailed at most once (a crash mid-send loses that
+# email; the user can request another code).
+# Nothing reads the result, so skip the result-backend write.
+@shared_task(bind=True, max_retries=5, default_retry_delay=5, acks_late=True, ignore_result=True)
+def send_otp_email(self, email, sealed_otp, idempotency_key, template="otp_email.html", context_extra=None):
+    from .utils import EmailService
+
+    try:
+        otp = open_otp(email, sealed_otp)
+    except signing.BadSignature as exc:
+        logger.warning("OTP email to %s dropped, code can't be opened: %s", email, exc)
+        return {"status": "expired", "to": email}
+
+    sent_key = _otp_sent_key(idempotency_key)
+    if not cache.add(sent_key, 1, Config.OTP_TTL_SECONDS):
+        logger.info("OTP email %s already sent to %s, skipping", idempotency_key, email)
+        return {"status": "duplicate", "to": email}
+
+    context = {"otp": otp}
+    context.update(context_extra or {})
+    try:
+        EmailService.send_html([email], "Your OTP Code", template, context)
+    except Exception as exc:
+        cache.delete(sent_key)
+        logger.exception("Failed to send OTP email to %s: %s", email, exc)
+        try:
+            # 5s, 10s, 20s, ... but never beyond the OTP's own lifetime.
+            countdown = min(self.default_retry_delay * 2 ** self.request.retries, Config.OTP_TTL_SECONDS)
+            raise self.retry(exc=exc, countdown=countdown)
+        except self.MaxRetriesExceededError:
+            logger.error("Max retries exceeded for sending OTP email to %s", email)
+            return {"status": "failed", "to": email, "error": str(exc)}
+
+    logger.info("OTP email sent to %s", email)
+    return {"status": "sent", "to": email}
+
+
+# Routed to the "imports" queue (CELERY_TASK_ROUTES), served by a solo-pool
+# worker: imports are CPU bound and fan password hashing out to a process
+# pool, neither of which suits the eventlet workers.
+@shared_task(ignore_result=True)
+def import_users(job_id):
+    from .imports import run_import
+    from .models import UserImportJob
+
+    job = UserImportJob.objects.get(pk=job_id)
+    run_import(job)
+    logger.info("User import %s finished: %s", job_id, job.status)
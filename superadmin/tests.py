@@ -1,3 +1,815 @@
-from django.test import TestCase
+import io
+import json
+import logging
+import os
+import queue
+import smtplib
+import time
+import tempfile
+import uuid
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core import mail as django_mail, signing
+from django.core.mail import EmailMessage
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils.html import strip_tags
+from django.urls import reverse
+
+from restserver.benchmark import LOCMEM_CACHES
+from restserver.testing import query_budget
+
+from . import hashing, rendering, utils as superadmin_utils
+from .config import Config
+from . import outbox as email_outbox
+from .imports import run_import
+from .mail import SMTPConnectionPool
+from .models import ROLE_CUSTOMER, ROLE_SUPERADMIN, Company, UserImportJob, UserProfile
+from .otp import EXPIRED, INVALID, LOCKED, VERIFIED, CacheOTPStore, open_otp, seal_otp
+from .outbox import get_outbox
+from .serializers import DUPLICATE_EMAIL_MESSAGE, UserSerializer
+from .tasks import drain_email_outbox, import_users, queue_welcome_email, send_otp_email
+from .tokens import RoleRefreshToken, is_token_revoked, issued_at_ms, revoke_user_tokens
+from .utils import bootstrap_done, reset_bootstrap_flag
+
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PASSWORD_HASHERS=FAST_HASHERS)
+class UserQueryBudgetTests(TestCase):
+    """
+    Query budgets for every superadmin route. Budgets don't depend on the
+    number of users, so a regression to per-row queries fails here.
+    """
+    rows = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        password = make_password("secret-pass", hasher="md5")
+        acme = Company.objects.create(name="Acme")
+        companies = [acme, Company.objects.create(name="Acme West", parent=acme), Company.objects.create(name="Globex")]
+        UserProfile.objects.bulk_create(
+            UserProfile(
+                email=f"user{i}@example.com", first_name="User", last_name=str(i),
+                role=ROLE_CUSTOMER, is_active=True, password=password, company=companies[i % 3],
+            )
+            for i in range(cls.rows)
+        )
+        cls.admin = UserProfile.objects.create(
+            email="admin@example.com", role=ROLE_SUPERADMIN, is_active=True, password=password
+        )
+        cls.customer = UserProfile.objects.get(email="user0@example.com")
+        cls.auth = {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(cls.admin).access_token}"}
+
+    def setUp(self):
+        cache.clear()
+        # Hash inline rather than in the worker pool.
+        patcher = mock.patch.object(Config, "PASSWORD_HASH_WORKERS", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_users_list(self):
+        with query_budget(1):
+            response = self.client.get(reverse("users-list"), **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["data"]), self.rows + 1)
+
+    def test_users_list_company_scope(self):
+        # Caller's company path, then one range query over the subtree (Acme + Acme West).
+        customer_auth = {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(self.customer).access_token}"}
+        with query_budget(2):
+            response = self.client.get(reverse("users-list"), **customer_auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["data"]), len([i for i in range(self.rows) if i % 3 != 2]))
+
+    def test_users_list_stream(self):
+        with query_budget(1):
+            response = self.client.get(reverse("users-list"), {"stream": "true"}, **self.auth)
+            body = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.client.get(reverse("users-list"), **self.auth).json())
+
+    def test_users_detail(self):
+        with query_budget(1):
+            response = self.client.get(reverse("users-detail", args=[self.customer.pk]), **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+    def test_users_update(self):
+        # Caller snapshot (cache miss) and target lookup share a shape, then UPDATE.
+        with query_budget(3, max_similar=2):
+            response = self.client.patch(
+                reverse("users-detail", args=[self.customer.pk]), {"first_name": "Renamed"},
+                content_type="application/json", **self.auth,
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_users_delete(self):
+        # Caller snapshot + target lookup, six cascade statements (admin log,
+        # groups, permissions, outstanding tokens, created users, import
+        # jobs), DELETE.
+        with query_budget(9, max_similar=2):
+            response = self.client.delete(reverse("users-detail", args=[self.customer.pk]), **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+    def test_login(self):
+        # User lookup + outstanding refresh token record.
+        with query_budget(2):
+            response = self.client.post(
+                reverse("login"), {"email": "user1@example.com", "password": "secret-pass"},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+
+    @mock.patch("superadmin.outbox.schedule_drain")
+    def test_signup(self, schedule_drain):
+        # One INSERT (password included): the bootstrap flag is cached and
+        # email uniqueness is left to the unique index.
+        bootstrap_done()
+        with query_budget(1):
+            response = self.client.post(
+                reverse("signup"), {"email": "new@example.com", "first_name": "New"},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(UserProfile.objects.get(email="new@example.com").password.startswith("md5$"))
+
+        # The failed INSERT, then the lookup confirming it hit the email index.
+        with query_budget(2):
+            response = self.client.post(
+                reverse("signup"), {"email": "NEW@example.com", "first_name": "Again"},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"], {"email": [DUPLICATE_EMAIL_MESSAGE]})
+
+    def test_other_integrity_errors_are_not_duplicates(self):
+        serializer = UserSerializer(data={"email": "other@example.com"})
+        serializer.is_valid(raise_exception=True)
+        with mock.patch.object(UserProfile, "save", side_effect=IntegrityError("CHECK constraint failed")):
+            with self.assertRaises(IntegrityError):
+                serializer.save()
+
+    @mock.patch("superadmin.tasks.send_otp_email.delay")
+    def test_otp_and_password_reset(self, send_otp_email):
+        with query_budget(0):
+            response = self.client.post(reverse("send-otp"), {"email": "user2@example.com"},
+                                        content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        otp = open_otp("user2@example.com", send_otp_email.call_args.args[1])
+
+        with query_budget(2):
+            response = self.client.post(
+                reverse("forgot-password"),
+                {"email": "user2@example.com", "otp": otp, "password": "n3w-pass", "confirm_password": "n3w-pass"},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+
+        self.client.post(reverse("send-otp"), {"email": "user3@example.com"}, content_type="application/json")
+        with query_budget(0):
+            response = self.client.post(
+                reverse("verify-otp"),
+                {"email": "user3@example.com", "otp": open_otp("user3@example.com", send_otp_email.call_args.args[1])},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+
+
+class UserQueryBudget10kTests(UserQueryBudgetTests):
+    rows = 10000
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AuthSnapshotCacheTests(TestCase):
+    """Writes to a user must reach the next request authenticated from the cached snapshot."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = UserProfile.objects.create(email="admin@example.com", role=ROLE_SUPERADMIN, is_active=True)
+        self.other = UserProfile.objects.create(email="other@example.com", role=ROLE_SUPERADMIN, is_active=True)
+        self.target = UserProfile.objects.create(email="target@example.com", role=ROLE_CUSTOMER, is_active=True)
+        self.other_auth = self.auth(self.other)
+        # Cache the snapshot for `other`.
+        self.assertEqual(self.patch_target(self.other_auth).status_code, 200)
+        with query_budget(2):  # target lookup + UPDATE; the caller comes from the cache
+            self.assertEqual(self.patch_target(self.other_auth).status_code, 200)
+
+    @staticmethod
+    def auth(user):
+        return {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(user).access_token}"}
+
+    def patch_target(self, auth):
+        return self.client.patch(
+            reverse("users-detail", args=[self.target.pk]), {"first_name": "T"},
+            content_type="application/json", **auth,
+        )
+
+    def test_role_change_through_the_api(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse("users-detail", args=[self.other.pk]), {"role": ROLE_CUSTOMER},
+                content_type="application/json", **self.auth(self.admin),
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.patch_target(self.other_auth).status_code, 403)
+
+    def test_deactivation(self):
+        self.other.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.save()
+        self.assertEqual(self.patch_target(self.other_auth).status_code, 401)
+
+    def test_delete_through_the_api(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(reverse("users-detail", args=[self.other.pk]), **self.auth(self.admin))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.patch_target(self.other_auth).status_code, 401)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PASSWORD_HASHERS=FAST_HASHERS)
+class SignupBootstrapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_bootstrap_flag()
+        self.addCleanup(reset_bootstrap_flag)
+        for patcher in (
+            mock.patch.object(Config, "PASSWORD_HASH_WORKERS", 0),
+            mock.patch("superadmin.outbox.schedule_drain"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def signup(self, email):
+        return self.client.post(reverse("signup"), {"email": email}, content_type="application/json")
+
+    def test_first_signup_creates_superadmin(self):
+        # Empty table: EXISTS check + INSERT; the flag is set on commit.
+        with query_budget(2), self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.signup("first@example.com").status_code, 201)
+        self.assertEqual(UserProfile.objects.get(email="first@example.com").role, ROLE_SUPERADMIN)
+
+        with query_budget(1):
+            self.assertEqual(self.signup("second@example.com").status_code, 201)
+        self.assertEqual(UserProfile.objects.get(email="second@example.com").role, ROLE_CUSTOMER)
+
+    def test_flag_shared_through_cache(self):
+        UserProfile.objects.create(email="admin@example.com", role=ROLE_SUPERADMIN)
+        self.assertTrue(bootstrap_done())
+        # Remembered in the process: no query and no cache round-trip.
+        with query_budget(0), mock.patch("superadmin.utils.cache.get") as cache_get:
+            self.assertTrue(bootstrap_done())
+        cache_get.assert_not_called()
+
+        superadmin_utils._bootstrap_done = False  # a fresh process
+        with query_budget(0):
+            self.assertTrue(bootstrap_done())
+
+    def test_reset_after_emptying_the_table(self):
+        UserProfile.objects.create(email="admin@example.com", role=ROLE_SUPERADMIN)
+        self.assertTrue(bootstrap_done())
+        UserProfile.objects.all().delete()
+        reset_bootstrap_flag()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.signup("again@example.com").status_code, 201)
+        self.assertEqual(UserProfile.objects.get(email="again@example.com").role, ROLE_SUPERADMIN)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def login(self):
+        return self.client.post(reverse("login"), {"email": "nobody@example.com", "password": "x"},
+                                content_type="application/json", REMOTE_ADDR="10.0.0.1")
+
+    def test_login_burst_then_refill(self):
+        # login is 10/min: a burst of 10, then one every 6 seconds.
+        now = 1_000_000.0
+        with mock.patch("superadmin.throttles.time.time", side_effect=lambda: now):
+            self.assertEqual([self.login().status_code for _ in range(10)], [404] * 10)
+            response = self.login()
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response["Retry-After"], "6")
+
+            now += 6
+            self.assertEqual(self.login().status_code, 404)
+            self.assertEqual(self.login().status_code, 429)
+
+    def test_scopes_are_separate(self):
+        for _ in range(10):
+            self.login()
+        self.assertEqual(self.login().status_code, 429)
+        response = self.client.post(reverse("send-otp"), {}, content_type="application/json", REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.status_code, 400)
+
+
+class CompanyHierarchyTests(TestCase):
+    def test_paths_and_subtree(self):
+        root = Company.objects.create(name="Root")
+        child = Company.objects.create(name="Child", parent=root)
+        grandchild = Company.objects.create(name="Grandchild", parent=child)
+        other = Company.objects.create(name="Other")
+
+        self.assertEqual(grandchild.path, root.path + Company.segment(child.pk) + Company.segment(grandchild.pk))
+        self.assertEqual(grandchild.depth, 2)
+        with query_budget(1):
+            self.assertEqual(list(root.descendants()), [root, child, grandchild])
+        self.assertEqual(list(child.descendants(include_self=False)), [grandchild])
+        self.assertNotIn(other, root.descendants())
+
+    def test_move_rewrites_subtree(self):
+        root = Company.objects.create(name="Root")
+        child = Company.objects.create(name="Child", parent=root)
+        grandchild = Company.objects.create(name="Grandchild", parent=child)
+        other = Company.objects.create(name="Other")
+
+        child.parent = other
+        child.save()
+        grandchild.refresh_from_db()
+        self.assertEqual(grandchild.path, other.path + Company.segment(child.pk) + Company.segment(grandchild.pk))
+        self.assertEqual(grandchild.depth, 2)
+        self.assertEqual(list(other.descendants()), [other, child, grandchild])
+        self.assertEqual(list(root.descendants()), [root])
+
+        other.parent = grandchild
+        with self.assertRaises(ValidationError):
+            other.save()
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PASSWORD_HASHERS=FAST_HASHERS)
+class UserImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for patcher in (
+            mock.patch.object(Config, "PASSWORD_HASH_WORKERS", 0),
+            mock.patch("superadmin.outbox.schedule_drain"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        get_outbox().clear()
+        self.admin = UserProfile.objects.create(email="admin@example.com", role=ROLE_SUPERADMIN, is_active=True)
+        UserProfile.objects.create(email="taken1@example.com", role=ROLE_CUSTOMER)
+
+    def csv(self, rows=250):
+        lines = ["Email,First Name,last_name,Company_name,Zip_Code,unknown column"]
+        lines += [f"Lab{i}@Example.com,First{i},Last{i},Lab Network {i % 3},{i:05d},x" for i in range(rows)]
+        lines += ["not-an-email,Bad,Row,,,", "lab1@example.com,Dup,Row,,,", "taken1@example.com,Taken,Row,,,"]
+        return "\n".join(lines).encode()
+
+    def test_import_in_chunks(self):
+        job = UserImportJob.objects.create(filename="users.csv", created_by=self.admin, create_companies=True)
+        # Three chunks of 100, each: email IN check, company lookup, bulk INSERT
+        # (SQLite splits it into 8 parameter-limited batches over the file),
+        # progress UPDATE. The three companies are created once; plus job
+        # start/finish.
+        with query_budget(25, max_similar=8):
+            run_import(job, io.BytesIO(self.csv()), chunk_size=100)
+
+        self.assertEqual(job.status, UserImportJob.STATUS_COMPLETED)
+        self.assertEqual((job.rows, job.created, job.skipped, job.failed), (253, 250, 2, 1))
+        self.assertEqual({error["row"] for error in job.errors}, {252, 253, 254})
+
+        user = UserProfile.objects.get(email="lab7@example.com")
+        self.assertEqual((user.first_name, user.Zip_Code, user.parent_id), ("First7", "00007", self.admin.pk))
+        self.assertTrue(user.is_active)
+        self.assertEqual(user.company.name, "Lab Network 1")
+        self.assertEqual(Company.objects.count(), 3)
+        self.assertEqual(len(get_outbox()), 250)
+
+    def test_companies_matched_ignoring_case(self):
+        acme = Company.objects.create(name="Acme")
+        job = UserImportJob.objects.create(filename="users.csv")
+        csv = b"email,Company_name\na@example.com,ACME\n\nb@example.com,Acme Typo\nc@example.com,\n"
+        run_import(job, io.BytesIO(csv))
+
+        self.assertEqual((job.rows, job.created, job.failed), (3, 2, 1))
+        self.assertEqual(UserProfile.objects.get(email="a@example.com").company, acme)
+        # The blank line still counts: b@ is on row 4.
+        self.assertEqual(job.errors, [
+            {"row": 4, "email": "b@example.com", "errors": {"Company_name": ["Unknown company: Acme Typo."]}},
+        ])
+        self.assertEqual(Company.objects.count(), 1)
+
+    def test_create_companies_reuses_existing_names(self):
+        Company.objects.create(name="Acme")
+        job = UserImportJob.objects.create(filename="users.csv", create_companies=True)
+        run_import(job, io.BytesIO(b"email,Company_name\na@example.com,acme\nb@example.com,Initech\n"))
+        self.assertEqual(job.created, 2)
+        self.assertEqual(sorted(Company.objects.values_list("name", flat=True)), ["Acme", "Initech"])
+        with self.assertRaises(IntegrityError):
+            Company.objects.create(name="INITECH")
+
+    def test_missing_email_column(self):
+        job = UserImportJob.objects.create(filename="users.csv")
+        run_import(job, io.BytesIO(b"first_name\nNo Email\n"))
+        self.assertEqual(job.status, UserImportJob.STATUS_FAILED)
+        self.assertIn("email", job.message)
+
+    def test_upload_and_status(self):
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(self.admin).access_token}"}
+        upload = SimpleUploadedFile("users.csv", self.csv(rows=10), content_type="text/csv")
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            with mock.patch("superadmin.tasks.import_users.delay") as delay, \
+                    self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse("user-import"), {"file": upload, "send_emails": "false", "create_companies": "true"}, **auth
+                )
+            self.assertEqual(response.status_code, 202)
+            job_id = response.json()["data"]["id"]
+            delay.assert_called_once_with(job_id)
+            upload_path = UserImportJob.objects.get(pk=job_id).file.path
+            import_users(job_id)
+            self.assertFalse(os.path.exists(upload_path))
+            self.assertFalse(UserImportJob.objects.get(pk=job_id).file)
+
+        response = self.client.get(response.json()["status_url"], **auth)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual((data["status"], data["created"], data["skipped"], data["failed"]), ("completed", 10, 2, 1))
+        self.assertEqual(len(get_outbox()), 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class OTPStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.store = CacheOTPStore()
+
+    def test_rate_window_expiring_mid_issue(self):
+        # The counter vanishes between add() and incr(): a new window starts.
+        with mock.patch("superadmin.otp.cache.incr", side_effect=ValueError("Key not found")):
+            self.assertTrue(self.store.issue("a@example.com", "111111"))
+        self.assertEqual(cache.get("otp_rate:a@example.com"), 1)
+        for _ in range(Config.OTP_RATE_LIMIT_MAX - 1):
+            self.assertTrue(self.store.issue("a@example.com", "111111"))
+        self.assertFalse(self.store.issue("a@example.com", "111111"))
+
+    def test_lockout_after_max_attempts(self):
+        self.store.issue("a@example.com", "111111")
+        for _ in range(Config.OTP_MAX_ATTEMPTS - 1):
+            self.assertEqual(self.store.verify("a@example.com", "000000"), INVALID)
+        self.assertEqual(self.store.verify("a@example.com", "000000"), LOCKED)
+        # The OTP is discarded, so the right code no longer works either.
+        self.assertEqual(self.store.verify("a@example.com", "111111"), EXPIRED)
+
+    def test_single_use(self):
+        self.store.issue("a@example.com", "111111")
+        self.assertEqual(self.store.verify("a@example.com", "000000"), INVALID)
+        self.assertEqual(self.store.verify("a@example.com", "111111"), VERIFIED)
+        self.assertEqual(self.store.verify("a@example.com", "111111"), EXPIRED)
+
+    def test_expiry(self):
+        key = "otp:a@example.com"
+        self.store.issue("a@example.com", "111111")
+        deadline = cache.get(key)["expires_at"]
+        self.store.verify("a@example.com", "000000")
+        # Wrong guesses keep the original deadline; past it the OTP is gone.
+        entry = cache.get(key)
+        self.assertEqual(entry["expires_at"], deadline)
+        entry["expires_at"] = time.time() - 1
+        cache.set(key, entry, 60)
+        self.assertEqual(self.store.verify("a@example.com", "000000"), EXPIRED)
+        self.assertIsNone(cache.get(key))
+
+        self.store.issue("b@example.com", "222222")
+        cache.delete("otp:b@example.com")  # the cache TTL elapsed
+        self.assertEqual(self.store.verify("b@example.com", "222222"), EXPIRED)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class OTPEmailTaskTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_sealed_otp(self):
+        token = seal_otp("a@example.com", "123456")
+        self.assertNotIn("123456", token)
+        self.assertEqual(open_otp("a@example.com", token), "123456")
+        with self.assertRaises(signing.BadSignature):
+            open_otp("b@example.com", token)
+        with self.assertRaises(signing.BadSignature):
+            open_otp("a@example.com", token[:-2] + ("AA" if token[-2:] != "AA" else "BB"))
+        with mock.patch("django.core.signing.time.time", return_value=time.time() + Config.OTP_TTL_SECONDS + 1):
+            with self.assertRaises(signing.SignatureExpired):
+                open_otp("a@example.com", token)
+
+    def test_emailed_at_most_once(self):
+        token = seal_otp("a@example.com", "654321")
+        send_otp_email.apply(args=("a@example.com", token, "key-1"))
+        send_otp_email.apply(args=("a@example.com", token, "key-1"))  # redelivered
+        self.assertEqual([message.to for message in django_mail.outbox], [["a@example.com"]])
+
+    def test_failed_send_releases_key(self):
+        token = seal_otp("a@example.com", "654321")
+        with mock.patch("superadmin.utils.EmailService.send_html", side_effect=OSError("relay down")), \
+                mock.patch("superadmin.tasks.logger"), mock.patch.object(send_otp_email, "max_retries", 0):
+            self.assertTrue(send_otp_email.apply(args=("a@example.com", token, "key-2")).failed())
+        send_otp_email.apply(args=("a@example.com", token, "key-2"))
+        self.assertEqual(len(django_mail.outbox), 1)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class HashingPoolTests(TestCase):
+    def setUp(self):
+        for patcher in (
+            mock.patch.object(Config, "PASSWORD_HASH_WORKERS", 1),
+            mock.patch.object(Config, "PASSWORD_HASH_TIMEOUT", 0.01),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fake_executor(self, future):
+        executor = mock.Mock()
+        executor.submit.return_value = future
+        patcher = mock.patch("superadmin.hashing._get_executor", return_value=executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return executor
+
+    def test_workers_use_callers_hashers(self):
+        executor = self.fake_executor(Future())
+        executor.submit.return_value.set_result("hash")
+        hashing.hash_password("secret")
+        fn, *args = executor.submit.call_args.args
+        self.assertTrue(fn(*args).startswith("md5$"))
+
+    def test_timeout_is_503_and_keeps_the_slot_until_done(self):
+        future = Future()
+        future.set_running_or_notify_cancel()  # already picked up by a worker
+        self.fake_executor(future)
+        with mock.patch.object(hashing, "_slots", mock.Mock()) as slots:
+            with self.assertRaises(hashing.HashingTimeout):
+                hashing.hash_password("secret")
+            slots.release.assert_not_called()
+            future.set_result("hash")
+            slots.release.assert_called_once()
+
+    def test_broken_pool_is_shut_down(self):
+        future = Future()
+        future.set_exception(BrokenProcessPool())
+        executor = self.fake_executor(future)
+        with self.assertRaises(BrokenProcessPool):
+            hashing.hash_password("secret")
+        executor.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def refresh_at(self, user, seconds):
+        with mock.patch("superadmin.tokens._now_ms", return_value=int(seconds * 1000)):
+            return RoleRefreshToken.for_user(user)
+
+    def test_same_second_boundary(self):
+        user = UserProfile.objects.create(email="u@example.com", role=ROLE_CUSTOMER, is_active=True)
+        stale_refresh = self.refresh_at(user, 1000.2)
+        with mock.patch("superadmin.tokens._now_ms", return_value=1000500), \
+                self.captureOnCommitCallbacks(execute=True):
+            revoke_user_tokens(user.pk)
+        fresh = self.refresh_at(user, 1000.7).access_token  # e.g. a re-login right after the role change
+
+        self.assertTrue(is_token_revoked(user.pk, issued_at_ms(stale_refresh.access_token)))
+        self.assertFalse(is_token_revoked(user.pk, issued_at_ms(fresh)))
+
+
+class MetricsEndpointTests(TestCase):
+    def test_internal_only_without_token(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 200)
+        self.assertEqual(self.client.get(reverse("metrics"), REMOTE_ADDR="10.1.2.3").status_code, 200)
+        self.assertEqual(self.client.get(reverse("metrics"), REMOTE_ADDR="8.8.8.8").status_code, 403)
+
+    @override_settings(METRICS_TOKEN="scrape-me")
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        response = self.client.get(
+            reverse("metrics"), REMOTE_ADDR="8.8.8.8", HTTP_AUTHORIZATION="Bearer scrape-me"
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+def _record(message, level=logging.CRITICAL):
+    return logging.LogRecord("test", level, __file__, 1, message, None, None)
+
+
+class CustomLoggerTests(SimpleTestCase):
+    def setUp(self):
+        self.owner = mock.Mock()
+        self.alerts = superadmin_utils._CriticalAlertHandler(self.owner)
+
+    def sent(self):
+        return [call.args[0] for call in self.owner.send_critical_email.call_args_list]
+
+    def test_identical_criticals_are_deduplicated(self):
+        for message in ("db down", "db down", "disk full", "db down"):
+            self.alerts.handle(_record(message))
+        # The next alert that does go out reports how many were suppressed.
+        self.assertEqual(self.sent(), ["db down", "disk full\n\n(1 similar or rate-limited alerts suppressed)"])
+
+        # Outside the window the same alert goes out again.
+        with mock.patch.object(Config, "LOG_ALERT_DEDUP_SECONDS", 0):
+            self.alerts.handle(_record("db down"))
+        self.assertEqual(self.sent()[-1], "db down\n\n(1 similar or rate-limited alerts suppressed)")
+
+    @mock.patch.object(Config, "LOG_ALERT_RATE_LIMIT", 2)
+    def test_rate_limit(self):
+        for i in range(5):
+            self.alerts.handle(_record(f"error {i}"))
+        self.assertEqual(self.sent(), ["error 0", "error 1"])
+        with mock.patch.object(Config, "LOG_ALERT_RATE_WINDOW", 0):
+            self.alerts.handle(_record("error 5"))
+        self.assertEqual(len(self.sent()), 3)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        log_queue = queue.Queue(maxsize=2)
+        handler = superadmin_utils._DroppingQueueHandler(log_queue)
+        for i in range(5):
+            handler.handle(_record(f"line {i}", logging.INFO))  # would block forever on put()
+        self.assertEqual((log_queue.qsize(), handler.dropped), (2, 3))
+
+    def test_alerts_leave_from_the_listener(self):
+        with tempfile.TemporaryDirectory() as base_dir, override_settings(BASE_DIR=base_dir), \
+                mock.patch("superadmin.utils.outbox.enqueue") as enqueue:
+            app = f"test-{uuid.uuid4().hex}"
+            log = superadmin_utils.CustomLogger(app)
+            self.addCleanup(logging.getLogger(app).handlers.clear)
+            log.log("critical", "payment gateway down")
+            log.log("critical", "payment gateway down")
+            log.log("info", "still serving")
+            superadmin_utils.CustomLogger._listeners[app].stop()  # flushes the queue
+            self.assertEqual(enqueue.call_count, 1)
+            with open(os.path.join(base_dir, "logs", app, os.listdir(os.path.join(base_dir, "logs", app))[0])) as f:
+                self.assertEqual(f.read().count("\n"), 3)
+
+
+class EmailRenderingTests(SimpleTestCase):
+    """The precompiled templates must render exactly what render_to_string did."""
+    contexts = [
+        {"first_name": "Ada", "last_name": "Lovelace", "email": "ada@example.com", "password": "p4ss-word",
+         "msg": "Your account is ready.", "otp": "123456", "subject": "Welcome"},
+        {"first_name": "Bob", "email": "bob@example.com", "otp": "000111"},
+        {},
+    ]
+
+    def setUp(self):
+        rendering.clear_cache()
+
+    def assert_equivalent(self, template_name, text_template_name=None):
+        expected = [
+            (
+                render_to_string(template_name, context),
+                render_to_string(text_template_name, context) if text_template_name
+                else strip_tags(render_to_string(template_name, context)),
+            )
+            for context in self.contexts
+        ]
+        for context, pair in zip(self.contexts, expected):
+            self.assertEqual(rendering.render_email(template_name, context, text_template_name), pair)
+        self.assertEqual(rendering.render_many(template_name, self.contexts, text_template_name), expected)
+
+    def test_welcome_with_text_template(self):
+        self.assert_equivalent("welcome_email_template.html", "welcome.txt")
+
+    def test_derived_text(self):
+        for template_name in ("welcome_email_template.html", "otp_email.html"):
+            with self.subTest(template_name):
+                self.assert_equivalent(template_name)
+
+
+class FakePool:
+    """Stands in for the SMTP pool; refuses recipients starting with "bad"."""
+    def __init__(self):
+        self.sent = []
+        self.refused = 0
+
+    def send_messages(self, messages):
+        for message in messages:
+            if message.to[0].startswith("bad"):
+                self.refused += 1
+                raise smtplib.SMTPRecipientsRefused({message.to[0]: (550, b"no")})
+            self.sent.append(message.to[0])
+        return len(messages)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.outbox = get_outbox()
+        self.outbox.clear()
+        self.pool = FakePool()
+        patcher = mock.patch("superadmin.outbox.logger")  # expected send failures
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def enqueue(self, email, **context):
+        self.outbox.push([email_outbox._payload([email], "Hi", body="Hello", context=context)])
+
+    def test_retry_waits_for_delay(self):
+        self.enqueue("ok@example.com")
+        self.enqueue("bad@example.com")
+        stats = email_outbox.drain(pool=self.pool)
+        self.assertEqual((stats["sent"], stats["retried"]), (1, 1))
+
+        # A drain triggered by new mail doesn't retry early.
+        self.enqueue("ok2@example.com")
+        email_outbox.drain(pool=self.pool)
+        self.assertEqual((self.pool.sent, self.pool.refused), (["ok@example.com", "ok2@example.com"], 1))
+
+        due = self.outbox.next_due()
+        self.assertAlmostEqual(due, time.time() + Config.EMAIL_OUTBOX_RETRY_DELAY, delta=5)
+        with mock.patch("superadmin.outbox.time.time", return_value=due):
+            stats = email_outbox.drain(pool=self.pool)
+        self.assertEqual((stats["retried"], self.pool.refused), (1, 2))
+
+    @mock.patch.object(Config, "EMAIL_OUTBOX_MAX_ATTEMPTS", 1)
+    def test_dead_letter_drops_secrets(self):
+        self.enqueue("bad@example.com", password="s3cret", first_name="Bad")
+        stats = email_outbox.drain(pool=self.pool)
+        self.assertEqual(stats["dead"], 1)
+        self.assertEqual(self.outbox.dead[0]["context"], {"password": "[redacted]", "first_name": "Bad"})
+        self.assertIsNone(self.outbox.next_due())
+
+    def test_secrets_are_sealed_while_queued(self):
+        with mock.patch("superadmin.outbox.schedule_drain"):
+            queue_welcome_email("new@example.com", {"first_name": "New", "password": "s3cret-pass"})
+        queued = self.outbox.claim("inspect", 10)
+        self.assertNotIn("s3cret-pass", json.dumps(queued))
+
+        message, = email_outbox.build_messages(queued)
+        self.assertIn("Password: s3cret-pass", message.body)
+
+        # A token moved to another message doesn't open.
+        other = {**queued[0], "id": "another"}
+        self.assertIsInstance(email_outbox.build_messages([other])[0], signing.BadSignature)
+
+    def test_crashed_drain_is_recovered(self):
+        self.enqueue("first@example.com")
+        self.enqueue("second@example.com")
+        self.assertEqual(len(self.outbox.claim("crashed", 10)), 2)  # never settled
+        self.assertEqual(email_outbox.drain(pool=self.pool)["recovered"], 0)  # claim still fresh
+
+        with mock.patch.object(Config, "EMAIL_OUTBOX_CLAIM_TIMEOUT", -1):
+            stats = email_outbox.drain(pool=self.pool)
+        self.assertEqual((stats["recovered"], stats["sent"]), (2, 2))
+        self.assertEqual(self.pool.sent, ["first@example.com", "second@example.com"])
+
+    def test_pending_retry_does_not_delay_new_mail(self):
+        self.enqueue("bad@example.com")
+        with mock.patch("superadmin.tasks.drain_email_outbox.apply_async") as apply_async, \
+                mock.patch("superadmin.outbox.mail.get_pool", return_value=self.pool):
+            drain_email_outbox()
+            apply_async.assert_called_once()
+            self.assertEqual(apply_async.call_args.kwargs["kwargs"], {"retry": True})
+            self.assertAlmostEqual(
+                apply_async.call_args.kwargs["countdown"], Config.EMAIL_OUTBOX_RETRY_DELAY, delta=5
+            )
+
+            # New mail still gets a drain within the batching window.
+            email_outbox.enqueue(["new@example.com"], "Hi", body="Hello")
+            self.assertEqual(apply_async.call_args.kwargs, {"countdown": Config.EMAIL_OUTBOX_MAX_WAIT_MS / 1000})
+
+
+class FakeSMTPBackend:
+    def __init__(self, log, drop_after=None):
+        self.log = log
+        self.drop_after = drop_after
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        for message in messages:
+            if self.drop_after == 0:
+                raise smtplib.SMTPServerDisconnected("connection dropped")
+            if self.drop_after:
+                self.drop_after -= 1
+            self.log.append(message.to[0])
+        return len(messages)
+
+
+class SMTPPoolTests(TestCase):
+    def test_reconnect_resends_only_undelivered(self):
+        delivered = []
+        backends = [FakeSMTPBackend(delivered), FakeSMTPBackend(delivered)]
+        pool = SMTPConnectionPool(size=1)
+        with mock.patch("superadmin.mail.get_connection", side_effect=backends):
+            pool.send_messages([EmailMessage("s", "b", "f@example.com", ["a@example.com"])])
+            backends[0].drop_after = 1
+            sent = pool.send_messages([
+                EmailMessage("s", "b", "f@example.com", [f"{name}@example.com"]) for name in "bcd"
+            ])
+        self.assertEqual(sent, 3)
+        self.assertEqual(delivered, ["a@example.com", "b@example.com", "c@example.com", "d@example.com"])
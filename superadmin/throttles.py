@@ -1,13 +1,143 @@
-# throttles.py
+"""
+GCRA (generic cell rate algorithm) throttles.
+
+DRF's SimpleRateThrottle keeps a list of request timestamps in the cache:
+every request reads it, trims it in Python and writes it back, so two
+round-trips, O(rate) work, and concurrent requests overwrite each other's
+updates. GCRA keeps a single number per key, the "theoretical arrival time"
+(TAT) of the next request, and allows a burst of `num_requests` followed by
+one request every `duration / num_requests` seconds.
+
+On django_redis a check is one Lua script (one atomic round-trip) using the
+Redis server clock, so app servers with skewed clocks agree. Other cache
+backends (locmem in tests) use the same logic under a process-local lock.
+Rates come from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] by scope.
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework.throttling import SimpleRateThrottle
 
-class LoginRateThrottle(SimpleRateThrottle):
-    scope = 'login'
+# KEYS: throttle key. ARGV: emission interval (us), period (us).
+# Returns 0 when allowed, otherwise microseconds until the next allowed request.
+# Redis >= 5 (TIME followed by a write needs effects replication).
+GCRA_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000000 + tonumber(clock[2])
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local wait = new_tat - now - period
+if wait > 0 then
+    return wait
+end
+redis.call('SET', KEYS[1], string.format('%.0f', new_tat), 'PX', math.ceil((new_tat - now) / 1000))
+return 0
+"""
+
+
+class RedisThrottleStore:
+    def __init__(self):
+        from django_redis import get_redis_connection
+        client = get_redis_connection("default")
+        self._acquire = client.register_script(GCRA_SCRIPT)
+
+    def acquire(self, key, num_requests, duration):
+        """Takes one request from the key's allowance. Returns 0, or seconds to wait."""
+        interval = duration * 1_000_000 // num_requests
+        wait = self._acquire(keys=[key], args=[interval, duration * 1_000_000])
+        return int(wait) / 1_000_000
+
+
+class CacheThrottleStore:
+    """Fallback for non-Redis cache backends; atomic within one process only."""
+    _lock = threading.Lock()
+
+    def acquire(self, key, num_requests, duration):
+        interval = duration / num_requests
+        with self._lock:
+            now = time.time()
+            new_tat = max(cache.get(key, now), now) + interval
+            wait = new_tat - now - duration
+            if wait > 0:
+                return wait
+            cache.set(key, new_tat, math.ceil(new_tat - now))
+            return 0
+
+
+_redis_store = None
+_cache_store = CacheThrottleStore()
+
+
+def get_throttle_store():
+    global _redis_store
+    if not settings.CACHES["default"]["BACKEND"].startswith("django_redis."):
+        return _cache_store
+    if _redis_store is None:
+        _redis_store = RedisThrottleStore()
+    return _redis_store
+
+
+class GCRAThrottle(SimpleRateThrottle):
+    """SimpleRateThrottle's scopes, rates and cache keys with a GCRA check."""
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self._wait = get_throttle_store().acquire(self.key, self.num_requests, self.duration)
+        return self._wait == 0
+
+    def wait(self):
+        return self._wait or None
+
+
+class AnonRateThrottle(GCRAThrottle):
+    """Unauthenticated requests, by client IP."""
+    scope = 'anon'
 
     def get_cache_key(self, request, view):
-        # Throttle by IP for anonymous; by user for authenticated
-        ident = self.get_ident(request)
-        return self.cache_format % {
-            'scope': self.scope,
-            'ident': ident
-        }
\ No newline at end of file
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class UserRateThrottle(GCRAThrottle):
+    """Authenticated requests by user id; anonymous ones by client IP."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class ScopedIPThrottle(GCRAThrottle):
+    """Per-endpoint limits by client IP, whether or not the request is authenticated."""
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginRateThrottle(ScopedIPThrottle):
+    scope = 'login'
+
+
+class OTPRateThrottle(ScopedIPThrottle):
+    """Shared by OTP issue, OTP verify and password reset."""
+    scope = 'otp'
+
+
+class SignupRateThrottle(ScopedIPThrottle):
+    scope = 'signup'
@@ -0,0 +1,76 @@
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    Refresh token carrying `role` and `is_active` claims. Access tokens
+    derived from it copy both, so permission checks can authorize from the
+    token alone (see ClaimsJWTAuthentication). `iat_ms` is the issue time in
+    milliseconds: `iat` has whole seconds only, too coarse to tell a token
+    from a revocation in the same second.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token["role"] = user.role
+        token["is_active"] = user.is_active
+        token["iat_ms"] = _now_ms()
+        return token
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def issued_at_ms(token):
+    """Issue time in ms; tokens without iat_ms count from the start of their `iat` second."""
+    if token.get("iat_ms") is not None:
+        return token["iat_ms"]
+    iat = token.get("iat")
+    return iat * 1000 if iat is not None else None
+
+
+# --------------------------
+# Claim revocation denylist
+# --------------------------
+# When a user's role or active flag changes, tokens issued before that moment
+# carry stale claims. We record the change time (ms) per user; the entry only
+# needs to outlive the longest-lived access token.
+
+def _revoked_key(user_id):
+    return f"auth:revoked:{user_id}"
+
+
+def revoke_user_tokens(user_id):
+    """Rejects every access token issued to user_id up to now, once the transaction commits."""
+    if user_id is None:
+        return
+    timeout = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+
+    def _revoke():
+        try:
+            cache.set(_revoked_key(user_id), _now_ms(), timeout)
+        except Exception as e:
+            logger.error("Failed to revoke tokens for user %s: %s", user_id, e)
+
+    transaction.on_commit(_revoke)
+
+
+def is_token_revoked(user_id, issued_at):
+    """`issued_at` in ms (see issued_at_ms)."""
+    try:
+        revoked_at = cache.get(_revoked_key(user_id))
+    except Exception as e:
+        # Fail open: a cache outage must not lock every user out.
+        logger.warning("Token denylist unavailable: %s", e)
+        return False
+    return revoked_at is not None and issued_at is not None and issued_at < revoked_at
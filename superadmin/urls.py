@@ -2,7 +2,7 @@
 from django.urls import path
 from .views import (
     CustomerViews, LoginCustomer, CustomerManageViews,
-    OTPView, VerifyOTP, ForgotPasswordAPIView
+    OTPView, VerifyOTP, ForgotPasswordAPIView, UserImportView, UserImportStatusView
 )
 
 urlpatterns = [
@@ -12,5 +12,7 @@ urlpatterns = [
     path('users/<int:id>/', CustomerManageViews.as_view(), name='users-detail'),
     path('send-otp/', OTPView.as_view(), name='send-otp'),
     path('verify-otp/', VerifyOTP.as_view(), name='verify-otp'),
-    path('forgot-password/', ForgotPasswordAPIView.as_view(), name='forgot-password')
+    path('forgot-password/', ForgotPasswordAPIView.as_view(), name='forgot-password'),
+    path('users/imports/', UserImportView.as_view(), name='user-import'),
+    path('users/imports/<int:id>/', UserImportStatusView.as_view(), name='user-import-detail'),
 ]
@@ -1,38 +1,159 @@
 import os
+import time
+import atexit
 import logging
-from datetime import datetime
-from django.core.mail import EmailMessage, send_mail
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+import queue
+from collections import deque
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from django.core.mail import EmailMessage, EmailMultiAlternatives, send_mail
 from django.core.cache import cache
 from django.conf import settings
 from django.db import transaction
-import random
+import secrets
+import uuid
+
+from restserver.metrics import record_cache
 
 from .config import Config
+from . import mail
+from . import outbox
+from . import otp as otp_store
+from .models import UserProfile
+from .rendering import render_email
+
+# --------------------------
+# Logging
+# --------------------------
+# Records go onto a bounded in-memory queue; a QueueListener thread per app
+# writes them to logs/<app>/<YYYY-MM-DD>.log and handles critical alerts, so
+# the calling thread only pays for an enqueue. When the queue is full records
+# are dropped (and counted) rather than blocking the request.
+class _DroppingQueueHandler(QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The listener is in-process, so skip the stdlib's eager formatting and
+        # record copy; only freeze the message in case args are mutated later.
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # Block rather than fail when the queue is full at shutdown.
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+
+
+class _DailyFileHandler(logging.FileHandler):
+    """Writes to <directory>/<UTC date>.log, switching files at midnight."""
+    def __init__(self, directory):
+        self.directory = directory
+        self.day = self._today()
+        super().__init__(self._path(self.day), delay=True)
+
+    @staticmethod
+    def _today():
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+    def _path(self, day):
+        return os.path.join(self.directory, f"{day}.log")
+
+    def emit(self, record):
+        day = self._today()
+        if day != self.day:
+            self.close()
+            self.day = day
+            self.baseFilename = self._path(day)
+        super().emit(record)
+
+
+class _CriticalAlertHandler(logging.Handler):
+    """
+    Runs on the listener thread. Identical alerts within
+    LOG_ALERT_DEDUP_SECONDS are suppressed, at most LOG_ALERT_RATE_LIMIT
+    alerts go out per LOG_ALERT_RATE_WINDOW, and sending is a push onto the
+    email outbox.
+    """
+    def __init__(self, owner):
+        super().__init__(logging.CRITICAL)
+        self.owner = owner
+        self.last_sent = {}
+        self.sent_times = deque()
+        self.suppressed = 0
+
+    def emit(self, record):
+        now = time.monotonic()
+        message = record.getMessage()
+        last = self.last_sent.get(message)
+        if last is not None and now - last < Config.LOG_ALERT_DEDUP_SECONDS:
+            self.suppressed += 1
+            return
+        while self.sent_times and now - self.sent_times[0] >= Config.LOG_ALERT_RATE_WINDOW:
+            self.sent_times.popleft()
+        if len(self.sent_times) >= Config.LOG_ALERT_RATE_LIMIT:
+            self.suppressed += 1
+            return
+
+        if len(self.last_sent) > 1000:
+            self.last_sent = {
+                m: t for m, t in self.last_sent.items() if now - t < Config.LOG_ALERT_DEDUP_SECONDS
+            }
+        self.last_sent[message] = now
+        self.sent_times.append(now)
+        if self.suppressed:
+            message = f"{message}\n\n({self.suppressed} similar or rate-limited alerts suppressed)"
+            self.suppressed = 0
+        self.owner.send_critical_email(message)
+
 
 class CustomLogger:
+    _listeners = {}
+
     def __init__(self, app_name, filename=None):
         self.app_name = app_name
         self.logger = logging.getLogger(app_name)
         self.logger.setLevel(getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO))
 
+        if self.logger.handlers:
+            return
+
         log_directory = os.path.join(settings.BASE_DIR, 'logs', app_name)
         os.makedirs(log_directory, exist_ok=True)
 
-        if not filename:
-            filename = f"{datetime.utcnow().strftime('%Y-%m-%d')}.log"
-        log_file_path = os.path.join(log_directory, filename)
+        if filename:
+            file_handler = logging.FileHandler(os.path.join(log_directory, filename), delay=True)
+        else:
+            file_handler = _DailyFileHandler(log_directory)
 
         formatter = logging.Formatter(
             '%(asctime)s %(process)d %(thread)s %(levelname)8s '
             '%(filename)s %(funcName)s %(lineno)d %(message)s'
         )
-
-        file_handler = logging.FileHandler(log_file_path)
         file_handler.setFormatter(formatter)
-        if not self.logger.handlers:
-            self.logger.addHandler(file_handler)
+
+        log_queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+        self.logger.addHandler(_DroppingQueueHandler(log_queue))
+        listener = _Listener(
+            log_queue, file_handler, _CriticalAlertHandler(self), respect_handler_level=True
+        )
+        listener.start()
+        atexit.register(listener.stop)  # flush what's queued on shutdown
+        self._listeners[app_name] = listener
 
     def log(self, level, message):
         level = level.lower()
@@ -45,8 +166,8 @@ class CustomLogger:
         elif level == 'error':
             self.logger.error(message, stacklevel=2)
         elif level == 'critical':
+            # The alert email is sent from the listener thread.
             self.logger.critical(message, stacklevel=2)
-            self.send_critical_email(message)
         else:
             self.logger.info(message, stacklevel=2)
 
@@ -62,77 +183,189 @@ class CustomLogger:
                 emails = [r[1] if isinstance(r, (list, tuple)) and len(r) > 1 else r for r in recipient]
             else:
                 emails = [recipient]
-            send_mail(subject, body, Config.DEFAULT_FROM_EMAIL, emails, fail_silently=False)
-        except Exception as e:
-            self.logger.exception("Failed to send critical email: %s", e)
+            outbox.enqueue(emails, subject, body=body, from_email=Config.DEFAULT_FROM_EMAIL)
+        except Exception:
+            # Outbox unavailable (Redis down?); still get the alert out.
+            try:
+                send_mail(subject, body, Config.DEFAULT_FROM_EMAIL, emails, fail_silently=False)
+            except Exception as e:
+                self.logger.error("Failed to send critical email: %s", e)
 
 
 # --------------------------
 # Email Service
 # --------------------------
+# Sends go through the per-process SMTP connection pool (see mail.py).
 class EmailService:
     @staticmethod
     def send_plain(to_list, subject, message, from_email=None):
         from_email = from_email or Config.DEFAULT_FROM_EMAIL
-        send_mail(subject, message, from_email, to_list, fail_silently=False)
+        mail.send_messages([EmailMessage(subject, message, from_email, to_list)])
 
     @staticmethod
-    def send_html(to_list, subject, template_name, context, from_email=None):
+    def send_html(to_list, subject, template_name, context, from_email=None, text_template_name=None):
         from_email = from_email or Config.DEFAULT_FROM_EMAIL
-        html_message = render_to_string(template_name, context)
-        plain_message = strip_tags(html_message)
-        email = EmailMessage(subject, plain_message, from_email, to_list)
-        email.content_subtype = "html"
-        email.body = html_message
-        email.send(fail_silently=False)
+        html_message, plain_message = render_email(template_name, context, text_template_name)
+        email = EmailMultiAlternatives(subject, plain_message, from_email, to_list)
+        email.attach_alternative(html_message, "text/html")
+        mail.send_messages([email])
 
 
 # --------------------------
-# OTP helpers with rate-limit via cache
+# OTP helpers with atomic rate-limit (see otp.py)
 # --------------------------
 def generate_otp(length=None):
     length = length or Config.OTP_LENGTH
     start = 10 ** (length - 1)
     end = (10 ** length) - 1
-    return str(random.randint(start, end))
-
-def _otp_rate_key(email):
-    return f"otp_rate:{email.lower()}"
+    return str(start + secrets.randbelow(end - start + 1))
 
 def send_otp(email, template='otp_email.html', context_extra=None):
     """
-    Rate-limited OTP sender. Stores OTP in cache with TTL Config.OTP_TTL_SECONDS.
+    Rate-limited OTP sender. Stores OTP in cache with TTL Config.OTP_TTL_SECONDS
+    and queues the email. The rate check, counter increment and OTP write are
+    a single atomic store operation (one Lua script on Redis).
     Returns (ok: bool, msg: str)
     """
     email = email.lower()
-    rate_key = _otp_rate_key(email)
-    counter = cache.get(rate_key) or 0
-    if counter >= Config.OTP_RATE_LIMIT_MAX:
-        return False, "Too many OTP requests. Try again later."
-
     otp = generate_otp()
-    otp_key = f"otp:{email}"
-    cache.set(otp_key, otp, Config.OTP_TTL_SECONDS)
-    cache.incr(rate_key) if cache.get(rate_key) is not None else cache.set(rate_key, 1, Config.OTP_RATE_LIMIT_WINDOW)
-
-    context = {'otp': otp}
-    if context_extra:
-        context.update(context_extra or {})
+    if not otp_store.get_otp_store().issue(email, otp):
+        return False, "Too many OTP requests. Try again later."
 
+    # Delivery happens on the "otp" Celery queue; the request only waits for
+    # the Redis write above and the enqueue. The broker only sees the code sealed.
+    from .tasks import send_otp_email
     try:
-        EmailService.send_html([email], "Your OTP Code", template, context)
+        send_otp_email.delay(email, otp_store.seal_otp(email, otp), uuid.uuid4().hex, template, context_extra)
     except Exception as e:
-        return False, f"Failed to send OTP email: {e}"
+        return False, f"Failed to queue OTP email: {e}"
 
     return True, "OTP sent successfully"
 
+_VERIFY_MESSAGES = {
+    otp_store.VERIFIED: (True, "OTP verified"),
+    otp_store.INVALID: (False, "Invalid OTP"),
+    otp_store.EXPIRED: (False, "OTP expired or not found"),
+    otp_store.LOCKED: (False, "Too many invalid attempts. Please request a new OTP."),
+}
+
 def verify_otp(email, otp):
     email = email.lower()
-    otp_key = f"otp:{email}"
-    stored = cache.get(otp_key)
-    if not stored:
-        return False, "OTP expired or not found"
-    if str(stored) != str(otp):
-        return False, "Invalid OTP"
-    cache.delete(otp_key)
-    return True, "OTP verified"
+    return _VERIFY_MESSAGES[otp_store.get_otp_store().verify(email, str(otp))]
+
+
+# --------------------------
+# Versioned cache helpers
+# --------------------------
+# Entries are stored as (version, value) next to a shared version key. A read
+# fetches both keys in one round-trip (MGET on Redis) and only trusts an entry
+# stamped with the current version, so bumping the version after a commit
+# invalidates every dependent entry at once without scanning keys.
+_cache_logger = logging.getLogger(__name__)
+
+
+def get_versioned(version_key, key):
+    """
+    Returns (version, value). value is None on a miss or when the entry was
+    written under an older version. Cache errors are treated as a miss.
+    """
+    try:
+        found = cache.get_many([version_key, key])
+    except Exception as e:
+        _cache_logger.warning("Cache read failed for %s: %s", key, e)
+        return None, None
+
+    version = found.get(version_key)
+    entry = found.get(key)
+    if version is None:
+        version = _init_version(version_key)
+    elif entry is not None and entry[0] == version:
+        record_cache(hit=True)
+        return version, entry[1]
+    record_cache(hit=False)
+    return version, None
+
+
+def set_versioned(key, version, value, timeout=None):
+    if version is None:
+        return
+    try:
+        cache.set(key, (version, value), timeout)
+    except Exception as e:
+        _cache_logger.warning("Cache write failed for %s: %s", key, e)
+
+
+def bump_version(version_key):
+    try:
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            # Key missing or evicted: restart from a clock value so that entries
+            # stamped before the eviction can never match again.
+            cache.set(version_key, time.time_ns(), None)
+    except Exception as e:
+        _cache_logger.error("Cache version bump failed for %s: %s", version_key, e)
+
+
+def _init_version(version_key):
+    version = time.time_ns()
+    try:
+        if not cache.add(version_key, version, None):
+            version = cache.get(version_key)
+    except Exception:
+        return None
+    return version
+
+
+# --------------------------
+# Signup bootstrap flag
+# --------------------------
+# The first signup on an empty user table creates the SuperAdmin. Once any
+# user exists that answer never changes in normal operation, so it is
+# remembered in the process and in the shared cache instead of being asked
+# of the DB on every signup.
+BOOTSTRAP_DONE_KEY = "auth:bootstrap_done"
+_bootstrap_done = False
+
+
+def bootstrap_done():
+    """True once the user table has ever had a user (no query or cache read after the first True)."""
+    if _bootstrap_done:
+        return True
+    try:
+        if cache.get(BOOTSTRAP_DONE_KEY):
+            return _remember_bootstrap_done()
+    except Exception as e:
+        _cache_logger.warning("Bootstrap flag read failed: %s", e)
+
+    if UserProfile.objects.exists():
+        mark_bootstrap_done()
+    return _bootstrap_done
+
+
+def _remember_bootstrap_done():
+    global _bootstrap_done
+    _bootstrap_done = True
+    return True
+
+
+def mark_bootstrap_done():
+    _remember_bootstrap_done()
+    try:
+        cache.set(BOOTSTRAP_DONE_KEY, 1, None)
+    except Exception as e:
+        _cache_logger.warning("Bootstrap flag write failed: %s", e)
+
+
+def reset_bootstrap_flag():
+    """
+    Forgets the flag (tests, or after wiping the user table). Only this
+    process's copy is cleared; other running workers keep theirs until they
+    restart, so restart them after wiping the table.
+    """
+    global _bootstrap_done
+    _bootstrap_done = False
+    try:
+        cache.delete(BOOTSTRAP_DONE_KEY)
+    except Exception as e:
+        _cache_logger.warning("Bootstrap flag reset failed: %s", e)
@@ -1,27 +1,38 @@
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from django.contrib.auth.hashers import make_password
 from django.db import transaction
 from django.db.models import Q
 from django.utils.crypto import get_random_string
 from .models import (
+    Company,
+    UserImportJob,
     UserProfile,
     ROLE_SUPERADMIN,
     ROLE_CUSTOMER,
 )
-from .tasks import send_welcome_email
-from .serializers import UserSerializer, UserListSerializer
-from .utils import send_otp, verify_otp
+from .authentication import CachedJWTAuthentication, ClaimsJWTAuthentication
+from .tokens import RoleRefreshToken
+from .hashing import hash_password, verify_password
+from .tasks import import_users, queue_welcome_email
+from .serializers import UserImportJobSerializer, UserSerializer, UserListSerializer, user_list_encoder
+from .imports import SUPPORTED_EXTENSIONS
+from .permission import IsSuperAdmin
+from .throttles import AnonRateThrottle, LoginRateThrottle, OTPRateThrottle, SignupRateThrottle
+from .utils import bootstrap_done, mark_bootstrap_done, send_otp, verify_otp
+from restserver.metrics import timed
+from restserver.streaming import stream_list
 
 
 class CustomerViews(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [AllowAny]
+    throttle_classes = [AnonRateThrottle, SignupRateThrottle]
 
     def post(self, request):
         data = request.data.copy()
@@ -31,19 +42,23 @@ class CustomerViews(APIView):
             data["email"] = data["email"].lower().strip()
 
         # --- Bootstrap: create the first SuperAdmin (no auth required) ---
-        if not UserProfile.objects.exists():
+        # The flag is cached, so regular signups don't query for it.
+        if not bootstrap_done():
             serializer = UserSerializer(data=data, context={"request": request})
             if not serializer.is_valid():
                 return Response({"status": "failure", "errors": serializer.errors}, status=400)
 
             generated_password = get_random_string(12)
-            with transaction.atomic():
-                user = serializer.save(role=ROLE_SUPERADMIN, is_active=True)
-                user.set_password(generated_password)
-                user.save()
+            # Hash before the transaction; Argon2 runs in the bounded hashing pool.
+            hashed_password = hash_password(generated_password)
+            try:
+                user = serializer.save(role=ROLE_SUPERADMIN, is_active=True, password=hashed_password)
+            except ValidationError as e:
+                return Response({"status": "failure", "errors": e.detail}, status=400)
+            transaction.on_commit(mark_bootstrap_done)
 
             try:
-                send_welcome_email.delay(
+                queue_welcome_email(
                     user.email,
                     {
                         "subject": "Welcome SuperAdmin",
@@ -68,13 +83,16 @@ class CustomerViews(APIView):
             return Response({"status": "failure", "errors": serializer.errors}, status=400)
 
         generated_password = get_random_string(12)
-        with transaction.atomic():
-            user = serializer.save(role=ROLE_CUSTOMER, is_active=False)
-            user.set_password(generated_password)
-            user.save()
+        # Hash before the transaction; Argon2 runs in the bounded hashing pool.
+        # One INSERT with the hash; a taken email fails on the unique index.
+        hashed_password = hash_password(generated_password)
+        try:
+            user = serializer.save(role=ROLE_CUSTOMER, is_active=False, password=hashed_password)
+        except ValidationError as e:
+            return Response({"status": "failure", "errors": e.detail}, status=400)
 
         try:
-            send_welcome_email.delay(
+            queue_welcome_email(
                 user.email,
                 {
                     "subject": "Welcome to E-comm",
@@ -99,6 +117,7 @@ class CustomerViews(APIView):
 # -------------------------
 class LoginCustomer(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [AnonRateThrottle, LoginRateThrottle]
 
     def post(self, request):
         email = request.data.get("email")
@@ -115,10 +134,15 @@ class LoginCustomer(APIView):
         if not user.is_active:
             return Response({"msg": "You are not active user, please connect with admin"}, status=403)
 
-        if not user.check_password(password):
+        valid, upgraded_hash = verify_password(password, user.password)
+        if not valid:
             return Response({"msg": "Invalid password"}, status=401)
+        if upgraded_hash:
+            # Stored hash used an older hasher/cost; keep the re-hash.
+            user.password = upgraded_hash
+            user.save(update_fields=["password"])
 
-        refresh = RefreshToken.for_user(user)
+        refresh = RoleRefreshToken.for_user(user)
 
         data = {
             "id": user.id,
@@ -140,26 +164,46 @@ class LoginCustomer(APIView):
         )
 
 class CustomerManageViews(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
+    # Reads authorize from the token's role claims; writes still load the
+    # caller so ownership checks see current data.
+    def get_authenticators(self):
+        if self.request.method == "GET":
+            return [ClaimsJWTAuthentication()]
+        return super().get_authenticators()
+
     def get(self, request, id=None):
         current_user = request.user
 
         if id:
             user = get_object_or_404(UserProfile, id=id)
-            return Response({"data": UserSerializer(user).data}, status=200)
+            with timed("serializer"):
+                data = UserSerializer(user).data
+            return Response({"data": data}, status=200)
 
         # superadmins see all users
         if getattr(current_user, "is_superadmin", False):
-            users = UserProfile.objects.all().select_related("parent", "root_company")
+            users = UserProfile.objects.all()
+            # ?stream=true: constant-memory JSON stream for very large tables
+            if request.query_params.get("stream", "").lower() in ("1", "true"):
+                return stream_list(users.order_by("id"), user_list_encoder)
         else:
-            # non-superadmins: show users in the same company chain or direct children
-            users = UserProfile.objects.select_related("parent", "root_company").filter(
-                Q(root_company=current_user.root_company) | Q(parent=current_user)
+            # non-superadmins: users in their company and its sub-companies,
+            # plus the users they created
+            scope = Q(parent_id=current_user.id)
+            company_path = (
+                UserProfile.objects.filter(pk=current_user.id).values_list("company__path", flat=True).first()
             )
+            if company_path:
+                scope |= Q(company__in=Company.objects.subtree(company_path))
+            users = UserProfile.objects.filter(scope)
 
-        return Response({"data": UserListSerializer(users, many=True).data}, status=200)
+        users = list(users)  # keep the query out of the serializer timing
+        with timed("serializer"):
+            data = UserListSerializer(users, many=True).data
+        return Response({"data": data}, status=200)
 
     def patch(self, request, id=None):
         if not id:
@@ -169,14 +213,17 @@ class CustomerManageViews(APIView):
         current_user = request.user
 
         # Only SuperAdmin or the parent (creator) can edit
-        if not (getattr(current_user, "is_superadmin", False) or user.parent == current_user):
+        if not (getattr(current_user, "is_superadmin", False) or user.parent_id == current_user.id):
             return Response({"msg": "You are not authorized to edit this user"}, status=403)
 
         serializer = UserSerializer(user, data=request.data, partial=True, context={"request": request})
         if not serializer.is_valid():
             return Response({"errors": serializer.errors}, status=400)
 
-        serializer.save()
+        try:
+            serializer.save()
+        except ValidationError as e:
+            return Response({"errors": e.detail}, status=400)
         return Response({"data": serializer.data}, status=200)
 
     def delete(self, request, id=None):
@@ -186,13 +233,8 @@ class CustomerManageViews(APIView):
         user = get_object_or_404(UserProfile, id=id)
         current_user = request.user
 
-        allowed = False
-        if getattr(current_user, "is_superadmin", False):
-            allowed = True
-        if user.parent == current_user:
-            allowed = True
-
-        if not allowed:
+        # Only SuperAdmin or the parent (creator) can delete
+        if not (getattr(current_user, "is_superadmin", False) or user.parent_id == current_user.id):
             return Response({"msg": "You are not authorized to delete this user"}, status=403)
 
         user.delete()
@@ -204,6 +246,7 @@ class CustomerManageViews(APIView):
 # -------------------------
 class OTPView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [AnonRateThrottle, OTPRateThrottle]
 
     def post(self, request):
         email = request.data.get("email")
@@ -217,6 +260,7 @@ class OTPView(APIView):
 
 class VerifyOTP(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [AnonRateThrottle, OTPRateThrottle]
 
     def post(self, request):
         email = request.data.get("email")
@@ -234,6 +278,7 @@ class VerifyOTP(APIView):
 # -------------------------
 class ForgotPasswordAPIView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [AnonRateThrottle, OTPRateThrottle]
 
     def post(self, request):
         email = request.data.get("email")
@@ -258,6 +303,53 @@ class ForgotPasswordAPIView(APIView):
         except UserProfile.DoesNotExist:
             return Response({"error": "User not found"}, status=404)
 
-        user.password = make_password(password)
+        user.password = hash_password(password)
         user.save(update_fields=["password"])
         return Response({"message": "Password reset successful"}, status=200)
+
+
+# -------------------------
+# Bulk user import
+# -------------------------
+class UserImportView(APIView):
+    """
+    POST a CSV/XLSX file (multipart field "file", optional "activate",
+    "send_emails" and "create_companies" flags) to create users in bulk. The import runs on the
+    imports worker; poll the returned status URL for progress.
+    """
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsSuperAdmin]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"msg": "A file is required"}, status=400)
+        if not upload.name.lower().endswith(SUPPORTED_EXTENSIONS):
+            return Response({"msg": f"Supported file types: {', '.join(SUPPORTED_EXTENSIONS)}"}, status=400)
+
+        flags = {
+            name: str(request.data.get(name, default)).lower() in ("1", "true", "yes")
+            for name, default in (("activate", "true"), ("send_emails", "true"), ("create_companies", "false"))
+        }
+        job = UserImportJob.objects.create(
+            file=upload, filename=upload.name, created_by_id=request.user.id, **flags
+        )
+        transaction.on_commit(lambda: import_users.delay(job.pk))
+        return Response(
+            {
+                "msg": "Import queued",
+                "data": UserImportJobSerializer(job).data,
+                "status_url": reverse("user-import-detail", args=[job.pk]),
+            },
+            status=202,
+        )
+
+
+class UserImportStatusView(APIView):
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsSuperAdmin]
+
+    def get(self, request, id):
+        job = get_object_or_404(UserImportJob, id=id)
+        return Response({"data": UserImportJobSerializer(job).data}, status=200)